@@ -1,26 +1,37 @@
 """
 高达价格查询工具 - Flask主应用
 """
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response
+import click
+from flask import Blueprint, Flask, current_app, render_template, request, redirect, url_for, flash, jsonify, make_response
+from flask.cli import with_appcontext
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from models import db, Gunpla, Wishlist, Collection, Coupon, PriceHistory, User, ShareLink
+from models import db, Gunpla, Wishlist, Collection, Coupon, PriceHistory, PriceHistoryWeekly, User, ShareLink, sync_suan_rate
 from config import Config
+from search_index import detect_search_backend, install_search_index, search_gunpla
+from typeahead import TypeaheadIndex
+from facets import FacetCache
+from coupon_engine import analyze_wishlist
+from coupon_optimizer import optimize_wishlist
+from query_budget import init_query_budget, query_budget
+from seed_loader import SEED_PATH, load_seed, restore_snapshot
+from price_history import price_series
+from price_chart import PriceChartCache
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from datetime import datetime, date
+import base64
 import csv
 import io
+import json
 import secrets
 import os
 
-app = Flask(__name__)
-app.config.from_object(Config)
+bp = Blueprint('main', __name__)
 
-# 初始化数据库
-db.init_app(app)
-
-# 初始化Flask-Login
+# 初始化Flask-Login（在 create_app 中绑定应用）
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 login_manager.login_message = '请先登录以访问此页面。'
 login_manager.login_message_category = 'info'
 
@@ -29,49 +40,15 @@ def load_user(user_id):
     """加载用户"""
     return User.query.get(int(user_id))
 
-# 在应用上下文中创建所有表
-with app.app_context():
-    db.create_all()
-    # Seed initial Gunpla data from CSV if database is empty
-    if Gunpla.query.first() is None:
-        seed_path = os.path.join(os.path.dirname(__file__), "data", "seed_gunpla.csv")
-        if os.path.exists(seed_path):
-            try:
-                with open(seed_path, "r", encoding="utf-8") as f:
-                    reader = csv.DictReader(f)
-                    rows = []
-                    for row in reader:
-                        cleaned = {}
-                        for key, value in row.items():
-                            if value is None or value == "":
-                                cleaned[key] = None
-                                continue
-                            if key in {
-                                "id",
-                            }:
-                                cleaned[key] = int(value)
-                            elif key in {
-                                "price_jp_msrp",
-                                "price_jp_market",
-                                "price_us_msrp",
-                                "price_us_market",
-                                "price_cn_msrp",
-                                "price_cn_market",
-                            }:
-                                cleaned[key] = float(value)
-                            else:
-                                cleaned[key] = value
-                        rows.append(cleaned)
-                if rows:
-                    db.session.bulk_insert_mappings(Gunpla, rows)
-                    db.session.commit()
-                    print(f"Seeded Gunpla rows: {len(rows)}")
-            except Exception as e:
-                db.session.rollback()
-                print(f"Seed failed: {e}")
+
+def _search_backend():
+    """搜索后端：db-init 时记录在配置中，否则在第一次搜索时检测一次"""
+    if 'SEARCH_BACKEND' not in current_app.config:
+        current_app.config['SEARCH_BACKEND'] = detect_search_backend(db)
+    return current_app.config['SEARCH_BACKEND']
 
 
-@app.route('/')
+@bp.route('/')
 def index():
     """首页"""
     return render_template('index.html')
@@ -86,19 +63,98 @@ def _safe_parse_date(value):
         return None
 
 
+def _encode_cursor(*values):
+    """把排序键（如 name_cn, id）编码为URL安全的游标字符串"""
+    raw = json.dumps(list(values), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """解析游标，返回 (排序值, id)，无效时返回None"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded).decode('utf-8'))
+        if not isinstance(sort_value, (str, int, float)):
+            return None
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _get_page_size():
+    """读取每页数量（per_page参数），限制在配置的最大值以内"""
+    default = current_app.config['GUNPLA_PAGE_SIZE']
+    try:
+        per_page = int(request.args.get('per_page', default))
+    except ValueError:
+        per_page = default
+    return max(1, min(per_page, current_app.config['GUNPLA_MAX_PAGE_SIZE']))
+
+
+def _keyset_page(query, sort_column, row_key, after=None, before=None, per_page=50):
+    """
+    按 (sort_column, Gunpla.id) 做游标（keyset）分页
+    每页只取 per_page + 1 行，用 WHERE 条件定位而不是 OFFSET，
+    因此第N页和第1页的开销相同
+
+    参数:
+        query: 基础查询
+        sort_column: 主排序列（升序），id 作为次排序列保证顺序唯一
+        row_key: 从结果行取出 (排序值, id) 的函数，用于生成游标
+        after/before: 已解析的游标
+
+    返回: (rows, next_cursor, prev_cursor)
+    """
+    if before:
+        sort_value, row_id = before
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, Gunpla.id < row_id)
+        )).order_by(sort_column.desc(), Gunpla.id.desc())
+    else:
+        if after:
+            sort_value, row_id = after
+            query = query.filter(or_(
+                sort_column > sort_value,
+                and_(sort_column == sort_value, Gunpla.id > row_id)
+            ))
+        query = query.order_by(sort_column, Gunpla.id)
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if before:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    next_cursor = _encode_cursor(*row_key(rows[-1])) if rows and has_next else None
+    prev_cursor = _encode_cursor(*row_key(rows[0])) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
 def _get_user_list_items(list_type, user_id):
+    # 同时加载关联的高达，避免模板中逐条查询
     if list_type == 'wishlist':
-        return Wishlist.query.filter_by(user_id=user_id).order_by(Wishlist.added_at.desc()).all()
+        return Wishlist.query.options(joinedload(Wishlist.gunpla)).filter_by(
+            user_id=user_id
+        ).order_by(Wishlist.added_at.desc()).all()
     if list_type == 'collection':
-        return Collection.query.filter_by(user_id=user_id).order_by(Collection.purchase_date.desc()).all()
+        return Collection.query.options(joinedload(Collection.gunpla)).filter_by(
+            user_id=user_id
+        ).order_by(Collection.purchase_date.desc()).all()
     return []
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     """用户注册"""
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
@@ -137,7 +193,7 @@ def register():
             db.session.commit()
             
             flash('注册成功！请登录', 'success')
-            return redirect(url_for('login'))
+            return redirect(url_for('.login'))
         except Exception as e:
             db.session.rollback()
             flash(f'注册失败：{str(e)}', 'error')
@@ -145,11 +201,11 @@ def register():
     return render_template('register.html')
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     """用户登录"""
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
@@ -169,90 +225,67 @@ def login():
             
             next_page = request.args.get('next')
             flash(f'欢迎回来，{user.username}！', 'success')
-            return redirect(next_page) if next_page else redirect(url_for('index'))
+            return redirect(next_page) if next_page else redirect(url_for('.index'))
         else:
             flash('用户名或密码错误', 'error')
     
     return render_template('login.html')
 
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     """用户登出"""
     logout_user()
     flash('已成功登出', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('.index'))
 
 
-@app.route('/api/subcategories')
+@bp.route('/api/subcategories')
 def api_subcategories():
     """API: 获取子分类列表"""
     grade = request.args.get('grade', '')
     
-    if grade:
-        # 获取指定级别的子分类
-        subcategories = db.session.query(Gunpla.subcategory).filter(
-            Gunpla.grade == grade,
-            Gunpla.subcategory.isnot(None),
-            Gunpla.subcategory != ''
-        ).distinct().all()
-    else:
-        # 获取所有子分类
-        subcategories = db.session.query(Gunpla.subcategory).filter(
-            Gunpla.subcategory.isnot(None),
-            Gunpla.subcategory != ''
-        ).distinct().all()
-    
-    subcategories = [s[0] for s in subcategories if s[0]]
-    
-    # 排序子分类
-    subcategory_order = ['普通版', '网络限定版', '其他限定版', 'EVANGELION系列', '勇者王系列', 
-                        '参考出品/开发中', 'Unleashed', '定制部件', '综合系列',
-                        'EXtreme', '限定电镀版', '限量版RX-79[G]特别涂装版', '竞赛奖品版',
-                        '水晶版', '彩色电镀版', '圣战士丹拜因', '机动警察', '一年战争版',
-                        '往期未商品化参考出品', '特别版', 'HG 40周年纪念系列 (非HGUC)',
-                        'HG 30周年纪念版 (非HGUC)', 'HG U.C.Hard Graph', 'HG(1990)系列 (非HGUC)',
-                        '往期未商品化/开发中 企划&参考出品', '1/144系列', 'HG创战元宇宙', 'EG GBM',
-                        'SDCS GBM', 'FRS GBM', 'HG高达破坏者 对战记录', 'HG高达创形者',
-                        'HG高达创战者', 'HG高达创战者TRY', 'HG高达创形者Re:RISE',
-                        'HG Customize Campaign', 'HG PETIT\'GGUY', 'HG PETIT\'GGUY 其他限定版', 'HAROPLA',
-                        '装甲核心', 'Porta Nova', 'Porta Nova 拓展配件', 'Cielnova', 'Cielnova 拓展配件',
-                        'Spinatio', 'Spinatio 扩展配件', '水贴', '30MM 自定义材质', '30MM 自定义场景',
-                        '30MM 自定义特效', '特殊限定版', '1/144 泰克普罗托',
-                        '超级机器人系列', '拓展部件', '未商品化往期参考出品']
-    subcategories_sorted = []
-    for sc in subcategory_order:
-        if sc in subcategories:
-            subcategories_sorted.append(sc)
-    for sc in subcategories:
-        if sc not in subcategories_sorted:
-            subcategories_sorted.append(sc)
+    # 从缓存读取（指定级别时只返回该级别的子分类），已按显示顺序排好
+    facets = current_app.extensions['facets'].get(db.session)
+    subcategories = facets.subcategories_for(grade)
+    counts = facets.subcategory_counts_for(grade)
     
-    return jsonify({'subcategories': subcategories_sorted})
+    return jsonify({'subcategories': subcategories, 'counts': counts})
+
+
+@bp.route('/api/search/suggest')
+def api_search_suggest():
+    """API: 搜索框输入联想（进程内n-gram索引）"""
+    q = request.args.get('q', '').strip()
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 10
+    limit = max(1, min(limit, current_app.config['TYPEAHEAD_MAX_RESULTS']))
+    results = current_app.extensions['typeahead'].search(db.session, q, limit=limit) if q else []
+    return jsonify({'query': q, 'results': results})
 
 
-@app.route('/gunpla')
+@bp.route('/gunpla')
+@query_budget(5)
 def gunpla_list():
     """高达列表页面"""
     # 获取查询参数
     search = request.args.get('search', '')
     grade = request.args.get('grade', '')
     subcategory = request.args.get('subcategory', '')
+    sort = 'suan' if request.args.get('sort') == 'suan' else ''
+    suan_min = request.args.get('suan_min', type=float)
+    suan_max = request.args.get('suan_max', type=float)
     
-    # 构建查询
-    query = Gunpla.query
-    
+    # 构建查询（有搜索词时走全文索引，按相关度排序）
+    rank = None
     if search:
-        from sqlalchemy import or_
-        query = query.filter(
-            or_(
-                Gunpla.name_cn.contains(search),
-                Gunpla.name_jp.contains(search),
-                Gunpla.name_en.contains(search),
-                Gunpla.ms_number.contains(search)
-            )
-        )
+        query, rank = search_gunpla(db.session, search, _search_backend(),
+                                   current_app.extensions['typeahead'])
+    else:
+        query = Gunpla.query
     
     if grade:
         query = query.filter(Gunpla.grade == grade)
@@ -260,53 +293,42 @@ def gunpla_list():
     if subcategory:
         query = query.filter(Gunpla.subcategory == subcategory)
     
-    gunpla_list = query.order_by(Gunpla.name_cn).all()
+    # "算"的范围筛选（使用已存储并建索引的suan列）
+    if suan_min is not None:
+        query = query.filter(Gunpla.suan >= suan_min)
+    if suan_max is not None:
+        query = query.filter(Gunpla.suan <= suan_max)
     
-    # 获取所有级别用于筛选
-    grades = db.session.query(Gunpla.grade).distinct().all()
-    grades = [g[0] for g in grades if g[0]]
-    
-    # 获取所有子分类用于筛选
-    # 如果选择了级别，只显示该级别的子分类；否则显示所有子分类
-    if grade:
-        subcategories = db.session.query(Gunpla.subcategory).filter(
-            Gunpla.grade == grade,
-            Gunpla.subcategory.isnot(None),
-            Gunpla.subcategory != ''
-        ).distinct().all()
-        subcategories = [s[0] for s in subcategories if s[0]]
+    # 排序：按"算"从低到高 / 按相关度（搜索时）/ 按名称
+    entity = (lambda row: row[0]) if rank is not None else (lambda row: row)
+    if sort == 'suan':
+        query = query.filter(Gunpla.suan.isnot(None))
+        sort_column = Gunpla.suan
+        row_key = lambda row: (entity(row).suan, entity(row).id)
+    elif rank is not None:
+        sort_column = rank
+        row_key = lambda row: (row[1], row[0].id)
     else:
-        # 没有选择级别时，显示所有子分类
-        subcategories = db.session.query(Gunpla.subcategory).filter(
-            Gunpla.subcategory.isnot(None),
-            Gunpla.subcategory != ''
-        ).distinct().all()
-        subcategories = [s[0] for s in subcategories if s[0]]
+        sort_column = Gunpla.name_cn
+        row_key = lambda g: (g.name_cn, g.id)
+    
+    per_page = _get_page_size()
+    after = _decode_cursor(request.args.get('after'))
+    before = _decode_cursor(request.args.get('before'))
+    # 游标的排序值类型必须与当前排序方式一致（"算"/相关度为数值，名称为字符串）
+    sort_type = str if sort_column is Gunpla.name_cn else (int, float)
+    after = after if after and isinstance(after[0], sort_type) else None
+    before = before if before and isinstance(before[0], sort_type) else None
+    rows, next_cursor, prev_cursor = _keyset_page(
+        query, sort_column, row_key, after=after, before=before, per_page=per_page
+    )
+    gunpla_list = [entity(row) for row in rows]
     
-    # 排序子分类，让"普通版"排在前面
-    subcategory_order = ['普通版', '网络限定版', '其他限定版', 'EVANGELION系列', '勇者王系列', 
-                        '参考出品/开发中', 'Unleashed', '定制部件', '综合系列',
-                        'EXtreme', '限定电镀版', '限量版RX-79[G]特别涂装版', '竞赛奖品版',
-                        '水晶版', '彩色电镀版', '圣战士丹拜因', '机动警察', '一年战争版',
-                        '往期未商品化参考出品', '特别版', 'HG 40周年纪念系列 (非HGUC)',
-                        'HG 30周年纪念版 (非HGUC)', 'HG U.C.Hard Graph', 'HG(1990)系列 (非HGUC)',
-                        '往期未商品化/开发中 企划&参考出品', '1/144系列', 'HG创战元宇宙', 'EG GBM',
-                        'SDCS GBM', 'FRS GBM', 'HG高达破坏者 对战记录', 'HG高达创形者',
-                        'HG高达创战者', 'HG高达创战者TRY', 'HG高达创形者Re:RISE',
-                        'HG Customize Campaign', 'HG PETIT\'GGUY', 'HG PETIT\'GGUY 其他限定版', 'HAROPLA',
-                        '装甲核心', 'Porta Nova', 'Porta Nova 拓展配件', 'Cielnova', 'Cielnova 拓展配件',
-                        'Spinatio', 'Spinatio 扩展配件', '水贴', '30MM 自定义材质', '30MM 自定义场景',
-                        '30MM 自定义特效', '特殊限定版', '1/144 泰克普罗托',
-                        '超级机器人系列', '拓展部件', '未商品化往期参考出品']
-    subcategories_sorted = []
-    for sc in subcategory_order:
-        if sc in subcategories:
-            subcategories_sorted.append(sc)
-    # 添加其他未在排序列表中的子分类
-    for sc in subcategories:
-        if sc not in subcategories_sorted:
-            subcategories_sorted.append(sc)
-    subcategories = subcategories_sorted
+    # 获取级别和子分类用于筛选（缓存，已按显示顺序排好）
+    # 如果选择了级别，只显示该级别的子分类；否则显示所有子分类
+    facets = current_app.extensions['facets'].get(db.session)
+    grades = facets.grades
+    subcategories = facets.subcategories_for(grade)
     
     return render_template('gunpla_list.html', 
                          gunpla_list=gunpla_list,
@@ -314,10 +336,16 @@ def gunpla_list():
                          subcategories=subcategories,
                          search=search,
                          selected_grade=grade,
-                         selected_subcategory=subcategory)
+                         selected_subcategory=subcategory,
+                         sort=sort,
+                         suan_min=suan_min,
+                         suan_max=suan_max,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
+                         per_page=per_page)
 
 
-@app.route('/gunpla/add', methods=['GET', 'POST'])
+@bp.route('/gunpla/add', methods=['GET', 'POST'])
 def gunpla_add():
     """添加高达"""
     if request.method == 'POST':
@@ -339,7 +367,10 @@ def gunpla_add():
             db.session.add(gunpla)
             db.session.commit()
             flash('高达添加成功！', 'success')
-            return redirect(url_for('gunpla_list'))
+            return redirect(url_for('.gunpla_list'))
+        except IntegrityError:
+            db.session.rollback()
+            flash('添加失败：该级别下已有同名高达', 'error')
         except Exception as e:
             db.session.rollback()
             flash(f'添加失败：{str(e)}', 'error')
@@ -348,32 +379,79 @@ def gunpla_add():
     return render_template('gunpla_add.html', grades=grades)
 
 
-@app.route('/gunpla/<int:gunpla_id>')
+@bp.route('/gunpla/<int:gunpla_id>')
+@query_budget(5)
 def gunpla_detail(gunpla_id):
     """高达详情页面"""
     gunpla = Gunpla.query.get_or_404(gunpla_id)
     
-    # 检查是否在想要列表或已购买列表
-    in_wishlist = Wishlist.query.filter_by(gunpla_id=gunpla_id).first() is not None
-    in_collection = Collection.query.filter_by(gunpla_id=gunpla_id).first() is not None
+    # 检查是否在当前用户的想要列表或已购买列表（未登录时为公共列表，与添加时的判断一致），
+    # 按 (user_id, gunpla_id) 索引查找
+    user_id = current_user.id if current_user.is_authenticated else None
+    in_wishlist = Wishlist.query.filter_by(user_id=user_id, gunpla_id=gunpla_id).first() is not None
+    in_collection = Collection.query.filter_by(user_id=user_id, gunpla_id=gunpla_id).first() is not None
+    
+    # 有价格历史的平台（周汇总表行数少），用于价格走势图
+    platforms = [row.platform for row in db.session.query(PriceHistoryWeekly.platform)
+                 .filter(PriceHistoryWeekly.gunpla_id == gunpla_id).distinct().order_by(PriceHistoryWeekly.platform)]
     
     return render_template('gunpla_detail.html', 
                          gunpla=gunpla,
                          in_wishlist=in_wishlist,
                          in_collection=in_collection,
-                         jpy_rate=app.config['JPY_TO_CNY_RATE'])
-
-
-@app.route('/wishlist')
+                         price_platforms=platforms,
+                         jpy_rate=current_app.config['JPY_TO_CNY_RATE'])
+
+
+@bp.route('/api/gunpla/<int:gunpla_id>/price-history')
+@query_budget(3)
+def api_price_history(gunpla_id):
+    """
+    API: 价格走势（读日/周汇总表）
+    参数: resolution=auto|day|week，platform（可选），since=YYYY-MM-DD（可选）
+    """
+    Gunpla.query.get_or_404(gunpla_id)
+    resolution = request.args.get('resolution', 'auto')
+    platform = request.args.get('platform', '').strip() or None
+    since = request.args.get('since', '').strip()
+    try:
+        since = date.fromisoformat(since) if since else None
+        resolution, series = price_series(db.session, gunpla_id, resolution, platform=platform, since=since)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'gunpla_id': gunpla_id, 'resolution': resolution, 'series': series})
+
+
+@bp.route('/api/gunpla/<int:gunpla_id>/price-chart')
+@query_budget(3)
+def api_price_chart(gunpla_id):
+    """
+    API: 价格走势图，原始价格点按 LTTB 降采样到固定点数（见 price_chart.py）
+    参数: platform（必填），points（默认 PRICE_CHART_POINTS）
+    """
+    Gunpla.query.get_or_404(gunpla_id)
+    platform = request.args.get('platform', '').strip()
+    if not platform:
+        return jsonify({'error': '缺少 platform 参数'}), 400
+    points = request.args.get('points', current_app.config['PRICE_CHART_POINTS'], type=int)
+    points = max(3, min(points, current_app.config['PRICE_CHART_MAX_POINTS']))
+    chart = current_app.extensions['price_chart'].get(db.session, gunpla_id, platform, points)
+    return jsonify({'gunpla_id': gunpla_id, **chart})
+
+
+@bp.route('/wishlist')
+@query_budget(4)
 def wishlist():
     """想要列表"""
     # 如果用户已登录，只显示该用户的列表；否则显示所有公共列表
     if current_user.is_authenticated:
-        items = Wishlist.query.filter(
+        items = Wishlist.query.options(joinedload(Wishlist.gunpla)).filter(
             (Wishlist.user_id == current_user.id) | (Wishlist.user_id.is_(None))
         ).order_by(Wishlist.added_at.desc()).all()
     else:
-        items = Wishlist.query.filter_by(user_id=None).order_by(Wishlist.added_at.desc()).all()
+        items = Wishlist.query.options(joinedload(Wishlist.gunpla)).filter_by(
+            user_id=None
+        ).order_by(Wishlist.added_at.desc()).all()
     share_link = None
     if current_user.is_authenticated:
         share_link = ShareLink.query.filter_by(
@@ -384,16 +462,19 @@ def wishlist():
     return render_template('wishlist.html', items=items, share_link=share_link)
 
 
-@app.route('/collection')
+@bp.route('/collection')
+@query_budget(4)
 def collection():
     """已购买列表"""
     # 如果用户已登录，只显示该用户的列表；否则显示所有公共列表
     if current_user.is_authenticated:
-        items = Collection.query.filter(
+        items = Collection.query.options(joinedload(Collection.gunpla)).filter(
             (Collection.user_id == current_user.id) | (Collection.user_id.is_(None))
         ).order_by(Collection.purchase_date.desc()).all()
     else:
-        items = Collection.query.filter_by(user_id=None).order_by(Collection.purchase_date.desc()).all()
+        items = Collection.query.options(joinedload(Collection.gunpla)).filter_by(
+            user_id=None
+        ).order_by(Collection.purchase_date.desc()).all()
     share_link = None
     if current_user.is_authenticated:
         share_link = ShareLink.query.filter_by(
@@ -404,7 +485,7 @@ def collection():
     return render_template('collection.html', items=items, share_link=share_link)
 
 
-@app.route('/wishlist/add', methods=['POST'])
+@bp.route('/wishlist/add', methods=['POST'])
 def wishlist_add():
     """添加到想要列表"""
     gunpla_id = request.form.get('gunpla_id')
@@ -435,10 +516,10 @@ def wishlist_add():
                 flash('已添加到想要列表！', 'success')
             else:
                 flash('已经在想要列表中了！', 'info')
-    return redirect(request.referrer or url_for('gunpla_list'))
+    return redirect(request.referrer or url_for('.gunpla_list'))
 
 
-@app.route('/wishlist/remove', methods=['POST'])
+@bp.route('/wishlist/remove', methods=['POST'])
 def wishlist_remove():
     """从想要列表移除"""
     item_id = request.form.get('item_id')
@@ -460,10 +541,10 @@ def wishlist_remove():
                     flash('已从想要列表移除！', 'success')
                 else:
                     flash('无权删除此项目', 'error')
-    return redirect(url_for('wishlist'))
+    return redirect(url_for('.wishlist'))
 
 
-@app.route('/collection/add', methods=['POST'])
+@bp.route('/collection/add', methods=['POST'])
 def collection_add():
     """添加到已购买列表"""
     gunpla_id = request.form.get('gunpla_id')
@@ -494,10 +575,10 @@ def collection_add():
                 flash('已添加到已购买列表！', 'success')
             else:
                 flash('已经在已购买列表中了！', 'info')
-    return redirect(request.referrer or url_for('gunpla_list'))
+    return redirect(request.referrer or url_for('.gunpla_list'))
 
 
-@app.route('/collection/remove', methods=['POST'])
+@bp.route('/collection/remove', methods=['POST'])
 def collection_remove():
     """从已购买列表移除"""
     item_id = request.form.get('item_id')
@@ -519,16 +600,17 @@ def collection_remove():
                     flash('已从已购买列表移除！', 'success')
                 else:
                     flash('无权删除此项目', 'error')
-    return redirect(url_for('collection'))
+    return redirect(url_for('.collection'))
 
 
-@app.route('/export/<list_type>')
+@bp.route('/export/<list_type>')
+@query_budget(3)
 @login_required
 def export_list(list_type):
     """导出想要/已购买列表为CSV"""
     if list_type not in ['wishlist', 'collection']:
         flash('无效的导出类型', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
 
     items = _get_user_list_items(list_type, current_user.id)
 
@@ -574,18 +656,18 @@ def export_list(list_type):
     return response
 
 
-@app.route('/import/<list_type>', methods=['POST'])
+@bp.route('/import/<list_type>', methods=['POST'])
 @login_required
 def import_list(list_type):
     """从CSV导入想要/已购买列表"""
     if list_type not in ['wishlist', 'collection']:
         flash('无效的导入类型', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
 
     file = request.files.get('file')
     if not file or file.filename == '':
         flash('请选择要导入的CSV文件', 'error')
-        return redirect(url_for('wishlist' if list_type == 'wishlist' else 'collection'))
+        return redirect(url_for('.wishlist' if list_type == 'wishlist' else '.collection'))
 
     try:
         content = file.stream.read().decode('utf-8-sig')
@@ -654,16 +736,16 @@ def import_list(list_type):
         db.session.rollback()
         flash(f'导入失败：{str(e)}', 'error')
 
-    return redirect(url_for('wishlist' if list_type == 'wishlist' else 'collection'))
+    return redirect(url_for('.wishlist' if list_type == 'wishlist' else '.collection'))
 
 
-@app.route('/share/create/<list_type>', methods=['POST'])
+@bp.route('/share/create/<list_type>', methods=['POST'])
 @login_required
 def share_create(list_type):
     """创建分享链接"""
     if list_type not in ['wishlist', 'collection']:
         flash('无效的分享类型', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
 
     existing_links = ShareLink.query.filter_by(
         user_id=current_user.id,
@@ -684,16 +766,16 @@ def share_create(list_type):
     db.session.commit()
 
     flash('分享链接已生成', 'success')
-    return redirect(url_for('wishlist' if list_type == 'wishlist' else 'collection'))
+    return redirect(url_for('.wishlist' if list_type == 'wishlist' else '.collection'))
 
 
-@app.route('/share/revoke/<list_type>', methods=['POST'])
+@bp.route('/share/revoke/<list_type>', methods=['POST'])
 @login_required
 def share_revoke(list_type):
     """撤销分享链接"""
     if list_type not in ['wishlist', 'collection']:
         flash('无效的分享类型', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
 
     existing_links = ShareLink.query.filter_by(
         user_id=current_user.id,
@@ -705,10 +787,11 @@ def share_revoke(list_type):
 
     db.session.commit()
     flash('分享链接已撤销', 'success')
-    return redirect(url_for('wishlist' if list_type == 'wishlist' else 'collection'))
+    return redirect(url_for('.wishlist' if list_type == 'wishlist' else '.collection'))
 
 
-@app.route('/share/<token>')
+@bp.route('/share/<token>')
+@query_budget(4)
 def share_view(token):
     """查看分享列表"""
     share_link = ShareLink.query.filter_by(token=token, is_active=True).first_or_404()
@@ -717,14 +800,14 @@ def share_view(token):
     return render_template('share_list.html', share_link=share_link, items=items, owner=owner)
 
 
-@app.route('/coupons')
+@bp.route('/coupons')
 def coupons():
     """优惠券列表"""
     coupon_list = Coupon.query.order_by(Coupon.created_at.desc()).all()
     return render_template('coupons.html', coupons=coupon_list)
 
 
-@app.route('/coupons/add', methods=['GET', 'POST'])
+@bp.route('/coupons/add', methods=['GET', 'POST'])
 def coupon_add():
     """添加优惠券"""
     if request.method == 'POST':
@@ -749,7 +832,7 @@ def coupon_add():
             db.session.add(coupon)
             db.session.commit()
             flash('优惠券添加成功！', 'success')
-            return redirect(url_for('coupons'))
+            return redirect(url_for('.coupons'))
         except Exception as e:
             db.session.rollback()
             flash(f'添加失败：{str(e)}', 'error')
@@ -758,31 +841,136 @@ def coupon_add():
     return render_template('coupon_add.html', platforms=platforms)
 
 
-@app.route('/coupons/<int:coupon_id>/analyze')
+@bp.route('/coupons/<int:coupon_id>/analyze')
+@query_budget(3)
 def coupon_analyze(coupon_id):
-    """优惠券分析"""
+    """优惠券分析（只分析当前用户可见的想要列表）"""
     coupon = Coupon.query.get_or_404(coupon_id)
-    wishlist_items = Wishlist.query.all()
+    user_id = current_user.id if current_user.is_authenticated else None
     
-    # 分析每个想要列表中的高达
-    analyses = []
-    for item in wishlist_items:
-        gunpla = item.gunpla
-        if gunpla.price_cn_market:
-            analysis = coupon.calculate_discount(gunpla.price_cn_market)
-            analyses.append({
-                'gunpla': gunpla,
-                'analysis': analysis,
-                'original_price': gunpla.price_cn_market
-            })
-    
-    # 按节省金额排序
-    analyses.sort(key=lambda x: x['analysis']['savings'], reverse=True)
+    # 一次查询读出价格，批量计算并按节省金额排序
+    analyses = analyze_wishlist(db.session, coupon, user_id)
     
     return render_template('coupon_analyze.html', coupon=coupon, analyses=analyses)
 
 
+@bp.route('/coupons/optimize')
+@query_budget(3)
+def coupon_optimize():
+    """多张优惠券凑单优化（当前有效的优惠券 × 当前用户可见的想要列表）"""
+    time_budget = current_app.config['COUPON_OPTIMIZE_TIME_BUDGET']
+    budget_ms = request.args.get('budget', type=int)
+    if budget_ms and budget_ms > 0:
+        time_budget = min(budget_ms / 1000, current_app.config['COUPON_OPTIMIZE_MAX_TIME_BUDGET'])
+    
+    user_id = current_user.id if current_user.is_authenticated else None
+    plan = optimize_wishlist(db.session, Coupon.query.all(), user_id, time_budget=time_budget)
+    
+    return render_template('coupon_optimize.html', plan=plan)
+
+
+# ---- 应用工厂 ----
+
+def init_db(app, snapshot=True):
+    """
+    创建表和搜索索引（幂等），汇率变化时批量重算"算"
+    snapshot 为 True 且 SQLite 数据库文件还不存在时先复制种子快照（见 seed_loader.py）
+    """
+    with app.app_context():
+        if snapshot:
+            seed_report = restore_snapshot(app.config['SQLALCHEMY_DATABASE_URI'], app.config['SEED_SNAPSHOT_PATH'])
+            if seed_report is not None:
+                print(f"Seeded Gunpla rows: {seed_report}")
+        db.create_all()
+        # 创建全文搜索索引（需在导入种子数据之前，以便触发器同步）
+        app.config['SEARCH_BACKEND'] = install_search_index(db)
+        try:
+            if sync_suan_rate(db.session, app.config['JPY_TO_CNY_RATE']):
+                print(f"Recomputed suan at JPY_TO_CNY_RATE={app.config['JPY_TO_CNY_RATE']}")
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Suan sync failed (run scripts/migrations/add_suan_column.py): {e}")
+
+
+def seed_db(app):
+    """gunpla 表为空时导入种子 CSV，返回 SeedReport（没有导入时为 None）"""
+    with app.app_context():
+        if db.session.query(Gunpla.id).first() is not None or not os.path.exists(SEED_PATH):
+            return None
+        try:
+            seed_report = load_seed(
+                db.session, batch_size=app.config['SEED_BATCH_SIZE'],
+                jpy_to_cny_rate=app.config['JPY_TO_CNY_RATE'],
+            )
+        except Exception as e:
+            db.session.rollback()
+            print(f"Seed failed: {e}")
+            raise
+        print(f"Seeded Gunpla rows: {seed_report}")
+        return seed_report
+
+
+@click.command('db-init')
+@click.option('--no-snapshot', is_flag=True, help='不使用种子快照')
+@with_appcontext
+def db_init_command(no_snapshot):
+    """创建表和搜索索引（部署时运行一次）"""
+    init_db(current_app._get_current_object(), snapshot=not no_snapshot)
+
+
+@click.command('seed')
+@with_appcontext
+def seed_command():
+    """数据库为空时导入 data/seed_gunpla.csv"""
+    if seed_db(current_app._get_current_object()) is None:
+        print('gunpla 表已有数据，跳过导入')
+
+
+def create_app(test_config=None):
+    """
+    创建应用：只读取配置、注册扩展和路由，不访问数据库
+    建表和导入种子数据由命令行完成（flask --app app db-init / flask --app app seed），
+    多个 worker 启动时不会重复执行，也不会争抢导入
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if test_config:
+        app.config.update(test_config)
+
+    # 初始化数据库
+    db.init_app(app)
+
+    # 每个请求的查询数预算检查
+    init_query_budget(app)
+
+    login_manager.init_app(app)
+
+    # 输入联想索引（首次查询时从数据库构建）
+    typeahead_index = TypeaheadIndex(refresh_interval=app.config['TYPEAHEAD_REFRESH_SECONDS'])
+    typeahead_index.listen()
+    app.extensions['typeahead'] = typeahead_index
+
+    # 筛选项缓存（级别、子分类及数量）
+    facet_cache = FacetCache(ttl=app.config['FACET_CACHE_TTL'])
+    facet_cache.listen()
+    app.extensions['facets'] = facet_cache
+
+    # 价格走势图降采样结果缓存
+    app.extensions['price_chart'] = PriceChartCache(max_entries=app.config['PRICE_CHART_CACHE_SIZE'])
+
+    app.register_blueprint(bp)
+    app.cli.add_command(db_init_command)
+    app.cli.add_command(seed_command)
+    return app
+
+
+app = create_app()
+
+
 if __name__ == '__main__':
+    # 本地开发：直接运行时顺便建表和导入种子数据
+    init_db(app)
+    seed_db(app)
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', '1') == '1'
     app.run(debug=debug, host='0.0.0.0', port=port)
@@ -0,0 +1,136 @@
+"""
+高达数据批量写入（爬虫结果入库）
+
+以 (name_cn, grade) 唯一索引为冲突键做集合式 upsert：
+- 一次查询读出涉及级别的已有记录，在内存中比对，没有变化的行不写
+- 其余行按批生成 INSERT ... ON CONFLICT (name_cn, grade) DO UPDATE（SQLite 和 PostgreSQL 都支持），
+  1000 条记录只需一两条语句，不再逐行查询和提交
+- 语句绕过ORM事件，"算"和 updated_at 在语句中一并写入
+"""
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Gunpla, calculate_suan, suan_expression
+
+KEY_FIELDS = ('name_cn', 'grade')
+
+# 可以由爬虫写入的字段
+FIELDS = (
+    'name_jp', 'name_en', 'ms_number', 'series', 'subcategory',
+    'price_jp_msrp', 'price_jp_market',
+    'price_us_msrp', 'price_us_market',
+    'price_cn_msrp', 'price_cn_market',
+    'source_url', 'last_crawled_at', 'content_hash',
+)
+
+# 抓取记录字段：总是以本次爬取为准（不受 overwrite=False 影响）
+CRAWL_FIELDS = ('source_url', 'last_crawled_at', 'content_hash')
+
+# 每条 INSERT 的行数（每行约20个参数，远低于SQLite的参数上限）
+BATCH_SIZE = 500
+
+_INSERT = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def _merge(old, new, overwrite):
+    """overwrite 时新值优先，否则只补全空值"""
+    if overwrite:
+        return old if new is None else new
+    return new if old is None else old
+
+
+def _normalize(rows):
+    """清理输入：去掉空名称，空字符串视为未提供；同一键出现多次时合并（后出现的优先）"""
+    merged = {}
+    for row in rows:
+        name = (row.get('name_cn') or '').strip()
+        grade = (row.get('grade') or '').strip()
+        if not name or not grade:
+            continue
+        values = {field: row.get(field) if row.get(field) not in ('', 0) else None for field in FIELDS}
+        key = (name, grade)
+        if key in merged:
+            previous = merged[key]
+            values = {field: _merge(previous[field], values[field], True) for field in FIELDS}
+        merged[key] = values
+    return merged
+
+
+def upsert_gunpla(session, rows, overwrite=True, batch_size=BATCH_SIZE, jpy_to_cny_rate=None):
+    """
+    批量新增或更新高达记录（不提交事务，由调用方提交）
+
+    参数:
+        rows: [dict]，必须有 name_cn 和 grade，其余字段见 FIELDS，缺失或为空表示不提供
+        overwrite: True 时提供的值覆盖已有值；False 时只补全已有记录中为空的字段；
+            也可以是字段名集合，只有这些字段覆盖，其余字段补全（CRAWL_FIELDS 总是覆盖）
+        jpy_to_cny_rate: 计算"算"的汇率，默认使用配置
+
+    返回:
+        (新增数, 更新数, 未变化数)
+    """
+    incoming = _normalize(rows)
+    if not incoming:
+        return 0, 0, 0
+    if isinstance(overwrite, bool):
+        overwrite = set(FIELDS) if overwrite else set(CRAWL_FIELDS)
+    else:
+        overwrite = set(overwrite) | set(CRAWL_FIELDS)
+
+    grades = sorted({grade for _, grade in incoming})
+    existing = {
+        (row.name_cn, row.grade): row
+        for row in session.query(
+            Gunpla.name_cn, Gunpla.grade, *(getattr(Gunpla, field) for field in FIELDS)
+        ).filter(Gunpla.grade.in_(grades))
+    }
+
+    now = datetime.utcnow()
+    pending = []
+    inserted = updated = unchanged = 0
+    for (name, grade), values in incoming.items():
+        old = existing.get((name, grade))
+        if old is None:
+            inserted += 1
+        elif all(_merge(getattr(old, field), values[field], field in overwrite) == getattr(old, field)
+                 for field in FIELDS):
+            unchanged += 1
+            continue
+        else:
+            updated += 1
+        pending.append(dict(
+            values,
+            name_cn=name,
+            grade=grade,
+            suan=calculate_suan(values['price_jp_msrp'], values['price_cn_market'], jpy_to_cny_rate),
+            created_at=now,
+            updated_at=now,
+        ))
+
+    dialect = session.get_bind().dialect.name
+    if dialect not in _INSERT:
+        raise NotImplementedError(f'不支持的数据库: {dialect}')
+    insert = _INSERT[dialect]
+    table = Gunpla.__table__
+    for start in range(0, len(pending), batch_size):
+        stmt = insert(table).values(pending[start:start + batch_size])
+        excluded = stmt.excluded
+        merged = {
+            field: func.coalesce(excluded[field], table.c[field]) if field in overwrite
+            else func.coalesce(table.c[field], excluded[field])
+            for field in FIELDS
+        }
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=list(KEY_FIELDS),
+            set_=dict(
+                merged,
+                suan=suan_expression(merged['price_jp_msrp'], merged['price_cn_market'], jpy_to_cny_rate),
+                updated_at=excluded.updated_at,
+            ),
+        ))
+    return inserted, updated, unchanged
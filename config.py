@@ -19,6 +19,60 @@ class Config:
     SQLALCHEMY_DATABASE_URI = database_url or \
         'sqlite:///' + os.path.join(basedir, 'gunpla.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # 分页配置（高达列表使用游标分页）
+    GUNPLA_PAGE_SIZE = int(os.environ.get('GUNPLA_PAGE_SIZE', 50))
+    GUNPLA_MAX_PAGE_SIZE = 200
+
+    # 输入联想索引：检查其他进程（爬虫）写入的间隔（秒）
+    TYPEAHEAD_REFRESH_SECONDS = 30
+    TYPEAHEAD_MAX_RESULTS = 20
+
+    # 筛选项缓存的有效期（秒），用于感知其他进程的写入
+    FACET_CACHE_TTL = 300
+
+    # 优惠券凑单优化的搜索时间预算（秒），请求参数 budget（毫秒）不能超过上限
+    COUPON_OPTIMIZE_TIME_BUDGET = 0.5
+    COUPON_OPTIMIZE_MAX_TIME_BUDGET = 3.0
+
+    # 爬虫抓取：每个主机每秒请求数、并发数、失败重试次数
+    SCRAPER_REQUESTS_PER_SECOND = float(os.environ.get('SCRAPER_REQUESTS_PER_SECOND', 2.0))
+    SCRAPER_CONCURRENCY = int(os.environ.get('SCRAPER_CONCURRENCY', 4))
+    SCRAPER_MAX_RETRIES = 3
+
+    # 详情页解析进程数（默认CPU核数，0 表示在抓取进程内解析）
+    SCRAPER_PARSE_WORKERS = int(os.environ.get('SCRAPER_PARSE_WORKERS', os.cpu_count() or 1))
+
+    # 爬虫页面缓存目录（设为空字符串则不缓存）和各类页面的有效期（秒）：
+    # 级别列表页经常上新，详情页的定价很少变化
+    PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR', os.path.join(basedir, '.cache', 'pages'))
+    PAGE_CACHE_TTL = {
+        'series': 6 * 3600,
+        'detail': 30 * 24 * 3600,
+    }
+
+    # 增量爬取：详情页超过这么多天没有抓取的记录会重新抓取
+    CRAWL_MAX_AGE_DAYS = int(os.environ.get('CRAWL_MAX_AGE_DAYS', 30))
+
+    # 种子数据：每批写入的行数；SQLite 数据库不存在时优先复制的快照（python seed_loader.py snapshot 生成，
+    # 设为空字符串则不使用）
+    SEED_BATCH_SIZE = int(os.environ.get('SEED_BATCH_SIZE', 1000))
+    SEED_SNAPSHOT_PATH = os.environ.get('SEED_SNAPSHOT_PATH', os.path.join(basedir, 'data', 'seed_gunpla.sqlite'))
+
+    # 爬取检查点（crawl_frontier.py）：中断的爬取重新运行时从这里继续（设为空字符串则不记录）；
+    # 超过 CRAWL_CHECKPOINT_MAX_AGE_HOURS 小时的检查点不再使用
+    CRAWL_FRONTIER_PATH = os.environ.get('CRAWL_FRONTIER_PATH', os.path.join(basedir, '.cache', 'frontier.db'))
+    CRAWL_CHECKPOINT_MAX_AGE_HOURS = int(os.environ.get('CRAWL_CHECKPOINT_MAX_AGE_HOURS', 48))
+
+    # 价格历史（price_history.py）：每批写入的价格点数；
+    # 价格走势接口 resolution=auto 时，跨度不超过这么多天用日汇总，否则用周汇总
+    PRICE_HISTORY_BATCH_SIZE = int(os.environ.get('PRICE_HISTORY_BATCH_SIZE', 1000))
+    PRICE_HISTORY_DAILY_MAX_DAYS = 180
+
+    # 价格走势图（price_chart.py）：降采样后的默认/最大点数，缓存的 (高达, 平台, 点数) 组合数
+    PRICE_CHART_POINTS = 300
+    PRICE_CHART_MAX_POINTS = 2000
+    PRICE_CHART_CACHE_SIZE = 256
     
     # 汇率配置（可根据需要调整）
     JPY_TO_CNY_RATE = 20.0  # 1人民币 = 20日元（示例汇率，建议使用实时汇率API）
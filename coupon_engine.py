@@ -0,0 +1,109 @@
+"""
+优惠券批量计算引擎（NumPy向量化）
+
+把想要列表的价格一次性读入数组，对多张优惠券的规则（百分比/固定金额、
+最高减免、最低购买金额）做数组运算，得到 优惠券 × 商品 的节省金额矩阵
+"""
+import numpy as np
+from sqlalchemy import or_
+
+from models import Gunpla, Wishlist
+
+
+def load_wishlist_prices(session, user_id=None):
+    """
+    一次查询读取想要列表中有中国市场价的高达
+    范围与想要列表页面一致：登录用户为本人列表 + 公共列表，未登录为公共列表
+
+    返回:
+        (rows, prices) - rows 为 (id, name_cn, grade, price_cn_market) 行，
+        prices 为对应的 float64 数组
+    """
+    if user_id is not None:
+        scope = or_(Wishlist.user_id == user_id, Wishlist.user_id.is_(None))
+    else:
+        scope = Wishlist.user_id.is_(None)
+    rows = session.query(
+        Gunpla.id, Gunpla.name_cn, Gunpla.grade, Gunpla.price_cn_market
+    ).join(Wishlist, Wishlist.gunpla_id == Gunpla.id).filter(
+        scope, Gunpla.price_cn_market > 0
+    ).all()
+    prices = np.fromiter((row.price_cn_market for row in rows), dtype=np.float64, count=len(rows))
+    return rows, prices
+
+
+def coupon_arrays(coupons):
+    """把优惠券规则转成数组（缺省的最高减免为无穷大，最低购买为0）"""
+    return {
+        'is_percentage': np.array([c.discount_type == 'percentage' for c in coupons], dtype=bool),
+        'value': np.array([c.discount_value or 0.0 for c in coupons], dtype=np.float64),
+        'max_discount': np.array(
+            [c.max_discount if c.max_discount else np.inf for c in coupons], dtype=np.float64
+        ),
+        'min_purchase': np.array([c.min_purchase or 0.0 for c in coupons], dtype=np.float64),
+    }
+
+
+def savings_matrix(prices, coupons):
+    """
+    计算每张优惠券用于每件商品（单独下单）时的节省金额
+
+    参数:
+        prices: 商品价格数组，形状 (n,)
+        coupons: 优惠券列表（长度 m）
+
+    返回:
+        形状 (m, n) 的节省金额矩阵；不满足最低购买金额时为0，且不超过商品价格
+    """
+    rules = coupon_arrays(coupons)
+    prices = np.asarray(prices, dtype=np.float64)[np.newaxis, :]
+    value = rules['value'][:, np.newaxis]
+    discount = np.where(
+        rules['is_percentage'][:, np.newaxis],
+        prices * (value / 100),
+        value,
+    )
+    discount = np.minimum(discount, rules['max_discount'][:, np.newaxis])
+    discount = np.where(prices >= rules['min_purchase'][:, np.newaxis], discount, 0.0)
+    return np.minimum(discount, prices)
+
+
+def analyze(prices, coupon):
+    """
+    单张优惠券的分析结果（按节省金额从高到低）
+
+    返回:
+        (order, final_price, savings, discount_rate)，均为数组，order 为排序后的下标
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    savings = savings_matrix(prices, [coupon])[0]
+    final_price = prices - savings
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discount_rate = np.where(prices > 0, savings / prices * 100, 0.0)
+    order = np.argsort(-savings, kind='stable')
+    return order, np.round(final_price, 2), np.round(savings, 2), np.round(discount_rate, 2)
+
+
+def analyze_wishlist(session, coupon, user_id=None):
+    """
+    分析优惠券对想要列表中每件高达的优惠效果，供模板使用
+
+    返回:
+        按节省金额排序的列表，每项包含 gunpla / analysis / original_price
+    """
+    rows, prices = load_wishlist_prices(session, user_id)
+    if not rows:
+        return []
+    order, final_price, savings, discount_rate = analyze(prices, coupon)
+    return [
+        {
+            'gunpla': rows[i],
+            'analysis': {
+                'final_price': float(final_price[i]),
+                'savings': float(savings[i]),
+                'discount_rate': float(discount_rate[i]),
+            },
+            'original_price': float(prices[i]),
+        }
+        for i in order.tolist()
+    ]
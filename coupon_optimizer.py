@@ -0,0 +1,417 @@
+"""
+多张优惠券的整单凑单优化
+
+把想要列表中的高达拆分成若干订单，每个订单在优惠券所属平台下单并使用一张优惠券
+（每张券最多用一次），订单金额需达到券的最低购买金额，目标是总节省金额最大。
+
+- 金额统一换算成整数（分，再除以所有价格的最大公约数），避免浮点误差
+- 初始解：逐张券用子集和DP（整数位集）凑出刚好达到门槛/封顶金额的订单，
+  每轮选"节省金额/订单金额"最高的券
+- 分支定界：按价格从高到低把每件商品放入某个订单，上界为各券收益函数凹包络上的
+  分数背包；同规格、同当前金额的订单以及已封顶的订单视为等价，只搜索一个
+- 时间预算同时约束初始解和搜索：初始解超时后改用按金额从大到小的快速凑单，
+  不再搜索，返回目前找到的最好方案（optimal=False）
+- 搜索使用显式栈，深度等于商品数，不受 Python 递归深度限制
+"""
+import math
+import time
+from functools import reduce
+
+from coupon_engine import load_wishlist_prices
+
+# 节省金额（分）的比较容差
+_EPSILON = 0.5
+
+# 每搜索这么多个节点检查一次时间
+_CLOCK_EVERY = 256
+
+# 子集和DP每处理这么多件商品检查一次时间
+_DP_CLOCK_EVERY = 16
+
+
+class _Timeout(Exception):
+    """初始解的计算超过时间预算"""
+
+
+class CouponSpec:
+    """
+    优惠券规则（金额单位为 unit 分）
+    节省金额 = min(rate × 订单金额, cap)，订单金额未达到 min_units 时为0
+    固定金额券视为 rate=1（减免不超过订单金额）
+    """
+    __slots__ = ('coupon', 'unit', 'rate', 'cap', 'min_units', 'full_units', 'key')
+
+    def __init__(self, coupon, unit):
+        self.coupon = coupon
+        self.unit = unit
+        value = max(coupon.discount_value or 0.0, 0.0)
+        if coupon.discount_type == 'percentage':
+            self.rate = min(value / 100, 1.0)
+            self.cap = coupon.max_discount * 100 if coupon.max_discount else math.inf
+        else:
+            self.rate = 1.0
+            self.cap = value * 100
+        self.min_units = math.ceil(round((coupon.min_purchase or 0.0) * 100) / unit)
+        if self.rate <= 0 or self.cap <= 0:
+            self.full_units = 0
+        elif math.isinf(self.cap):
+            self.full_units = math.inf
+        else:
+            # 达到最高减免所需的最小订单金额
+            self.full_units = max(self.min_units, math.ceil(self.cap / (self.rate * unit) - 1e-9))
+        self.key = (self.rate, self.cap, self.min_units)
+
+    @property
+    def useful(self):
+        return self.full_units != 0
+
+    def savings(self, total):
+        """订单金额为 total 时的节省金额（分）"""
+        if total <= 0 or total < self.min_units:
+            return 0.0
+        return min(self.rate * total * self.unit, self.cap)
+
+    def pieces(self, total):
+        """
+        从当前订单金额出发，收益函数凹包络的线段 [(单位收益, 长度)]
+        第一段为凑到门槛，第二段为门槛之后按比例增长到封顶
+        """
+        if total >= self.full_units:
+            return []
+        result = []
+        start = total
+        if total < self.min_units:
+            gain = self.savings(self.min_units)
+            result.append((gain / (self.min_units - total), self.min_units - total))
+            start = self.min_units
+        if self.full_units > start:
+            result.append((self.rate * self.unit, self.full_units - start))
+        return result
+
+
+def _subset_for(sizes, target, deadline=None):
+    """
+    子集和DP（Python 整数作位集）：选出总和 >= target 且最小的子集
+    返回选中的下标列表，凑不到时返回 None；超过 deadline 时抛出 _Timeout
+    """
+    if target <= 0:
+        return []
+    if sum(sizes) < target:
+        return None
+    # 第一次超过 target 时超出部分小于单件最大金额，因此只需保留这么多位
+    mask = (1 << (target + max(sizes))) - 1
+    layers = [1]
+    reach = 1
+    for k, size in enumerate(sizes):
+        if deadline is not None and k % _DP_CLOCK_EVERY == 0 and time.perf_counter() > deadline:
+            raise _Timeout
+        reach = (reach | (reach << size)) & mask
+        layers.append(reach)
+    above = reach >> target
+    best = target + (above & -above).bit_length() - 1
+
+    chosen = []
+    for i in range(len(sizes) - 1, -1, -1):
+        if not (layers[i] >> best) & 1:
+            chosen.append(i)
+            best -= sizes[i]
+    return chosen
+
+
+def _fill(sizes, target):
+    """
+    超时后代替子集和DP的快速凑单：sizes 从大到小排列，依次放入不超过 target 的商品，
+    还差一点时补上剩下商品中最小的一件（它一定能凑够）
+    返回选中的下标列表，凑不到时返回 None
+    """
+    if target <= 0:
+        return []
+    if sum(sizes) < target:
+        return None
+    chosen = []
+    rest = []
+    total = 0
+    for k, size in enumerate(sizes):
+        if total + size <= target:
+            chosen.append(k)
+            total += size
+        else:
+            rest.append(k)
+    if total < target:
+        chosen.append(rest[-1])
+    return chosen
+
+
+def _greedy(sizes, specs, deadline=None):
+    """
+    初始解：每轮用DP为每张未使用的券凑单，选节省比例最高的一张
+    超过 deadline 后剩余的凑单改用 _fill（sizes 需从大到小排列）
+    返回 (assignment, 是否超时)
+    """
+    assignment = [-1] * len(sizes)
+    remaining = list(range(len(sizes)))
+    used = set()
+    timed_out = False
+
+    def subset_for(pool, target):
+        nonlocal timed_out
+        if not timed_out:
+            try:
+                return _subset_for(pool, target, deadline)
+            except _Timeout:
+                timed_out = True
+        return _fill(pool, target)
+
+    while remaining:
+        pool = [sizes[i] for i in remaining]
+        pool_total = sum(pool)
+        subsets = {}
+        best = None
+        for j, spec in enumerate(specs):
+            if j in used or pool_total < spec.min_units:
+                continue
+            if pool_total <= spec.full_units:
+                chosen = range(len(pool))
+            else:
+                target = spec.full_units
+                if target not in subsets:
+                    subsets[target] = subset_for(pool, target)
+                chosen = subsets[target]
+            total = sum(pool[k] for k in chosen)
+            gain = spec.savings(total)
+            if gain <= 0:
+                continue
+            rank = (gain / total, gain)
+            if best is None or rank > best[0]:
+                best = (rank, j, chosen)
+        if best is None:
+            break
+        _, j, chosen = best
+        used.add(j)
+        picked = {remaining[k] for k in chosen}
+        for i in picked:
+            assignment[i] = j
+        remaining = [i for i in remaining if i not in picked]
+
+    # 剩余商品放进还能多减的订单（未封顶的百分比券）
+    totals = [0] * len(specs)
+    for i, j in enumerate(assignment):
+        if j >= 0:
+            totals[j] += sizes[i]
+    open_specs = [j for j in used if totals[j] < specs[j].full_units]
+    for i in remaining:
+        if not open_specs:
+            break
+        gain, j = max(
+            (specs[j].savings(totals[j] + sizes[i]) - specs[j].savings(totals[j]), j)
+            for j in open_specs
+        )
+        if gain > 0:
+            assignment[i] = j
+            totals[j] += sizes[i]
+            if totals[j] >= specs[j].full_units:
+                open_specs.remove(j)
+    return assignment, timed_out
+
+
+class _Search:
+    """分支定界搜索"""
+
+    def __init__(self, sizes, specs, deadline):
+        self.sizes = sizes
+        self.specs = specs
+        self.deadline = deadline
+        self.suffix = [0] * (len(sizes) + 1)
+        for i in range(len(sizes) - 1, -1, -1):
+            self.suffix[i] = self.suffix[i + 1] + sizes[i]
+        self.totals = [0] * len(specs)
+        self.assignment = [-1] * len(sizes)
+        self.best_value = -1.0
+        self.best_assignment = None
+        self.nodes = 0
+        self.timed_out = False
+
+    def value_of(self, assignment):
+        totals = [0] * len(self.specs)
+        for i, j in enumerate(assignment):
+            if j >= 0:
+                totals[j] += self.sizes[i]
+        return sum(spec.savings(t) for spec, t in zip(self.specs, totals))
+
+    def bound(self, capacity):
+        """剩余金额 capacity 在各券凹包络上的分数背包（收益上界）"""
+        pieces = []
+        for spec, total in zip(self.specs, self.totals):
+            pieces.extend(spec.pieces(total))
+        pieces.sort(reverse=True)
+        gain = 0.0
+        for ratio, length in pieces:
+            if capacity <= 0:
+                break
+            take = min(length, capacity)
+            gain += ratio * take
+            capacity -= take
+        return gain
+
+    def run(self, incumbent):
+        self.best_assignment = list(incumbent)
+        self.best_value = self.value_of(incumbent)
+        self._dfs()
+        return self.best_assignment, self.best_value
+
+    def _visit(self, i, value):
+        """
+        进入第 i 件商品的节点：到达叶子时更新最优解，被剪枝或超时返回 None，
+        否则返回按收益从高到低排好的分支 [(排序键, 排序键, 券, 收益)]
+        """
+        self.nodes += 1
+        if self.nodes % _CLOCK_EVERY == 0 and time.perf_counter() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return None
+        if i == len(self.sizes):
+            if value > self.best_value + _EPSILON:
+                self.best_value = value
+                self.best_assignment = list(self.assignment)
+            return None
+        if value + self.bound(self.suffix[i]) <= self.best_value + _EPSILON:
+            return None
+
+        size = self.sizes[i]
+        totals = self.totals
+        choices = []
+        seen = set()
+        for j, spec in enumerate(self.specs):
+            total = totals[j]
+            # 已封顶的订单之间、同规格且当前金额相同的订单之间是等价的
+            signature = None if total >= spec.full_units else (spec.key, total)
+            if signature in seen:
+                continue
+            seen.add(signature)
+            gain = spec.savings(total + size) - spec.savings(total)
+            choices.append((-gain, max(spec.min_units - total - size, 0), j, gain))
+        choices.sort()
+        return choices
+
+    def _dfs(self):
+        """深度优先搜索（显式栈，每层为 [商品下标, 当前收益, 分支, 下一个分支]）"""
+        choices = self._visit(0, 0.0)
+        if choices is None:
+            return
+        sizes = self.sizes
+        totals = self.totals
+        assignment = self.assignment
+        stack = [[0, 0.0, choices, 0]]
+        while stack:
+            frame = stack[-1]
+            i, value, choices, k = frame
+            if k:
+                # 撤销上一个分支
+                totals[choices[k - 1][2]] -= sizes[i]
+            if self.timed_out or k == len(choices):
+                assignment[i] = -1
+                stack.pop()
+                continue
+            _, _, j, gain = choices[k]
+            frame[3] = k + 1
+            totals[j] += sizes[i]
+            assignment[i] = j
+            child = self._visit(i + 1, value + gain)
+            if child is not None:
+                stack.append([i + 1, value + gain, child, 0])
+
+
+def optimize(items, coupons, time_budget=0.5):
+    """
+    计算最优凑单方案
+
+    参数:
+        items: [(商品, 价格)]，价格单位为元
+        coupons: 可用的优惠券
+        time_budget: 搜索时间预算（秒）
+
+    返回:
+        dict: orders（每个订单的平台、优惠券、商品、金额）、unassigned（不用券单独购买的商品）、
+        total_original / total_savings / total_final、optimal（是否已证明最优）、
+        upper_bound（节省金额的上界，未证明最优时可估计差距）、nodes、elapsed_ms
+    """
+    started = time.perf_counter()
+    cents = [int(round(price * 100)) for _, price in items]
+    unit = reduce(math.gcd, cents, 0) or 1
+    specs = [spec for spec in (CouponSpec(c, unit) for c in coupons) if spec.useful]
+
+    order = sorted(range(len(items)), key=lambda i: -cents[i])
+    sizes = [cents[i] // unit for i in order]
+    # 全部商品都凑不到门槛的券不参与搜索
+    total_units = sum(sizes)
+    specs = [spec for spec in specs if spec.min_units <= total_units]
+
+    nodes = 0
+    optimal = True
+    upper_bound = 0.0
+    if specs and sizes:
+        deadline = started + time_budget
+        search = _Search(sizes, specs, deadline)
+        upper_bound = min(search.bound(total_units), total_units * unit)
+        incumbent, timed_out = _greedy(sizes, specs, deadline)
+        if timed_out:
+            # 初始解已用完时间预算，不再搜索
+            assignment = incumbent
+            optimal = False
+        else:
+            assignment, _ = search.run(incumbent)
+            nodes = search.nodes
+            optimal = not search.timed_out
+    else:
+        assignment = [-1] * len(sizes)
+
+    groups = {}
+    unassigned = []
+    for position, j in enumerate(assignment):
+        item, price = items[order[position]]
+        if j >= 0:
+            groups.setdefault(j, []).append((item, price))
+        else:
+            unassigned.append((item, price))
+
+    orders = []
+    for j, group in groups.items():
+        spec = specs[j]
+        subtotal = sum(cents[order[p]] for p, k in enumerate(assignment) if k == j)
+        savings = spec.savings(subtotal // unit)
+        if savings <= 0:
+            # 没达到门槛的订单等同于不用券
+            unassigned.extend(group)
+            continue
+        orders.append({
+            'platform': spec.coupon.platform,
+            'coupon': spec.coupon,
+            'items': group,
+            'subtotal': round(subtotal / 100, 2),
+            'savings': round(savings / 100, 2),
+            'final_price': round((subtotal - savings) / 100, 2),
+        })
+    orders.sort(key=lambda o: (o['platform'], -o['savings']))
+
+    total_original = round(sum(cents) / 100, 2)
+    total_savings = round(sum(o['savings'] for o in orders), 2)
+    if optimal:
+        upper_bound = total_savings * 100
+    return {
+        'orders': orders,
+        'unassigned': unassigned,
+        'total_original': total_original,
+        'total_savings': total_savings,
+        'total_final': round(total_original - total_savings, 2),
+        'optimal': optimal,
+        'upper_bound': round(max(upper_bound / 100, total_savings), 2),
+        'nodes': nodes,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def optimize_wishlist(session, coupons, user_id=None, time_budget=0.5):
+    """对用户可见的想要列表和当前有效的优惠券计算最优凑单方案"""
+    rows, prices = load_wishlist_prices(session, user_id)
+    valid = [coupon for coupon in coupons if coupon.is_valid()]
+    return optimize(list(zip(rows, prices.tolist())), valid, time_budget=time_budget)
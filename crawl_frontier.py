@@ -0,0 +1,242 @@
+"""
+爬取检查点（持久化的待抓取队列）
+
+每个级别开始抓取详情页时，把本次要抓取的 URL 写入一个 SQLite 文件（与应用数据库分开）；
+每个详情页解析完成后记下状态（done / failed）、尝试次数和解析结果，每隔若干页或若干秒提交一次。
+爬取中断（崩溃、Ctrl+C）后重新运行同一级别时：
+- 已完成的页面直接使用记录的结果，不再抓取
+- 失败次数未达到上限的页面重新抓取
+级别的数据全部入库后删除该级别的记录。
+
+命令行:
+    python crawl_frontier.py status            各级别未完成的检查点
+    python crawl_frontier.py discard [级别]     丢弃检查点（下次从头爬取）
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS frontier_grade (
+        grade TEXT PRIMARY KEY,
+        started_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS frontier (
+        grade TEXT NOT NULL,
+        url TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        updated_at REAL,
+        PRIMARY KEY (grade, url)
+    )''',
+)
+
+
+class FrontierEntry:
+    """一个 URL 的抓取记录；result 是解析函数的返回值（JSON 可序列化）"""
+    __slots__ = ('url', 'state', 'attempts', 'result', 'error', 'updated_at')
+
+    def __init__(self, url, state, attempts=0, result=None, error=None, updated_at=None):
+        self.url = url
+        self.state = state
+        self.attempts = attempts
+        self.result = result
+        self.error = error
+        self.updated_at = updated_at
+
+    @property
+    def crawled_at(self):
+        """完成时间（UTC，不带时区，与模型中的时间字段一致）"""
+        if self.updated_at is None:
+            return None
+        return datetime.fromtimestamp(self.updated_at, timezone.utc).replace(tzinfo=None)
+
+
+class CrawlFrontier:
+    """
+    爬取检查点
+
+    参数:
+        path: SQLite 文件路径
+        max_attempts: 一个 URL 最多抓取几次（跨多次运行累计），达到后不再重试
+        max_age: 检查点有效期（秒）；开始时间更早的级别记录作废，从头爬取
+        checkpoint_every / checkpoint_seconds: 每记录这么多个结果或经过这么多秒提交一次；
+            中断时最多丢失这段时间内的结果
+    """
+
+    def __init__(self, path, max_attempts=3, max_age=None, checkpoint_every=50, checkpoint_seconds=5.0):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self._uncommitted = 0
+        self._committed_at = time.monotonic()
+
+    def close(self):
+        if self._conn is not None:
+            self.checkpoint()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def checkpoint(self):
+        """提交已记录的结果"""
+        self._conn.commit()
+        self._uncommitted = 0
+        self._committed_at = time.monotonic()
+
+    # ---- 级别 ----
+
+    def begin(self, grade, urls):
+        """
+        开始（或继续）一个级别：登记 urls，返回 {url: FrontierEntry}，是 urls 中不需要再抓取的页面
+        （已完成，或失败次数已达上限）；其余 URL 需要抓取。
+        检查点过期时先丢弃旧记录
+        """
+        urls = set(urls)
+        now = time.time()
+        row = self._conn.execute('SELECT started_at FROM frontier_grade WHERE grade = ?', (grade,)).fetchone()
+        if row is not None and self.max_age is not None and now - row[0] > self.max_age:
+            self.discard(grade)
+            row = None
+        if row is None:
+            self._conn.execute(
+                'INSERT INTO frontier_grade (grade, started_at, updated_at) VALUES (?, ?, ?)', (grade, now, now)
+            )
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO frontier (grade, url) VALUES (?, ?)', ((grade, url) for url in urls)
+        )
+        self.checkpoint()
+        finished = {}
+        for entry in self.entries(grade):
+            if entry.url not in urls:
+                continue
+            if entry.state == DONE or (entry.state == FAILED and entry.attempts >= self.max_attempts):
+                finished[entry.url] = entry
+        return finished
+
+    def record(self, grade, url, result=None, error=None):
+        """记录一个页面的结果：error 为 None 时为完成，否则为失败（尝试次数加一）"""
+        now = time.time()
+        if error is None:
+            self._conn.execute(
+                'UPDATE frontier SET state = ?, attempts = attempts + 1, result = ?, error = NULL, updated_at = ? '
+                'WHERE grade = ? AND url = ?',
+                (DONE, json.dumps(result, ensure_ascii=False), now, grade, url),
+            )
+        else:
+            self._conn.execute(
+                'UPDATE frontier SET state = ?, attempts = attempts + 1, error = ?, updated_at = ? '
+                'WHERE grade = ? AND url = ?',
+                (FAILED, str(error)[:500], now, grade, url),
+            )
+        self._uncommitted += 1
+        if (self._uncommitted >= self.checkpoint_every
+                or time.monotonic() - self._committed_at >= self.checkpoint_seconds):
+            self._conn.execute('UPDATE frontier_grade SET updated_at = ? WHERE grade = ?', (now, grade))
+            self.checkpoint()
+
+    def finish(self, grade):
+        """级别的数据已全部入库：删除它的检查点"""
+        self.discard(grade)
+
+    def discard(self, grade=None):
+        """丢弃一个级别（grade 为 None 时为全部）的检查点"""
+        if grade is None:
+            self._conn.execute('DELETE FROM frontier')
+            self._conn.execute('DELETE FROM frontier_grade')
+        else:
+            self._conn.execute('DELETE FROM frontier WHERE grade = ?', (grade,))
+            self._conn.execute('DELETE FROM frontier_grade WHERE grade = ?', (grade,))
+        self.checkpoint()
+
+    # ---- 查询 ----
+
+    def entries(self, grade):
+        rows = self._conn.execute(
+            'SELECT url, state, attempts, result, error, updated_at FROM frontier WHERE grade = ?', (grade,)
+        )
+        return [
+            FrontierEntry(url, state, attempts, json.loads(result) if result is not None else None, error, updated_at)
+            for url, state, attempts, result, error, updated_at in rows
+        ]
+
+    def status(self):
+        """[(级别, 开始时间, 最后提交时间, {状态: 数量})]，按开始时间排序"""
+        counts = {}
+        for grade, state, count in self._conn.execute(
+            'SELECT grade, state, COUNT(*) FROM frontier GROUP BY grade, state'
+        ):
+            counts.setdefault(grade, {})[state] = count
+        return [
+            (grade, started_at, updated_at, counts.get(grade, {}))
+            for grade, started_at, updated_at in self._conn.execute(
+                'SELECT grade, started_at, updated_at FROM frontier_grade ORDER BY started_at'
+            )
+        ]
+
+
+def from_config(config=None):
+    """按配置打开检查点；CRAWL_FRONTIER_PATH 为空时不使用（返回 None）"""
+    if config is None:
+        from config import Config as config
+    if not config.CRAWL_FRONTIER_PATH:
+        return None
+    return CrawlFrontier(
+        config.CRAWL_FRONTIER_PATH,
+        max_attempts=config.SCRAPER_MAX_RETRIES,
+        max_age=config.CRAWL_CHECKPOINT_MAX_AGE_HOURS * 3600,
+    )
+
+
+def main(argv):
+    frontier = from_config()
+    if frontier is None:
+        print('CRAWL_FRONTIER_PATH 未配置')
+        return 1
+    command = argv[0] if argv else 'status'
+    with frontier:
+        if command == 'status':
+            status = frontier.status()
+            if not status:
+                print('没有未完成的检查点')
+            for grade, started_at, updated_at, counts in status:
+                total = sum(counts.values())
+                print(f"{grade:8} 开始于 {time.strftime('%Y-%m-%d %H:%M', time.localtime(started_at))}，"
+                      f"最后提交 {time.strftime('%Y-%m-%d %H:%M', time.localtime(updated_at))}：共 {total} 个，"
+                      f"完成 {counts.get(DONE, 0)}，失败 {counts.get(FAILED, 0)}，待抓取 {counts.get(PENDING, 0)}")
+        elif command == 'discard' and len(argv) <= 2:
+            frontier.discard(argv[1] if len(argv) == 2 else None)
+            print('已丢弃')
+        else:
+            print(__doc__)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
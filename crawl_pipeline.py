@@ -0,0 +1,252 @@
+"""
+爬虫的 抓取 → 解析 → 入库 流水线
+
+- 抓取：FetchEngine 的线程池（I/O 密集，受限速控制）
+- 解析：进程池（CPU 密集）。纯 Python 解析大页面时会占住 GIL，放在抓取线程里会把整个爬取串行化；
+  放到子进程后解析用满所有核，抓取线程只负责网络。
+  解析函数必须是可以 pickle 的模块级函数（见 detail_page.py、price_extractor.py），调用方式为
+  parse(正文bytes, *args, encoding=响应编码)
+- 入库：BatchWriter 在单独的线程中按批调用 sink，与抓取和解析同时进行
+
+各段之间用有界队列连接：下游处理不过来时上游阻塞，内存中的页面数有上限
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# 队列结束标记
+_DONE = object()
+
+# 阻塞在队列上的线程检查中止标记的间隔（秒）
+_POLL = 0.1
+
+
+def _put(q, item, stop):
+    """放入有界队列；流水线被中止时放弃并返回 False"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    """从队列取出一项；流水线被中止时返回 _DONE"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def _timed(parse, content, *args, encoding=None):
+    """在解析进程中执行 parse，返回 (结果, 解析耗时秒数)"""
+    started = time.perf_counter()
+    result = parse(content, *args, encoding=encoding)
+    return result, time.perf_counter() - started
+
+
+def _mp_context():
+    """
+    子进程启动方式：优先 forkserver（主进程已有抓取线程，直接 fork 可能死锁），
+    Windows / macOS 上为默认的 spawn。
+    子进程会导入入口脚本（__main__），入口脚本需要 if __name__ == '__main__' 保护
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+
+class CrawlPipeline:
+    """
+    抓取 + 进程池解析
+
+    参数:
+        engine: FetchEngine
+        workers: 解析进程数，默认 CPU 核数；0 表示不启动进程，在调度线程中解析
+        queue_size: 每两段之间队列的长度，默认 max(抓取并发数, 进程数) * 2
+
+    stats 累计解析的页面数和解析耗时（各进程中实际解析的时间之和）
+    """
+
+    def __init__(self, engine, workers=None, queue_size=None):
+        self.engine = engine
+        self.workers = (os.cpu_count() or 1) if workers is None else max(int(workers), 0)
+        self.queue_size = queue_size or max(engine.concurrency, self.workers, 1) * 2
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.stats = {'parsed': 0, 'parse_seconds': 0.0}
+
+    @property
+    def pool(self):
+        """解析进程池（第一次使用时启动，同一个爬虫的多次 run 共用）；workers=0 时为 None"""
+        if self.workers == 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+            return self._pool
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _submit_parse(self, parse, response, args):
+        """提交一个解析任务，返回 Future"""
+        pool = self.pool
+        if pool is not None:
+            return pool.submit(_timed, parse, response.content, *args, encoding=response.encoding)
+        future = Future()
+        try:
+            future.set_result(_timed(parse, response.content, *args, encoding=response.encoding))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def run(self, parse, urls, args=(), **fetch_kwargs):
+        """
+        抓取 urls，并在进程池中对每个响应调用 parse(content, *args, encoding=...)
+
+        按输入顺序逐个产出 (url, 结果, 异常)，与 FetchEngine.map 相同；抓取或解析出错时结果为 None。
+        fetch_kwargs 传给 FetchEngine.fetch（kind、revalidate 等）。
+        中途停止迭代时，已提交的请求会完成但结果被丢弃
+        """
+        fetched = queue.Queue(self.queue_size)   # (url, 抓取 Future)
+        parsing = queue.Queue(self.queue_size)   # (url, 解析 Future, 抓取异常)
+        stop = threading.Event()
+        errors = []
+
+        def feed():
+            try:
+                for url in urls:
+                    if not _put(fetched, (url, self.engine.submit(url, **fetch_kwargs)), stop):
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                _put(fetched, _DONE, stop)
+
+        def dispatch():
+            try:
+                while True:
+                    item = _get(fetched, stop)
+                    if item is _DONE:
+                        return
+                    url, fetch_future = item
+                    try:
+                        result = (url, self._submit_parse(parse, fetch_future.result(), args), None)
+                    except Exception as e:
+                        result = (url, None, e)
+                    if not _put(parsing, result, stop):
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                _put(parsing, _DONE, stop)
+
+        threads = [
+            threading.Thread(target=feed, name='pipeline-feed', daemon=True),
+            threading.Thread(target=dispatch, name='pipeline-parse', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = parsing.get()
+                if item is _DONE:
+                    break
+                url, parse_future, error = item
+                result = None
+                if error is None:
+                    try:
+                        result, seconds = parse_future.result()
+                    except Exception as e:
+                        error = e
+                    else:
+                        self.stats['parsed'] += 1
+                        self.stats['parse_seconds'] += seconds
+                yield url, result, error
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+
+class BatchWriter:
+    """
+    入库阶段：在单独的线程中每攒够 batch_size 项调用一次 sink(batch)
+
+    put 在队列满时阻塞（入库跟不上时让上游等待）；close 写入剩余数据并等待线程结束。
+    sink 的返回值依次记在 results 中，写入的条目数和 sink 的总耗时记在 count / seconds 中；
+    sink 出错后不再写入，错误在下一次 put 或 close 时抛出
+    """
+
+    def __init__(self, sink, batch_size=200, queue_size=None):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.results = []
+        self.count = 0
+        self.seconds = 0.0
+        self._queue = queue.Queue(queue_size or batch_size * 2)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='pipeline-persist', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        batch = []
+        while True:
+            item = self._queue.get()
+            if item is not _DONE:
+                batch.append(item)
+            if batch and (item is _DONE or len(batch) >= self.batch_size):
+                if self._error is None:
+                    started = time.perf_counter()
+                    try:
+                        self.results.append(self.sink(batch))
+                    except Exception as e:
+                        self._error = e
+                    else:
+                        self.count += len(batch)
+                        self.seconds += time.perf_counter() - started
+                batch = []
+            if item is _DONE:
+                return
+
+    def put(self, item):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(item)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_DONE)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            self.close()
+        except Exception:
+            # 已经有异常在传播时不覆盖它
+            if exc_type is None:
+                raise
@@ -0,0 +1,33 @@
+"""
+单品详情页解析
+
+这里的函数都是模块级函数，只依赖 price_extractor（lxml / bs4），不导入 Flask 应用：
+可以在解析进程池（crawl_pipeline.CrawlPipeline）的子进程中运行，
+子进程启动时不会连接数据库或执行 app.py 的初始化。
+价格提取的规则见 price_extractor.py
+"""
+from price_extractor import best_price, first_number, page_text_and_rows, table_candidates, text_candidates
+
+
+def parse_price(price_text):
+    """解析价格文本中的第一个数字，例如："2500→2800日元" -> 2500"""
+    if not price_text:
+        return None
+    return first_number(price_text)
+
+
+def parse_item_detail(html, encoding=None):
+    """从单品页面HTML中提取价格等信息，返回 {'price_jp_msrp': ..., 'series': ...}（找不到的键不出现）"""
+    text, rows = page_text_and_rows(html, encoding)
+    data = {}
+
+    # 不限上限：各级别的价格范围不同
+    best = best_price(table_candidates(rows) + text_candidates(text), price_max=None)
+    if best is not None:
+        data['price_jp_msrp'] = best.value
+
+    # 查找其他信息
+    if '万代' in text or 'Bandai' in text:
+        data['series'] = '万代'
+
+    return data
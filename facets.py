@@ -0,0 +1,118 @@
+"""
+筛选项（级别、子分类及数量）缓存
+
+一次 GROUP BY 查询得到所有 (grade, subcategory, count)，在内存中整理好排序后的
+级别列表、各级别的子分类列表和数量；Gunpla 写入事件触发失效，
+其他进程（爬虫）的写入在 TTL 到期后生效
+"""
+import threading
+import time
+
+from sqlalchemy import event, func, inspect
+
+from models import Gunpla
+
+# 子分类的显示顺序，未列出的排在后面（按名称排序）
+SUBCATEGORY_ORDER = [
+    '普通版', '网络限定版', '其他限定版', 'EVANGELION系列', '勇者王系列',
+    '参考出品/开发中', 'Unleashed', '定制部件', '综合系列',
+    'EXtreme', '限定电镀版', '限量版RX-79[G]特别涂装版', '竞赛奖品版',
+    '水晶版', '彩色电镀版', '圣战士丹拜因', '机动警察', '一年战争版',
+    '往期未商品化参考出品', '特别版', 'HG 40周年纪念系列 (非HGUC)',
+    'HG 30周年纪念版 (非HGUC)', 'HG U.C.Hard Graph', 'HG(1990)系列 (非HGUC)',
+    '往期未商品化/开发中 企划&参考出品', '1/144系列', 'HG创战元宇宙', 'EG GBM',
+    'SDCS GBM', 'FRS GBM', 'HG高达破坏者 对战记录', 'HG高达创形者',
+    'HG高达创战者', 'HG高达创战者TRY', 'HG高达创形者Re:RISE',
+    'HG Customize Campaign', 'HG PETIT\'GGUY', 'HG PETIT\'GGUY 其他限定版', 'HAROPLA',
+    '装甲核心', 'Porta Nova', 'Porta Nova 拓展配件', 'Cielnova', 'Cielnova 拓展配件',
+    'Spinatio', 'Spinatio 扩展配件', '水贴', '30MM 自定义材质', '30MM 自定义场景',
+    '30MM 自定义特效', '特殊限定版', '1/144 泰克普罗托',
+    '超级机器人系列', '拓展部件', '未商品化往期参考出品',
+]
+
+SUBCATEGORY_RANK = {name: i for i, name in enumerate(SUBCATEGORY_ORDER)}
+
+
+def sort_subcategories(subcategories):
+    """按 SUBCATEGORY_ORDER 排序子分类"""
+    unranked = len(SUBCATEGORY_ORDER)
+    return sorted(subcategories, key=lambda sc: (SUBCATEGORY_RANK.get(sc, unranked), sc))
+
+
+class Facets:
+    """某一时刻的筛选项快照（只读）"""
+
+    def __init__(self, rows):
+        grade_counts = {}
+        subcategory_counts = {}
+        grade_subcategory_counts = {}
+        for grade, subcategory, count in rows:
+            if grade:
+                grade_counts[grade] = grade_counts.get(grade, 0) + count
+            if subcategory:
+                subcategory_counts[subcategory] = subcategory_counts.get(subcategory, 0) + count
+                if grade:
+                    grade_subcategory_counts.setdefault(grade, {})[subcategory] = count
+
+        self.grade_counts = grade_counts
+        self.subcategory_counts = subcategory_counts
+        self.grade_subcategory_counts = grade_subcategory_counts
+        self.grades = sorted(grade_counts)
+        self.subcategories = sort_subcategories(subcategory_counts)
+        self._by_grade = {
+            grade: sort_subcategories(counts)
+            for grade, counts in grade_subcategory_counts.items()
+        }
+
+    def subcategories_for(self, grade=None):
+        """子分类列表；指定级别时只返回该级别的子分类"""
+        if grade:
+            return self._by_grade.get(grade, [])
+        return self.subcategories
+
+    def subcategory_counts_for(self, grade=None):
+        if grade:
+            return self.grade_subcategory_counts.get(grade, {})
+        return self.subcategory_counts
+
+
+class FacetCache:
+    """Facets 缓存，Gunpla 增删或改动级别/子分类时失效"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._facets = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self, *args):
+        self._facets = None
+
+    def _on_update(self, mapper, connection, target):
+        state = inspect(target)
+        if state.attrs.grade.history.has_changes() or state.attrs.subcategory.history.has_changes():
+            self.invalidate()
+
+    def listen(self):
+        """注册 Gunpla 写入事件"""
+        handlers = (
+            ('after_insert', self.invalidate),
+            ('after_update', self._on_update),
+            ('after_delete', self.invalidate),
+        )
+        for name, handler in handlers:
+            if not event.contains(Gunpla, name, handler):
+                event.listen(Gunpla, name, handler)
+
+    def get(self, session):
+        facets = self._facets
+        if facets is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return facets
+        with self._lock:
+            if self._facets is None or time.monotonic() - self._loaded_at >= self.ttl:
+                rows = session.query(
+                    Gunpla.grade, Gunpla.subcategory, func.count(Gunpla.id)
+                ).group_by(Gunpla.grade, Gunpla.subcategory).all()
+                self._facets = Facets(rows)
+                self._loaded_at = time.monotonic()
+            return self._facets
@@ -0,0 +1,273 @@
+"""
+爬虫用的并发抓取引擎（线程池）
+
+- 每个主机一个令牌桶限速：总吞吐量由配置的每秒请求数决定，与单次请求耗时无关
+- 线程池限制并发数；每个工作线程复用自己的 requests.Session（保持连接）
+- 连接错误、超时、429 和 5xx 自动重试，退避时间指数增长并加随机抖动，
+  服务器返回 Retry-After 时按其等待
+- 可选的磁盘页面缓存（page_cache.PageCache）：有效期内不发请求，过期后条件请求重新验证
+
+requests 在第一次抓取时才导入，只导入本模块（例如 python -m gunpla_scrape --list）不加载它
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+# 需要重试的HTTP状态码
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class FetchError(Exception):
+    """重试后仍然失败的请求"""
+
+    def __init__(self, url, message, status=None):
+        super().__init__(f'{url}: {message}')
+        self.url = url
+        self.status = status
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，允许 burst 个突发"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不足时等待"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """服务器要求等待时（429 Retry-After），暂停整个主机"""
+        with self._lock:
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class FetchEngine:
+    """
+    并发抓取引擎
+
+    参数:
+        requests_per_second: 每个主机每秒最多请求数（<=0 不限速）
+        concurrency: 最大并发请求数
+        max_retries: 失败后最多重试次数
+        backoff: 第一次重试的基础等待时间（秒），之后每次翻倍
+        timeout: 单次请求超时（秒）
+        cache: 页面缓存（PageCache），None 表示不缓存
+        offline: 只从缓存读取，不发任何请求（缓存中没有的页面抛出 FetchError）
+        refresh: 忽略缓存有效期，每个页面都向服务器重新验证
+        adapter_factory: adapter_factory(pool_connections=..., pool_maxsize=...) 返回每个 Session 挂载的传输适配器，
+            默认 HTTPAdapter；录制和回放测试数据时使用（见 http_fixtures.py）
+    """
+
+    def __init__(self, requests_per_second=2.0, concurrency=4, max_retries=3,
+                 backoff=1.0, max_backoff=30.0, timeout=15, headers=None,
+                 cache=None, offline=False, refresh=False, adapter_factory=None):
+        self.requests_per_second = requests_per_second
+        self.concurrency = max(int(concurrency), 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.cache = cache
+        self.offline = offline
+        self.refresh = refresh
+        self.adapter_factory = adapter_factory
+        self.stats = {
+            'requests': 0, 'retries': 0, 'failures': 0,
+            'cache_hits': 0, 'not_modified': 0, 'bytes': 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    # ---- 资源 ----
+
+    @property
+    def session(self):
+        """当前线程的 Session（线程之间不共享，线程内复用连接）"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.headers.update(self.headers)
+            adapter_factory = self.adapter_factory or HTTPAdapter
+            adapter = adapter_factory(pool_connections=4, pool_maxsize=self.concurrency)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                # 突发不超过并发数，保证任意一秒内的请求数不会明显超过配置
+                burst = min(self.concurrency, max(int(self.requests_per_second), 1))
+                bucket = self._buckets[host] = TokenBucket(self.requests_per_second, burst)
+            return bucket
+
+    @property
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix='fetch'
+                )
+            return self._executor
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # ---- 抓取 ----
+
+    def _delay(self, attempt, response=None):
+        """第 attempt 次重试前的等待时间（full jitter）"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _cached_response(self, url, entry, encoding):
+        """用缓存的正文构造响应对象（from_cache=True）"""
+        import requests
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = self.cache.body(entry)
+        response.encoding = encoding or entry.encoding
+        response.from_cache = True
+        return response
+
+    def fetch(self, url, encoding='utf-8', timeout=None, kind=None, revalidate=False):
+        """
+        抓取一个页面（在当前线程执行，受限速和重试控制）
+
+        参数:
+            kind: 页面类型（'series' / 'detail'），决定缓存有效期
+            revalidate: 即使缓存未过期也向服务器重新验证（增量爬取要刷新的页面）
+
+        返回:
+            requests.Response（来自缓存时 from_cache 为 True）
+        异常:
+            FetchError - 重试后仍然失败，或离线模式下没有缓存
+        """
+        import requests
+
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        if entry is not None and (
+            self.offline or (not (self.refresh or revalidate) and self.cache.is_fresh(entry, kind))
+        ):
+            self._count('cache_hits')
+            return self._cached_response(url, entry, encoding)
+        if self.offline:
+            raise FetchError(url, '离线模式下没有缓存')
+        headers = entry.validators() if entry is not None else None
+
+        bucket = self.bucket(url)
+        attempt = 0
+        while True:
+            bucket.acquire()
+            self._count('requests')
+            response = None
+            try:
+                response = self.session.get(url, timeout=timeout or self.timeout, headers=headers)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = FetchError(url, str(e))
+            else:
+                if response.status_code == 304 and entry is not None:
+                    # 内容未变化，沿用缓存
+                    self._count('not_modified')
+                    self.cache.touch(entry, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                    return self._cached_response(url, entry, encoding)
+                if response.status_code not in RETRY_STATUS:
+                    if response.status_code >= 400:
+                        self._count('failures')
+                        raise FetchError(url, f'HTTP {response.status_code}', response.status_code)
+                    if encoding:
+                        response.encoding = encoding
+                    self._count('bytes', len(response.content))
+                    if self.cache is not None:
+                        self.cache.store(
+                            url, response.content,
+                            etag=response.headers.get('ETag'),
+                            last_modified=response.headers.get('Last-Modified'),
+                            encoding=encoding,
+                        )
+                    response.from_cache = False
+                    return response
+                error = FetchError(url, f'HTTP {response.status_code}', response.status_code)
+
+            if attempt >= self.max_retries:
+                self._count('failures')
+                raise error
+            delay = self._delay(attempt, response)
+            if response is not None and response.status_code == 429:
+                bucket.pause(delay)
+            attempt += 1
+            self._count('retries')
+            time.sleep(delay)
+
+    def submit(self, url, **kwargs):
+        """在线程池中抓取，返回 Future"""
+        return self.executor.submit(self.fetch, url, **kwargs)
+
+    def map(self, func, urls, **kwargs):
+        """
+        并发抓取 urls，并对每个响应调用 func(url, response)
+
+        按输入顺序逐个产出 (url, 结果, 异常)；抓取或 func 出错时结果为 None
+        """
+        def task(url):
+            return func(url, self.fetch(url, **kwargs))
+
+        pending = [(url, self.executor.submit(task, url)) for url in urls]
+        for url, future in pending:
+            try:
+                yield url, future.result(), None
+            except Exception as e:
+                yield url, None, e
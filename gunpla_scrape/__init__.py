@@ -0,0 +1,18 @@
+"""
+78动漫级别页面爬虫
+
+各级别的规则在 grades.py 中声明，由 engine.GradeScraper 统一执行；
+底层的抓取、解析和入库在 scraper78dm.Scraper78DM 中。
+导入本包不加载 Web 应用、SQLAlchemy、BeautifulSoup 和 requests，它们在用到时才导入。
+命令行用法见 __main__.py：
+
+    python -m gunpla_scrape --grades RG,MG,HGUC
+"""
+from .grades import GRADES, GradeConfig, get_grade
+from .scraper78dm import Scraper78DM, update_existing_prices
+from .engine import GradeScraper, extract_price, scrape_grades
+
+__all__ = [
+    'GRADES', 'GradeConfig', 'GradeScraper', 'Scraper78DM', 'extract_price', 'get_grade',
+    'scrape_grades', 'update_existing_prices',
+]
@@ -0,0 +1,96 @@
+"""
+命令行入口
+
+    python -m gunpla_scrape --grades RG,MG,HGUC
+    python -m gunpla_scrape --grades all --no-price
+    python -m gunpla_scrape --grades MG --offline --dry-run
+    python -m gunpla_scrape --grades all --incremental --max-age 14
+    python -m gunpla_scrape --grades all --fresh      # 不从上次中断处继续
+    python -m gunpla_scrape --list
+    python -m gunpla_scrape --grades MG --no-price --dry-run --profile-imports   # 结束后报告各模块导入耗时
+"""
+import argparse
+import sys
+from datetime import timedelta
+
+from config import Config
+from .engine import scrape_grades
+from .grades import GRADES, get_grade
+
+
+def parse_grades(value):
+    if value.strip().lower() == 'all':
+        return list(GRADES)
+    try:
+        return [get_grade(name).grade for name in value.split(',') if name.strip()]
+    except KeyError as e:
+        raise argparse.ArgumentTypeError(e.args[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m gunpla_scrape', description='按级别爬取78动漫的高达模型和价格')
+    parser.add_argument('--grades', type=parse_grades, help='逗号分隔的级别，或 all（可选: %s）' % ', '.join(GRADES))
+    parser.add_argument('--no-price', action='store_true', help='不抓取详情页价格')
+    parser.add_argument('--dry-run', action='store_true', help='只爬取，不写入数据库')
+    parser.add_argument('--rps', type=float, help='每秒请求数（默认取配置 SCRAPER_REQUESTS_PER_SECOND）')
+    parser.add_argument('--concurrency', type=int, help='并发数（默认取配置 SCRAPER_CONCURRENCY）')
+    parser.add_argument('--parse-workers', type=int,
+                        help='详情页解析进程数（默认取配置 SCRAPER_PARSE_WORKERS，0 表示不用进程池）')
+    parser.add_argument('--offline', action='store_true', help='只使用页面缓存，不访问网络（调试解析）')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存有效期，全部页面重新验证')
+    parser.add_argument('--no-cache', action='store_true', help='不使用页面缓存')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量爬取：只抓取新条目、列表条目有变化、缺少价格或超过有效期的详情页')
+    parser.add_argument('--max-age', type=int, default=Config.CRAWL_MAX_AGE_DAYS, metavar='DAYS',
+                        help='增量爬取时详情页的有效期（天，默认取配置 CRAWL_MAX_AGE_DAYS）')
+    parser.add_argument('--no-checkpoint', action='store_true', help='不记录爬取检查点（中断后从头爬取）')
+    parser.add_argument('--fresh', action='store_true', help='丢弃这些级别未完成的检查点，从头爬取')
+    parser.add_argument('--list', action='store_true', help='列出可用级别后退出')
+    parser.add_argument('--profile-imports', action='store_true',
+                        help='用 -X importtime 运行本命令，结束后报告各模块的导入耗时（见 import_profile.py）')
+    args = parser.parse_args(argv)
+
+    if args.profile_imports:
+        import import_profile
+        argv = sys.argv[1:] if argv is None else list(argv)
+        return import_profile.run_profiled(
+            ['-m', 'gunpla_scrape'] + [arg for arg in argv if arg != '--profile-imports']
+        )
+
+    if args.list:
+        for config in GRADES.values():
+            print(f'{config.grade:8} {config.url}  {config.series}')
+        return 0
+    if not args.grades:
+        parser.error('需要 --grades（或 --list）')
+    if args.offline and args.no_cache:
+        parser.error('--offline 需要页面缓存，不能与 --no-cache 同时使用')
+
+    results = scrape_grades(
+        args.grades,
+        include_price=not args.no_price,
+        save=not args.dry_run,
+        requests_per_second=args.rps,
+        concurrency=args.concurrency,
+        parse_workers=args.parse_workers,
+        cache=not args.no_cache,
+        offline=args.offline,
+        refresh=args.refresh,
+        incremental=args.incremental,
+        max_age=timedelta(days=args.max_age),
+        checkpoint=not args.no_checkpoint,
+        fresh=args.fresh,
+    )
+    print('=' * 60)
+    for grade in args.grades:
+        result = results.get(grade)
+        if result is None:
+            print(f'{grade:8} 失败')
+            continue
+        print(f"{grade:8} 找到 {result['found']} 个，抓取详情页 {result['fetched']} 个，有价格 {result['priced']} 个，"
+              f"新增 {result['saved']} 条，更新 {result['updated']} 条，用时 {result['elapsed']}s")
+    return 0 if len(results) == len(args.grades) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+爬虫使用的数据库上下文
+
+爬虫只用 models.db 的会话，不需要完整的 Web 应用（视图、登录、模板、优惠券引擎等）。
+这里按 Config 建一个只注册了 db 的 Flask 应用，第一次用到数据库时才导入 Flask、SQLAlchemy 和模型，
+只抓取不入库的任务（--list、--dry-run）完全不加载它们
+"""
+import threading
+
+_app = None
+_lock = threading.Lock()
+
+
+def get_app():
+    """爬虫用的 Flask 应用（只有配置和 db，不访问数据库），第一次调用时创建"""
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                from flask import Flask
+                from config import Config
+                from models import db
+
+                app = Flask(__name__)
+                app.config.from_object(Config)
+                db.init_app(app)
+                _app = app
+    return _app
+
+
+def app_context():
+    """with app_context(): 之内可以使用 db.session"""
+    return get_app().app_context()
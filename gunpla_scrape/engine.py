@@ -0,0 +1,382 @@
+"""
+级别页面爬取引擎
+
+按 GradeConfig 完成一个级别的全部工作：
+列表页筛选模型链接 → 并发抓取详情页 → 进程池解析价格 → 分批 upsert 入库，
+后三步是 crawl_pipeline 的流水线，抓取、解析和入库同时进行。
+同一进程内爬取多个级别时共用一个 FetchEngine（连接池和按主机的限速）和解析进程池
+
+数据库模型在第一次读写数据库时才导入（见 database.py），不入库的爬取不加载 SQLAlchemy
+"""
+import time
+from datetime import datetime, timedelta
+
+import crawl_frontier
+from config import Config
+from crawl_pipeline import BatchWriter
+from price_extractor import extract_price
+from series_page import SubcategoryMarkers, entry_hash, tag_links
+from .database import app_context
+from .grades import GRADES, OTHER_CATEGORIES, SITE_URL, get_grade
+from .scraper78dm import Scraper78DM
+
+# 重新爬取时覆盖已有值的字段（其余字段只补全空值）
+OVERWRITE_FIELDS = ('ms_number', 'subcategory', 'price_jp_msrp', 'price_us_msrp', 'price_cn_msrp')
+
+# 入库阶段每批写入的条目数
+SAVE_BATCH_SIZE = 200
+
+
+def absolute_url(href):
+    """把页面中的链接转成完整URL，无法识别时返回 None"""
+    if href.startswith('//'):
+        return 'https:' + href
+    if href.startswith('/'):
+        return SITE_URL + href
+    if href.startswith('http'):
+        return href
+    return None
+
+
+class GradeScraper:
+    """
+    按级别配置爬取并入库
+
+    参数:
+        engine: 共享的 FetchEngine；不传时按配置新建
+        requests_per_second / concurrency / cache / offline / refresh: 新建 FetchEngine 时使用，
+            含义同 Scraper78DM
+        parse_workers: 详情页解析进程数，含义同 Scraper78DM
+    """
+
+    def __init__(self, engine=None, requests_per_second=None, concurrency=None,
+                 cache=True, offline=False, refresh=False, parse_workers=None):
+        self.scraper = Scraper78DM(
+            engine=engine, requests_per_second=requests_per_second, concurrency=concurrency,
+            cache=cache, offline=offline, refresh=refresh, parse_workers=parse_workers,
+        )
+        self.engine = self.scraper.engine
+        self.pipeline = self.scraper.pipeline
+
+    def close(self):
+        self.scraper.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- 列表页 ----
+
+    def is_product(self, config, name, markers):
+        """链接文字是否是本级别的产品（而不是导航、级别名称、其他品类或子分类标题）"""
+        if not name or len(name) < 2 or name in config.aliases:
+            return False
+        if any(keyword in name for keyword in config.skip_keywords):
+            return False
+        # 子分类标题本身
+        if markers.regex is not None and markers.regex.search(name):
+            return False
+        # 其他级别、其他品类：名称完全相同，或是"XX共N款"这样的导航链接
+        is_nav = '共' in name or '款' in name
+        for names in (config.other_grades, OTHER_CATEGORIES):
+            if name in names:
+                return False
+            if is_nav and any(other in name for other in names):
+                return False
+        if any(keyword in name for keyword in config.exclude_keywords):
+            return False
+        return True
+
+    def parse_listing(self, config, html):
+        """
+        解析级别页面，返回去重后的模型列表
+        每项包含 name_cn / grade / url / subcategory / content_hash，能识别时还有 ms_number
+        """
+        markers = SubcategoryMarkers(config.patterns)
+        items = []
+        seen = set()
+        for link, subcategory in tag_links(html, markers, default=config.default_subcategory):
+            name = link.get_text(strip=True)
+            if name in seen or not self.is_product(config, name, markers):
+                continue
+            url = absolute_url(link.get('href', ''))
+            if url is None:
+                continue
+            seen.add(name)
+            data = {
+                'name_cn': name,
+                'grade': config.grade,
+                'url': url,
+                'subcategory': subcategory,
+                'content_hash': entry_hash(name, url, subcategory),
+            }
+            ms_number = self.scraper.extract_model_number(name)
+            if ms_number:
+                data['ms_number'] = ms_number
+            items.append(data)
+        return items
+
+    # ---- 价格 ----
+
+    def select_for_refresh(self, config, items, max_age):
+        """
+        增量模式：挑出需要抓取详情页的条目
+        新条目、列表条目有变化（content_hash 不同）、缺少日本定价、或超过 max_age 没有抓取过
+
+        返回:
+            (需要抓取的条目, {原因: 数量})
+        """
+        from models import db, Gunpla
+
+        with app_context():
+            existing = {
+                row.name_cn: row for row in db.session.query(
+                    Gunpla.name_cn, Gunpla.content_hash, Gunpla.last_crawled_at, Gunpla.price_jp_msrp
+                ).filter(Gunpla.grade == config.grade)
+            }
+        cutoff = datetime.utcnow() - max_age
+        targets = []
+        reasons = {}
+        for item in items:
+            row = existing.get(item['name_cn'])
+            if row is None:
+                reason = '新条目'
+            elif row.content_hash != item['content_hash']:
+                reason = '列表条目有变化'
+            elif not row.price_jp_msrp:
+                reason = '缺少价格'
+            elif row.last_crawled_at is None or row.last_crawled_at < cutoff:
+                reason = '超过有效期'
+            else:
+                continue
+            reasons[reason] = reasons.get(reason, 0) + 1
+            targets.append(item)
+        return targets, reasons
+
+    def fetch_prices(self, config, items, revalidate=False, writer=None, frontier=None):
+        """
+        抓取详情页（进程池中解析）价格并换算美元/人民币定价，抓取成功的条目记下 last_crawled_at
+        revalidate 为 True 时缓存未过期的页面也向服务器重新验证；
+        传入 writer（BatchWriter）时每个条目处理完就交给入库阶段；
+        传入 frontier（CrawlFrontier）时每个页面的结果写入检查点，检查点中已完成的页面不再抓取
+
+        返回:
+            (找到价格的数量, 要去掉的条目名称集合)；drop_unpriced 子分类中没有价格的条目被去掉
+        """
+        finished = {}
+        if frontier is not None:
+            finished = frontier.begin(config.grade, [item['url'] for item in items])
+            if finished:
+                print(f"从检查点继续：{len(finished)} 个详情页已处理，抓取其余 {len(items) - len(finished)} 个\n")
+        pending = [item for item in items if item['url'] not in finished]
+        results = self.pipeline.run(
+            extract_price, [item['url'] for item in pending], args=(config.price_max,),
+            kind='detail', revalidate=revalidate,
+        )
+
+        def outcomes():
+            """(条目, 价格, 异常, 抓取时间)：先是检查点中的结果，再是本次抓取的结果"""
+            for item in items:
+                entry = finished.get(item['url'])
+                if entry is not None:
+                    yield item, entry.result, entry.error, entry.crawled_at
+            for item, (url, price, error) in zip(pending, results):
+                if frontier is not None:
+                    frontier.record(config.grade, url, price, error)
+                yield item, price, error, None
+
+        dropped = set()
+        found = 0
+        for i, (item, price, error, crawled_at) in enumerate(outcomes(), 1):
+            print(f"[{i}/{len(items)}] {item['name_cn']}")
+            if error is not None:
+                print(f"    价格爬取失败: {error}")
+            else:
+                item['last_crawled_at'] = crawled_at or datetime.utcnow()
+            if price:
+                item['price_jp_msrp'] = price
+                item.update(self.scraper.convert_price(price))
+                print(f"  价格: ¥{price:.0f} (JPY) → ${item.get('price_us_msrp', 0):.2f} (USD) / ¥{item.get('price_cn_msrp', 0):.2f} (CNY)")
+                found += 1
+            elif config.drop_unpriced and item['subcategory'] == config.drop_unpriced:
+                print(f"  {config.drop_unpriced}，无价格，将跳过录入")
+                dropped.add(item['name_cn'])
+                continue
+            else:
+                print(f"  未找到价格信息（但仍会录入）")
+            if writer is not None:
+                writer.put(item)
+        return found, dropped
+
+    # ---- 入库 ----
+
+    def save(self, config, items):
+        """
+        批量入库（bulk_upsert）：编号、子分类、价格和抓取记录以本次爬取为准，系列只写入新记录；
+        与数据库相同的条目不写
+        返回 (新增数, 更新数)
+        """
+        from bulk_upsert import upsert_gunpla
+        from models import db
+
+        rows = [dict(item, grade=config.grade, series=config.series, source_url=item['url'])
+                for item in items]
+        with app_context():
+            saved, updated, _ = upsert_gunpla(db.session, rows, overwrite=OVERWRITE_FIELDS)
+            db.session.commit()
+        return saved, updated
+
+    # ---- 完整流程 ----
+
+    def scrape(self, config, include_price=True, save=True, incremental=False, max_age=None, frontier=None):
+        """
+        爬取一个级别
+
+        参数:
+            incremental: 增量模式，只抓取 select_for_refresh 挑出的详情页
+            max_age: 增量模式下详情页的有效期（timedelta），默认 Config.CRAWL_MAX_AGE_DAYS 天
+            frontier: 爬取检查点（CrawlFrontier）；中断后重新运行时跳过已完成的详情页，
+                全部入库后删除该级别的检查点
+
+        返回:
+            dict: grade / items（最终录入的条目）/ found / fetched / priced / saved / updated / elapsed，
+            以及 parsed / parse_seconds（详情页解析的页数和耗时）、save_seconds（入库耗时）
+        """
+        if isinstance(config, str):
+            config = get_grade(config)
+        started = time.perf_counter()
+        print("=" * 60)
+        print(f"完善{config.grade}数据库 - {'包含' if include_price else '不含'}价格信息"
+              f"{'（增量）' if incremental else ''}")
+        print("=" * 60)
+        print(f"URL: {config.url}\n")
+
+        items = self.parse_listing(config, self.scraper.fetch(config.url, kind='series'))
+        found = len(items)
+        subcategory_count = {}
+        for item in items:
+            subcategory_count[item['subcategory']] = subcategory_count.get(item['subcategory'], 0) + 1
+        print(f"找到 {found} 个{config.grade}模型")
+        print("\n子分类统计：")
+        for subcat, count in sorted(subcategory_count.items()):
+            print(f"  {subcat}: {count} 个")
+
+        targets = []
+        if include_price and items:
+            targets = items
+            if incremental:
+                if max_age is None:
+                    max_age = timedelta(days=Config.CRAWL_MAX_AGE_DAYS)
+                targets, reasons = self.select_for_refresh(config, items, max_age)
+                print(f"\n增量模式：需要抓取 {len(targets)} 个详情页，跳过 {found - len(targets)} 个")
+                for reason, count in sorted(reasons.items()):
+                    print(f"  {reason}: {count} 个")
+
+        # 抓取详情页的条目处理完就分批入库，其余条目最后入库
+        sink = (lambda batch: self.save(config, batch)) if save else (lambda batch: (0, 0))
+        priced = 0
+        parse_stats = dict(self.pipeline.stats)
+        with BatchWriter(sink, SAVE_BATCH_SIZE) as writer:
+            if targets:
+                print(f"\n开始爬取价格信息...\n")
+                priced, dropped = self.fetch_prices(
+                    config, targets, revalidate=incremental, writer=writer, frontier=frontier,
+                )
+                items = [item for item in items if item['name_cn'] not in dropped]
+                print(f"\n价格爬取统计：")
+                print(f"  找到价格: {priced} 个")
+                print(f"  未找到价格: {len(targets) - priced} 个")
+                if dropped:
+                    print(f"  跳过录入（{config.drop_unpriced}且无价格）: {len(dropped)} 个")
+                print(f"  最终将录入: {len(items)} 个模型")
+            fetched = {item['name_cn'] for item in targets}
+            for item in items:
+                if item['name_cn'] not in fetched:
+                    writer.put(item)
+
+        if frontier is not None and targets:
+            frontier.finish(config.grade)
+
+        saved = sum(result[0] for result in writer.results)
+        updated = sum(result[1] for result in writer.results)
+        if save:
+            print(f"\n保存完成！")
+            print(f"  新增: {saved} 条")
+            print(f"  更新: {updated} 条")
+            print(f"  未变化: {len(items) - saved - updated} 条")
+
+        return {
+            'grade': config.grade,
+            'items': items,
+            'found': found,
+            'fetched': len(targets),
+            'priced': priced,
+            'saved': saved,
+            'updated': updated,
+            'elapsed': round(time.perf_counter() - started, 2),
+            'parsed': self.pipeline.stats['parsed'] - parse_stats['parsed'],
+            'parse_seconds': self.pipeline.stats['parse_seconds'] - parse_stats['parse_seconds'],
+            'save_seconds': writer.seconds,
+        }
+
+
+def scrape_grades(grades=None, include_price=True, save=True, engine=None,
+                  requests_per_second=None, concurrency=None,
+                  cache=True, offline=False, refresh=False, incremental=False, max_age=None,
+                  parse_workers=None, checkpoint=True, fresh=False):
+    """
+    在同一进程内依次爬取多个级别（共用连接池、限速和解析进程池）
+
+    参数:
+        grades: 级别名称列表，默认全部
+        incremental / max_age: 见 GradeScraper.scrape
+        checkpoint: True 使用配置的爬取检查点（Config.CRAWL_FRONTIER_PATH），False 不使用，
+            也可以传入 CrawlFrontier；上次中断的级别从检查点继续
+        fresh: 先丢弃这些级别的检查点，从头爬取
+    返回:
+        {级别: GradeScraper.scrape 的结果}；某个级别失败时打印错误并继续下一个
+    """
+    configs = [get_grade(grade) for grade in grades] if grades else list(GRADES.values())
+    results = {}
+    frontier = None
+    if include_price and checkpoint:
+        frontier = crawl_frontier.from_config() if checkpoint is True else checkpoint
+    if frontier is not None:
+        if fresh:
+            for config in configs:
+                frontier.discard(config.grade)
+        names = {config.grade for config in configs}
+        for grade, _, _, counts in frontier.status():
+            if grade in names:
+                handled = sum(counts.values()) - counts.get(crawl_frontier.PENDING, 0)
+                print(f"{grade} 有未完成的检查点（已处理 {handled}/{sum(counts.values())} 个详情页），将从中断处继续")
+    scraper = GradeScraper(
+        engine, requests_per_second=requests_per_second, concurrency=concurrency,
+        cache=cache, offline=offline, refresh=refresh, parse_workers=parse_workers,
+    )
+    try:
+        for config in configs:
+            try:
+                results[config.grade] = scraper.scrape(
+                    config, include_price=include_price, save=save,
+                    incremental=incremental, max_age=max_age, frontier=frontier,
+                )
+            except Exception as e:
+                print(f"{config.grade} 爬取失败: {e}")
+                import traceback
+                traceback.print_exc()
+            print()
+    finally:
+        if engine is None:
+            scraper.close()
+        else:
+            scraper.pipeline.close()
+        if frontier is not None and checkpoint is True:
+            frontier.close()
+    stats = scraper.engine.stats
+    print(f"请求 {stats['requests']} 次，重试 {stats['retries']} 次，失败 {stats['failures']} 次，"
+          f"缓存命中 {stats['cache_hits']} 次，未修改(304) {stats['not_modified']} 次，"
+          f"下载 {stats['bytes'] / 1024:.1f} KB")
+    return results
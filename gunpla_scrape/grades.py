@@ -0,0 +1,176 @@
+"""
+各级别页面的爬取规则
+
+每个级别只需声明：页面URL、系列名称、子分类标题、需要排除的条目和价格范围，
+链接筛选、价格抓取和入库由 engine.GradeScraper 统一完成
+"""
+import re
+
+from series_page import DEFAULT_SUBCATEGORY
+
+SITE_URL = 'https://acg.78dm.net'
+
+# 导航链接的关键词（所有级别通用）
+SKIP_KEYWORDS = ['更多', '显示', '隐藏', '加载', '级别分类详情']
+
+# 级别页面上出现的其他级别名称（导航链接，不是产品）；每个级别会去掉自己的名称
+OTHER_GRADES = [
+    'RG', 'PG', 'MG', 'RE/100', 'HGUC', 'HGGTO', 'HGBF', 'HGBD', 'HGBF/BD', 'HGIBO', 'SDCS', '30MM', 'FM',
+    'MB', 'MR魂', 'FIX', 'R魂', 'GU', 'FW食玩', 'G-FRAME', 'MSE',
+    '万代机甲', '万代人形', '超合金魂', 'BEASTBOX', 'MEGABOX',
+    '骨装机兵', '骨装机兵 FA', 'FA', 'FAG', '女神装置', 'MODEROID', '千值练', '海洋堂',
+    'threezero', 'threezero美系', 'Hot Toys', '麦克法兰', 'Sideshow', 'NECA', 'MEDICOM',
+    'MEDICOM奇迹可动', 'Mezco', '田宫', '小号手', '威龙', 'MENG', '爱德美', '长谷川',
+    '青岛社', '威骏', '红星',
+]
+
+# 其他品类关键词（这些是其他产品类别，不是高达模型）
+OTHER_CATEGORIES = [
+    # 变形金刚及其子系列
+    '变形金刚', 'SS系列', '大黄蜂美版', '变5美版', '日经', 'MP日版', 'G系列',
+    '王国', '地出', 'TFP美版', 'G1', '铁机巧', 'DLX',
+    # 特摄周边及其子系列
+    '特摄周边', 'S.H.Figuarts', 'DX假面骑士', 'S.I.C', 'RAH', 'X-PLUS',
+    'S.H.M', '假面骑士大集结', '掌动SHODO',
+    # 潮流玩具及其子系列
+    '潮流玩具', '52TOYS', 'POP MART', '末匠', '19八3', '奇谭俱乐部',
+    '撕裂熊', 'tokidoki', '豆芽水产',
+    # 其他品类
+    '科幻机甲', '美系周边', '军模民用',
+]
+
+
+class GradeConfig:
+    """
+    一个级别页面的爬取规则
+
+    参数:
+        grade: 级别（入库的 grade 字段）
+        url: 级别页面地址（相对于 SITE_URL 或完整URL）
+        series: 新增记录的系列名称
+        subcategories: 子分类列表，页面上的标题为"<子分类>共N款"；
+            也可以写成 (标题正则, 子分类)，用于标题与子分类名称不同的情况
+        default_subcategory: 第一个子分类标题之前的链接所属的子分类
+        aliases: 本级别在页面上的名称（不当作其他级别过滤），默认只有 grade
+        exclude_keywords: 名称包含这些关键词的链接不录入（如没有实际产品的企划条目）
+        skip_keywords: 额外的导航链接关键词
+        price_max: 日本定价的合理上限（日元）
+        drop_unpriced: 这个子分类中找不到价格的条目不录入（参考出品等）
+    """
+
+    def __init__(self, grade, url, series, subcategories, default_subcategory=DEFAULT_SUBCATEGORY,
+                 aliases=None, exclude_keywords=(), skip_keywords=(), price_max=50000,
+                 drop_unpriced=None):
+        self.grade = grade
+        self.url = url if url.startswith('http') else SITE_URL + url
+        self.series = series
+        self.subcategories = list(subcategories)
+        self.default_subcategory = default_subcategory
+        self.aliases = set(aliases or (grade,))
+        self.exclude_keywords = list(exclude_keywords)
+        self.skip_keywords = SKIP_KEYWORDS + list(skip_keywords)
+        self.price_max = price_max
+        self.drop_unpriced = drop_unpriced
+        self.other_grades = [name for name in OTHER_GRADES if name not in self.aliases]
+
+    @property
+    def patterns(self):
+        """[(标题正则, 子分类)]，供 series_page.tag_links 使用"""
+        patterns = []
+        for entry in self.subcategories:
+            if isinstance(entry, tuple):
+                title, name = entry
+            else:
+                title, name = re.escape(entry), entry
+            patterns.append((title + r'共\d+款', name))
+        return patterns
+
+    def __repr__(self):
+        return f'<GradeConfig {self.grade}>'
+
+
+GRADES = {config.grade: config for config in [
+    GradeConfig(
+        'RG', '/ct/341672.html', 'RG系列拼装模型',
+        ['普通版', '网络限定版', '其他限定版', 'EVANGELION系列', '勇者王系列',
+         ('参考出品/开发中(?:商品)?', '参考出品/开发中')],
+        exclude_keywords=['未商品化'],
+        drop_unpriced='参考出品/开发中',
+    ),
+    GradeConfig(
+        'MG', '/ct/2328.html', 'MG系列拼装模型',
+        ['EXtreme', '普通版', '网络限定版', '其他限定版', '限定电镀版', '限量版RX-79[G]特别涂装版',
+         '竞赛奖品版', '水晶版', '彩色电镀版', '圣战士丹拜因', '机动警察', '一年战争版',
+         '往期未商品化参考出品'],
+        exclude_keywords=['往期未商品化参考出品'],
+        price_max=100000,
+        drop_unpriced='往期未商品化参考出品',
+    ),
+    GradeConfig(
+        'PG', '/ct/2373.html', 'PG系列拼装模型',
+        ['Unleashed', '普通版', '网络限定版', '其他限定版', '定制部件', '综合系列'],
+        price_max=100000,
+    ),
+    GradeConfig(
+        'HGUC', '/ct/2377.html', 'HGUC拼装模型系列',
+        ['普通版', '网络限定版', '其他限定版', '特别版',
+         'HG 40周年纪念系列 (非HGUC)', 'HG 30周年纪念版 (非HGUC)', 'HG U.C.Hard Graph',
+         'HG(1990)系列 (非HGUC)', '往期未商品化/开发中 企划&参考出品'],
+        exclude_keywords=['往期未商品化', '开发中'],
+        drop_unpriced='往期未商品化/开发中 企划&参考出品',
+    ),
+    GradeConfig(
+        'HGGTO', '/ct/85410.html', 'HG 高达The Origin拼装模型',
+        ['普通版', '网络限定版', '其他限定版'],
+    ),
+    GradeConfig(
+        'HGBF/BD', '/ct/59836.html', '钢普拉Build 综合拼装模型系列',
+        ['1/144系列', 'HG创战元宇宙', 'EG GBM', 'SDCS GBM', 'FRS GBM', 'HG高达破坏者 对战记录',
+         'HG高达创形者', 'HG高达创战者', 'HG高达创战者TRY', 'HG高达创形者Re:RISE',
+         'HG Customize Campaign', (re.escape("HG PETIT'GGUY "), "HG PETIT'GGUY"),
+         "HG PETIT'GGUY 其他限定版", 'HAROPLA'],
+        default_subcategory='HG高达创战者',
+        aliases=['HGBF', 'HGBD', 'HGBF/BD'],
+    ),
+    GradeConfig(
+        'HGIBO', '/ct/92653.html', '高达铁血的奥尔芬斯拼装模型',
+        # 只关注HG 1/144部分，TV 1/100部分属于FM系列
+        [('HG 1/144 普通版', '普通版'), ('HG 1/144 网络限定版', '网络限定版'),
+         ('HG 1/144 其他限定版', '其他限定版')],
+        exclude_keywords=['TV 1/100', 'CHARA STAND PLATE'],
+    ),
+    GradeConfig(
+        'EG', '/ct/338559.html', 'ENTRY GRADE',
+        ['EG (2011)', '高达系列', '高达一番赏限定', '龙珠系列', '特摄系列', '综合系列'],
+        default_subcategory='高达系列',
+        skip_keywords=['显示全部', '隐藏部分'],
+    ),
+    GradeConfig(
+        'FM', '/ct/352682.html', 'Full Mechanics系列',
+        ['普通版', '网络限定版', '特别版'],
+        skip_keywords=['新品速递', '好帖推荐', '精彩评测'],
+        price_max=100000,
+    ),
+    GradeConfig(
+        '30MM', '/ct/133152.html', '30 MINUTES MISSIONS 30MM 1/144科幻拼装模型',
+        ['装甲核心', 'Porta Nova', 'Porta Nova 拓展配件', 'Cielnova', 'Cielnova 拓展配件',
+         'Spinatio', 'Spinatio 扩展配件', '水贴', '30MM 自定义材质', '30MM 自定义场景',
+         '30MM 自定义特效', '特殊限定版', '1/144 泰克普罗托'],
+        default_subcategory='Porta Nova',
+    ),
+    GradeConfig(
+        'SDCS', '/ct/123443.html', 'SDCS系列拼装模型',
+        ['普通版', '超级机器人系列', '拓展部件', '特别版', '限定版', '未商品化往期参考出品'],
+        exclude_keywords=['未商品化', '往期参考出品'],
+        drop_unpriced='未商品化往期参考出品',
+    ),
+]}
+
+
+def get_grade(name):
+    """按名称查找级别配置（不区分大小写，HGBF/BD 也可以写成 HGBF_BD 或 HGBFBD）"""
+    key = name.strip().upper()
+    for grade, config in GRADES.items():
+        if key in (grade, grade.replace('/', '_'), grade.replace('/', '')):
+            return config
+    raise KeyError(f'未知级别: {name}（可选: {", ".join(GRADES)}）')
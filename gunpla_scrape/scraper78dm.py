@@ -0,0 +1,433 @@
+"""
+78动漫网站爬虫
+专门用于爬取 https://acg.78dm.net 的高达数据
+
+BeautifulSoup、requests、Flask 和数据库模型都在用到时才导入：
+只抓取、解析的任务不加载 Web 应用和 SQLAlchemy，解析子进程也不会导入它们
+"""
+import re
+import time
+from datetime import datetime
+
+import detail_page
+import page_cache
+from config import Config
+from crawl_pipeline import CrawlPipeline
+from fetch_engine import FetchEngine
+from series_page import DEFAULT_SUBCATEGORY, entry_hash, tag_links
+from .database import app_context
+
+
+class Scraper78DM:
+    def __init__(self, engine=None, requests_per_second=None, concurrency=None,
+                 cache=True, offline=False, refresh=False, parse_workers=None):
+        """
+        参数:
+            engine: 共享的 FetchEngine（多个爬虫共用连接池和限速）；不传时按配置新建
+            requests_per_second: 每秒请求数（默认使用 Config.SCRAPER_REQUESTS_PER_SECOND）
+            concurrency: 并发数（默认使用 Config.SCRAPER_CONCURRENCY）
+            cache: True 使用配置的页面缓存（Config.PAGE_CACHE_DIR），False 不缓存，也可以传入 PageCache
+            offline: 只读缓存，不访问网络
+            refresh: 忽略缓存有效期，全部向服务器重新验证
+            parse_workers: 详情页解析进程数（默认使用 Config.SCRAPER_PARSE_WORKERS，0 表示不用进程池）
+        """
+        if cache is True:
+            cache = page_cache.from_config()
+        self.engine = engine or FetchEngine(
+            requests_per_second=requests_per_second or Config.SCRAPER_REQUESTS_PER_SECOND,
+            concurrency=concurrency or Config.SCRAPER_CONCURRENCY,
+            max_retries=Config.SCRAPER_MAX_RETRIES,
+            cache=cache or None,
+            offline=offline,
+            refresh=refresh,
+        )
+        self.pipeline = CrawlPipeline(
+            self.engine,
+            workers=Config.SCRAPER_PARSE_WORKERS if parse_workers is None else parse_workers,
+        )
+        self.base_url = 'https://acg.78dm.net'
+    
+    def close(self):
+        """关闭解析进程池和抓取线程池"""
+        self.pipeline.close()
+        self.engine.close()
+    
+    @property
+    def session(self):
+        """当前线程复用连接的 requests.Session"""
+        return self.engine.session
+    
+    def fetch(self, url, timeout=15, kind=None):
+        """抓取页面（限速、重试、缓存），返回HTML文本；kind 为页面类型 'series' / 'detail'"""
+        return self.engine.fetch(url, timeout=timeout, kind=kind).text
+    
+    def parse_price(self, price_text):
+        """解析价格文本，例如："2500→2800日元" -> 2500"""
+        return detail_page.parse_price(price_text)
+    
+    def extract_model_number(self, name):
+        """从名称中提取机体编号"""
+        # 常见的编号格式：RX-78-2, MS-06S, GNT-0000等
+        patterns = [
+            r'([A-Z]{1,3}-\d{2,4}[A-Z]?)',  # RX-78-2, MS-06S
+            r'([A-Z]{2,4}\d{1,3})',  # RG02, HG123
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, name)
+            if match:
+                return match.group(1)
+        return None
+    
+    def detect_subcategory(self, link_element, soup):
+        """
+        检测模型所属的子分类
+        
+        参数:
+            link_element: 链接元素
+            soup: BeautifulSoup对象
+        
+        返回:
+            子分类名称
+        """
+        # 同一页面只遍历一次，之后直接查表
+        cached_soup, subcategories = getattr(self, '_subcategory_cache', (None, None))
+        if cached_soup is not soup:
+            subcategories = {id(link): subcategory for link, subcategory in tag_links(soup)}
+            self._subcategory_cache = (soup, subcategories)
+        return subcategories.get(id(link_element), DEFAULT_SUBCATEGORY)
+    
+    def scrape_series_page(self, url, grade='RG'):
+        """
+        爬取系列页面（如RG系列页面），自动识别子分类
+        
+        参数:
+            url: 系列页面URL，例如：https://acg.78dm.net/ct/341672.html
+            grade: 级别，如 'RG', 'MG', 'HG' 等
+        """
+        print(f"正在爬取: {url}")
+        print(f"级别: {grade}")
+        
+        from bs4 import BeautifulSoup
+
+        try:
+            soup = BeautifulSoup(self.fetch(url, kind='series'), 'html.parser')
+            gunpla_list = []
+            
+            # 查找所有模型链接，遍历一次页面同时确定子分类
+            tagged_links = tag_links(soup)
+            
+            # 统计子分类
+            subcategory_count = {}
+            
+            for link, subcategory in tagged_links:
+                name = link.get_text(strip=True)
+                href = link.get('href', '')
+                
+                # 过滤掉无效链接和导航链接
+                if not name or len(name) < 2:
+                    continue
+                
+                # 跳过一些明显的非模型链接
+                if any(skip in name for skip in ['更多', '显示', '隐藏', '加载', '级别', '分类', '共']):
+                    continue
+                
+                # 构建完整URL
+                if href.startswith('/'):
+                    full_url = self.base_url + href
+                elif href.startswith('http'):
+                    full_url = href
+                else:
+                    continue
+                
+                subcategory_count[subcategory] = subcategory_count.get(subcategory, 0) + 1
+                
+                # 提取基本信息
+                data = {
+                    'name_cn': name,
+                    'grade': grade,
+                    'url': full_url,
+                    'subcategory': subcategory,
+                    'content_hash': entry_hash(name, full_url, subcategory),
+                }
+                
+                # 尝试从名称中提取编号
+                ms_number = self.extract_model_number(name)
+                if ms_number:
+                    data['ms_number'] = ms_number
+                
+                gunpla_list.append(data)
+            
+            # 去重
+            seen = set()
+            unique_list = []
+            for item in gunpla_list:
+                name_key = item['name_cn']
+                if name_key not in seen:
+                    seen.add(name_key)
+                    unique_list.append(item)
+            
+            # 打印子分类统计
+            print(f"\n子分类统计：")
+            for subcat, count in sorted(subcategory_count.items()):
+                print(f"  {subcat}: {count} 个")
+            
+            print(f"\n找到 {len(unique_list)} 个模型")
+            return unique_list
+            
+        except Exception as e:
+            print(f"爬取失败: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+    
+    def scrape_item_detail(self, url):
+        """
+        爬取单个模型的详细信息页面，提取价格信息
+        
+        参数:
+            url: 单品页面URL
+        
+        返回:
+            包含价格信息的字典
+        """
+        try:
+            return self.parse_item_detail(self.fetch(url, timeout=10, kind='detail'))
+        except Exception as e:
+            print(f"爬取详情失败 {url}: {e}")
+            return {}
+    
+    def scrape_item_details(self, gunpla_list, frontier=None, grade=None):
+        """
+        并发爬取列表中所有模型的详细信息，把价格合并到各项中，抓取成功的条目记下 last_crawled_at
+        吞吐量由限速（每秒请求数）决定，不再受单次请求耗时影响；页面在解析进程池中解析
+        传入 frontier（CrawlFrontier）和 grade 时结果写入检查点，检查点中已完成的页面不再抓取
+        
+        返回:
+            找到价格的数量
+        """
+        items = [item for item in gunpla_list if item.get('url')]
+        by_url = {}
+        for item in items:
+            by_url.setdefault(item['url'], []).append(item)
+        
+        finished = {}
+        if frontier is not None:
+            finished = frontier.begin(grade, list(by_url))
+            if finished:
+                print(f"从检查点继续：{len(finished)} 个详情页已处理，抓取其余 {len(by_url) - len(finished)} 个")
+        
+        def outcomes():
+            """(url, 详情, 异常, 抓取时间)：先是检查点中的结果，再是本次抓取的结果"""
+            for entry in finished.values():
+                yield entry.url, entry.result, entry.error, entry.crawled_at
+            pending = [url for url in by_url if url not in finished]
+            for url, detail, error in self.pipeline.run(detail_page.parse_item_detail, pending, kind='detail'):
+                if frontier is not None:
+                    frontier.record(grade, url, detail, error)
+                yield url, detail, error, None
+        
+        found = 0
+        for i, (url, detail, error, crawled_at) in enumerate(outcomes(), 1):
+            name = by_url[url][0]['name_cn']
+            if error is not None:
+                print(f"[{i}/{len(by_url)}] 爬取详情失败 {name}: {error}")
+                continue
+            crawled_at = crawled_at or datetime.utcnow()
+            for item in by_url[url]:
+                item['last_crawled_at'] = crawled_at
+            if not detail.get('price_jp_msrp'):
+                print(f"[{i}/{len(by_url)}] {name}: 未找到价格信息")
+                continue
+            
+            # 换算为美元和人民币定价
+            converted = self.convert_price(detail['price_jp_msrp'])
+            for item in by_url[url]:
+                item['price_jp_msrp'] = detail['price_jp_msrp']
+                item.update(converted)
+            found += 1
+            print(f"[{i}/{len(by_url)}] {name}  价格: ¥{detail['price_jp_msrp']:.0f} (JPY) → ${converted.get('price_us_msrp', 0):.2f} (USD) / ¥{converted.get('price_cn_msrp', 0):.2f} (CNY)")
+        return found
+    
+    def parse_item_detail(self, html):
+        """从单品页面HTML中提取价格等信息（见 detail_page.parse_item_detail）"""
+        return detail_page.parse_item_detail(html)
+    
+    def convert_price(self, jpy_price, jpy_to_usd=0.0067, jpy_to_cny=0.05):
+        """
+        将日元价格转换为美元和人民币价格
+        
+        参数:
+            jpy_price: 日元价格
+            jpy_to_usd: 日元对美元汇率（默认：1日元 = 0.0067美元，约150日元=1美元）
+            jpy_to_cny: 日元对人民币汇率（默认：1日元 = 0.05人民币，约20日元=1人民币）
+        
+        返回:
+            包含转换后价格的字典
+        """
+        if not jpy_price:
+            return {}
+        
+        return {
+            'price_us_msrp': round(jpy_price * jpy_to_usd, 2),
+            'price_cn_msrp': round(jpy_price * jpy_to_cny, 2),
+        }
+    
+    def save_to_database(self, gunpla_list, grade=None, raise_errors=False):
+        """
+        保存到数据库（批量 upsert，一次提交）
+        已有记录只补全为空的字段（价格、子分类等），不覆盖已有值
+        保存失败时回滚并返回 0；raise_errors 为 True 时抛出异常
+        """
+        from bulk_upsert import upsert_gunpla
+        from models import db
+
+        rows = []
+        for data in gunpla_list:
+            # 如果指定了级别，使用指定的级别
+            rows.append(dict(
+                data,
+                grade=grade or data.get('grade') or '其他',
+                series=data.get('series', 'RG系列拼装模型'),
+                source_url=data.get('source_url') or data.get('url'),
+            ))
+        
+        with app_context():
+            try:
+                saved_count, updated_count, skipped_count = upsert_gunpla(db.session, rows, overwrite=False)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"保存数据失败: {e}")
+                if raise_errors:
+                    raise
+                return 0
+            print(f"\n保存完成！")
+            print(f"新增: {saved_count} 条")
+            print(f"更新: {updated_count} 条")
+            print(f"跳过（已存在）: {skipped_count} 条")
+            return saved_count
+
+
+def scrape_rg_series(include_price=True, delay=None):
+    """
+    爬取RG系列，包括价格信息
+    
+    参数:
+        include_price: 是否爬取价格信息（默认True）
+        delay: 兼容旧参数：两次请求之间的平均间隔（秒），换算为每秒请求数；
+            默认使用 Config.SCRAPER_REQUESTS_PER_SECOND
+    """
+    scraper = Scraper78DM(requests_per_second=1 / delay if delay else None)
+    
+    try:
+        # RG系列页面
+        url = 'https://acg.78dm.net/ct/341672.html'
+    
+        print("=" * 60)
+        print("开始爬取RG系列")
+        print("=" * 60)
+    
+        # 爬取列表
+        gunpla_list = scraper.scrape_series_page(url, grade='RG')
+    
+        if gunpla_list:
+            print(f"\n成功爬取 {len(gunpla_list)} 个模型")
+        
+            # 爬取详细信息（价格等）
+            if include_price:
+                rate = scraper.engine.requests_per_second
+                print(f"\n开始爬取价格信息（每秒 {rate:g} 个请求，并发 {scraper.engine.concurrency}）...")
+                print(f"预计需要 {len(gunpla_list) / rate / 60:.1f} 分钟")
+                print("正在爬取，请耐心等待...\n")
+            
+                started = time.monotonic()
+                found = scraper.scrape_item_details(gunpla_list)
+                print(f"\n找到 {found} 个价格，用时 {time.monotonic() - started:.1f} 秒")
+        
+            # 保存到数据库
+            print(f"\n保存数据到数据库...")
+            scraper.save_to_database(gunpla_list, grade='RG')
+        else:
+            print("未能爬取到数据，请检查网站结构或网络连接")
+    finally:
+        scraper.close()
+
+
+def scrape_by_grade(grade, url):
+    """
+    按级别爬取
+    
+    参数:
+        grade: 级别，如 'RG', 'MG', 'HG' 等
+        url: 该级别的系列页面URL
+    """
+    scraper = Scraper78DM()
+    
+    try:
+        print("=" * 60)
+        print(f"开始爬取{grade}系列")
+        print("=" * 60)
+    
+        gunpla_list = scraper.scrape_series_page(url, grade=grade)
+    
+        if gunpla_list:
+            print(f"\n成功爬取 {len(gunpla_list)} 个模型")
+            scraper.save_to_database(gunpla_list, grade=grade)
+        else:
+            print("未能爬取到数据")
+    finally:
+        scraper.close()
+
+
+def update_existing_prices(grade='RG', delay=None):
+    """
+    更新已有模型的价格信息（只更新价格为空、且记录了详情页URL的模型）
+    
+    参数:
+        grade: 级别
+        delay: 两次请求之间的平均间隔（秒）
+    """
+    from sqlalchemy import or_
+
+    from bulk_upsert import upsert_gunpla
+    from models import db, Gunpla
+
+    with app_context():
+        # 获取所有该级别且没有价格的模型
+        rows = db.session.query(Gunpla.name_cn, Gunpla.source_url).filter(
+            Gunpla.grade == grade,
+            or_(Gunpla.price_jp_msrp.is_(None), Gunpla.price_jp_msrp == 0),
+        ).all()
+    
+    if not rows:
+        print(f"所有{grade}系列模型都已包含价格信息")
+        return 0
+    
+    gunpla_list = [{'name_cn': name, 'grade': grade, 'url': url} for name, url in rows if url]
+    missing_url = len(rows) - len(gunpla_list)
+    print(f"找到 {len(rows)} 个需要更新价格的模型，其中 {len(gunpla_list)} 个记录了详情页URL")
+    if missing_url:
+        print(f"{missing_url} 个没有详情页URL，请先运行 python -m gunpla_scrape --grades {grade} 记录URL")
+    if not gunpla_list:
+        return 0
+    
+    print(f"开始更新价格信息...\n")
+    scraper = Scraper78DM(requests_per_second=1 / delay if delay else None)
+    try:
+        found = scraper.scrape_item_details(gunpla_list)
+    finally:
+        scraper.close()
+    
+    with app_context():
+        _, updated_count, _ = upsert_gunpla(
+            db.session, gunpla_list,
+            overwrite=('price_jp_msrp', 'price_us_msrp', 'price_cn_msrp'),
+        )
+        db.session.commit()
+    
+    print(f"\n更新完成！")
+    print(f"找到价格: {found} 个")
+    print(f"更新记录: {updated_count} 条")
+    return updated_count
+
@@ -0,0 +1,424 @@
+"""
+录制 / 回放 78动漫页面，用于离线测试和基准测试
+
+- FixtureArchive: 测试数据包（zip）。index.json 记录每个 URL 的状态码、响应头和正文摘要，
+  正文按 sha256 只存一份（bodies/<摘要>）
+- RecordingAdapter: 挂在 FetchEngine 的 Session 上，把真实响应写入测试数据包
+- FixtureServer: 本地 HTTP 服务，按原始 URL 返回录制的响应，可以设置延迟、抖动和故障率
+- RedirectAdapter: 把 Session 的所有请求转到 FixtureServer（原始 URL 放在 X-Fixture-URL 请求头中）
+
+用法:
+  python http_fixtures.py record --grades RG,MG --out data/fixtures/78dm.zip
+  python http_fixtures.py from-cache --out data/fixtures/78dm.zip
+  python http_fixtures.py serve data/fixtures/78dm.zip --port 8078 --latency 50 --fail-rate 0.05
+  python http_fixtures.py list data/fixtures/78dm.zip
+
+基准测试见 scripts/benchmarks/bench_scrapers.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+DEFAULT_ARCHIVE = os.path.join('data', 'fixtures', '78dm.zip')
+
+# 录制时保留的响应头
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+# 回放时携带原始 URL 的请求头
+FIXTURE_URL_HEADER = 'X-Fixture-URL'
+
+
+class Fixture:
+    """一个录制的响应（正文在数据包中，按 digest 读取）"""
+    __slots__ = ('url', 'status', 'headers', 'encoding', 'digest')
+
+    def __init__(self, url, status, headers, encoding, digest):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.encoding = encoding
+        self.digest = digest
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'url'}
+
+
+def _lookup_key(url):
+    """服务端只拿到路径时用来查找的键：路径 + 查询串"""
+    parts = urlsplit(url)
+    return parts.path + ('?' + parts.query if parts.query else '')
+
+
+class FixtureArchive:
+    """
+    测试数据包（zip），线程安全
+
+    已有文件的正文在需要时才从 zip 中读取；新录制的正文先放在内存里，save 时重写整个文件
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fixtures = {}
+        self._bodies = {}   # 尚未写入文件的正文
+        self._lock = threading.Lock()
+        self._zip = None
+        self._by_path = None
+        if os.path.exists(path):
+            self._zip = zipfile.ZipFile(path)
+            index = json.loads(self._zip.read('index.json'))
+            for url, data in index.items():
+                self.fixtures[url] = Fixture(url, **data)
+
+    def __len__(self):
+        return len(self.fixtures)
+
+    def __contains__(self, url):
+        return url in self.fixtures
+
+    def urls(self):
+        return sorted(self.fixtures)
+
+    def add(self, url, status, content, headers=None, encoding=None):
+        """记录一个响应；同一 URL 重复录制时以最后一次为准"""
+        digest = hashlib.sha256(content).hexdigest()
+        headers = {name: headers[name] for name in RECORDED_HEADERS if headers and headers.get(name)}
+        with self._lock:
+            self.fixtures[url] = Fixture(url, status, headers, encoding, digest)
+            self._bodies.setdefault(digest, content)
+            self._by_path = None
+        return self.fixtures[url]
+
+    def get(self, url):
+        return self.fixtures.get(url)
+
+    def get_by_path(self, path):
+        """按路径 + 查询串查找（没有 X-Fixture-URL 请求头时，例如用浏览器访问回放服务）"""
+        with self._lock:
+            if self._by_path is None:
+                self._by_path = {_lookup_key(url): fixture for url, fixture in self.fixtures.items()}
+            return self._by_path.get(path)
+
+    def body(self, fixture):
+        with self._lock:
+            content = self._bodies.get(fixture.digest)
+            if content is None:
+                content = self._zip.read(f'bodies/{fixture.digest}')
+            return content
+
+    def size(self):
+        """正文总字节数（相同正文只计一次）"""
+        sizes = {fixture.digest: len(self.body(fixture)) for fixture in self.fixtures.values()}
+        return sum(sizes.values())
+
+    def save(self):
+        """写入文件（先写临时文件再替换，中途失败不会损坏原有数据包）"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.zip.tmp')
+        os.close(fd)
+        with self._lock:
+            try:
+                with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as out:
+                    index = {url: fixture.to_dict() for url, fixture in sorted(self.fixtures.items())}
+                    out.writestr('index.json', json.dumps(index, ensure_ascii=False, indent=1))
+                    for digest in sorted({fixture.digest for fixture in self.fixtures.values()}):
+                        content = self._bodies.get(digest)
+                        if content is None:
+                            content = self._zip.read(f'bodies/{digest}')
+                        out.writestr(f'bodies/{digest}', content)
+                if self._zip is not None:
+                    self._zip.close()
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self._zip = zipfile.ZipFile(self.path)
+            self._bodies = {}
+
+    def close(self):
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+
+
+class RecordingAdapter(HTTPAdapter):
+    """把经过的响应写入 archive（5xx 和 304 不录制）"""
+
+    def __init__(self, archive, **kwargs):
+        self.archive = archive
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code < 500 and response.status_code != 304:
+            self.archive.add(
+                request.url, response.status_code, response.content,
+                headers=response.headers, encoding=response.encoding,
+            )
+        return response
+
+
+class RedirectAdapter(HTTPAdapter):
+    """把所有请求发到 base_url（FixtureServer），响应的 url 仍是原始 URL"""
+
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url.rstrip('/')
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = request.url
+        request = request.copy()
+        request.headers[FIXTURE_URL_HEADER] = url
+        request.url = self.base_url + _lookup_key(url)
+        response = super().send(request, **kwargs)
+        response.url = url
+        return response
+
+
+class FixtureServer:
+    """
+    回放服务：按 X-Fixture-URL（或路径）返回录制的响应
+
+    参数:
+        archive: FixtureArchive
+        port: 0 表示随机端口（启动后见 url）
+        latency_ms / jitter_ms: 每个响应的固定延迟和随机附加延迟（毫秒）
+        fail_rate: 以该概率返回 fail_status（测试重试和失败处理）
+        seed: 随机数种子，相同种子的故障序列相同
+
+    录制的 ETag 与请求的 If-None-Match 相同时返回 304。
+    stats 记录 requests / served / not_modified / failures / missing / bytes
+    """
+
+    def __init__(self, archive, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0,
+                 fail_rate=0.0, fail_status=503, seed=None):
+        self.archive = archive
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'served': 0, 'not_modified': 0, 'failures': 0, 'missing': 0, 'bytes': 0}
+        self._server = ThreadingHTTPServer((host, port), partial(_FixtureHandler, self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _draw(self):
+        """(本次延迟秒数, 是否注入故障)"""
+        with self._lock:
+            delay = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+            fail = self.fail_rate > 0 and self._random.random() < self.fail_rate
+        return delay / 1000, fail
+
+    def start(self):
+        """在后台线程中启动"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, server, *args, **kwargs):
+        self.fixture_server = server
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, headers=None, content=b''):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if content and self.command != 'HEAD':
+            self.wfile.write(content)
+
+    def do_GET(self):
+        server = self.fixture_server
+        server._count('requests')
+        delay, fail = server._draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            server._count('failures')
+            self._reply(server.fail_status)
+            return
+
+        url = self.headers.get(FIXTURE_URL_HEADER)
+        fixture = server.archive.get(url) if url else server.archive.get_by_path(self.path)
+        if fixture is None:
+            server._count('missing')
+            self._reply(404)
+            return
+        etag = fixture.headers.get('ETag')
+        if etag and self.headers.get('If-None-Match') == etag:
+            server._count('not_modified')
+            self._reply(304, {'ETag': etag})
+            return
+        content = server.archive.body(fixture)
+        server._count('served')
+        server._count('bytes', len(content))
+        self._reply(fixture.status, fixture.headers, content)
+
+    do_HEAD = do_GET
+
+
+# ---- 命令行 ----
+
+def record(args):
+    """真实爬取指定级别（不写数据库），把所有响应录入数据包"""
+    from config import Config
+    from fetch_engine import FetchEngine
+    from gunpla_scrape import scrape_grades
+    from gunpla_scrape.__main__ import parse_grades
+
+    archive = FixtureArchive(args.out)
+    before = len(archive)
+    engine = FetchEngine(
+        requests_per_second=args.rps or Config.SCRAPER_REQUESTS_PER_SECOND,
+        concurrency=args.concurrency or Config.SCRAPER_CONCURRENCY,
+        max_retries=Config.SCRAPER_MAX_RETRIES,
+        adapter_factory=partial(RecordingAdapter, archive),
+    )
+    try:
+        scrape_grades(parse_grades(args.grades), include_price=not args.no_price, save=False, engine=engine)
+    finally:
+        engine.close()
+        archive.save()
+    print(f'{args.out}: {len(archive)} 个页面（新增 {len(archive) - before} 个），{archive.size() / 1024:.0f} KB')
+    return 0
+
+
+def from_cache(args):
+    """把页面缓存（PAGE_CACHE_DIR）中的页面转成数据包，不访问网络"""
+    import page_cache
+
+    cache = page_cache.PageCache(args.cache) if args.cache else page_cache.from_config()
+    if cache is None:
+        print('没有配置页面缓存')
+        return 1
+    archive = FixtureArchive(args.out)
+    added = 0
+    for entry in cache.entries():
+        try:
+            content = cache.body(entry)
+        except OSError:
+            continue
+        headers = {'Content-Type': f'text/html; charset={entry.encoding or "utf-8"}'}
+        if entry.etag:
+            headers['ETag'] = entry.etag
+        if entry.last_modified:
+            headers['Last-Modified'] = entry.last_modified
+        archive.add(entry.url, 200, content, headers=headers, encoding=entry.encoding)
+        added += 1
+    archive.save()
+    print(f'{args.out}: 从缓存导入 {added} 个页面，共 {len(archive)} 个，{archive.size() / 1024:.0f} KB')
+    return 0
+
+
+def serve(args):
+    archive = FixtureArchive(args.archive)
+    if not len(archive):
+        print(f'{args.archive} 中没有页面')
+        return 1
+    server = FixtureServer(
+        archive, host=args.host, port=args.port, latency_ms=args.latency, jitter_ms=args.jitter,
+        fail_rate=args.fail_rate, seed=args.seed,
+    )
+    print(f'回放 {len(archive)} 个页面: {server.url}（Ctrl+C 停止）')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(' '.join(f'{key}={value}' for key, value in server.stats.items()))
+    return 0
+
+
+def list_fixtures(args):
+    archive = FixtureArchive(args.archive)
+    for url in archive.urls():
+        fixture = archive.get(url)
+        print(f'{fixture.status} {fixture.digest[:12]} {url}')
+    print(f'共 {len(archive)} 个页面，{archive.size() / 1024:.0f} KB')
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='录制 / 回放 78动漫页面')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('record', help='真实爬取并录制（需要网络）')
+    p.add_argument('--grades', required=True, help='逗号分隔的级别，或 all')
+    p.add_argument('--out', default=DEFAULT_ARCHIVE)
+    p.add_argument('--no-price', action='store_true', help='只录制列表页')
+    p.add_argument('--rps', type=float)
+    p.add_argument('--concurrency', type=int)
+    p.set_defaults(func=record)
+
+    p = commands.add_parser('from-cache', help='从页面缓存生成数据包')
+    p.add_argument('--out', default=DEFAULT_ARCHIVE)
+    p.add_argument('--cache', help='页面缓存目录（默认取配置 PAGE_CACHE_DIR）')
+    p.set_defaults(func=from_cache)
+
+    p = commands.add_parser('serve', help='启动回放服务')
+    p.add_argument('archive', nargs='?', default=DEFAULT_ARCHIVE)
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8078)
+    p.add_argument('--latency', type=float, default=0, help='每个响应的延迟（毫秒）')
+    p.add_argument('--jitter', type=float, default=0, help='随机附加延迟上限（毫秒）')
+    p.add_argument('--fail-rate', type=float, default=0, help='返回 503 的概率')
+    p.add_argument('--seed', type=int)
+    p.set_defaults(func=serve)
+
+    p = commands.add_parser('list', help='列出数据包中的页面')
+    p.add_argument('archive', nargs='?', default=DEFAULT_ARCHIVE)
+    p.set_defaults(func=list_fixtures)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+启动导入耗时报告
+
+用 python -X importtime 运行一条命令，命令照常执行（输出不变），结束后按模块汇总导入耗时：
+每个顶层包的自身耗时之和，以及耗时最多的直接导入（含其依赖）。
+-X importtime 的每行是 "import time: 自身(us) | 累计(us) | 模块"，模块名前的缩进表示被谁导入
+
+命令行:
+    python import_profile.py -m gunpla_scrape --grades MG --dry-run
+    python import_profile.py -c "import app"
+    python import_profile.py --top 30 scripts/scrapers/update_prices.py --grade MG
+
+爬虫入口的 --profile-imports（python -m gunpla_scrape、scripts/scrapers/update_prices.py）也使用这里的 run_profiled。
+使用解析进程池时，子进程中的导入也计算在内
+"""
+import subprocess
+import sys
+
+_PREFIX = 'import time:'
+
+
+class ImportRecord:
+    """一个模块的导入：自身耗时和含依赖的累计耗时（微秒），depth 为 0 表示不是被其他模块导入的"""
+    __slots__ = ('module', 'self_us', 'cumulative_us', 'depth')
+
+    def __init__(self, module, self_us, cumulative_us, depth):
+        self.module = module
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse_line(line):
+    """解析 -X importtime 的一行；不是导入记录（包括表头）时返回 None"""
+    if not line.startswith(_PREFIX):
+        return None
+    parts = line[len(_PREFIX):].split('|')
+    if len(parts) != 3:
+        return None
+    try:
+        self_us, cumulative_us = int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+    name = parts[2].rstrip('\n')
+    stripped = name.lstrip(' ')
+    return ImportRecord(stripped, self_us, cumulative_us, (len(name) - len(stripped) - 1) // 2)
+
+
+def parse(lines):
+    return [record for record in map(parse_line, lines) if record is not None]
+
+
+def report(records, top=15):
+    """汇总成文本报告"""
+    total = sum(record.self_us for record in records)
+    packages = {}
+    for record in records:
+        package = record.module.split('.', 1)[0]
+        us, count = packages.get(package, (0, 0))
+        packages[package] = (us + record.self_us, count + 1)
+    roots = sorted((record for record in records if record.depth == 0),
+                   key=lambda record: record.cumulative_us, reverse=True)
+
+    lines = [f'导入耗时（-X importtime）：{len(records)} 个模块，合计 {total / 1000:.1f} ms']
+    lines.append('按顶层包（自身耗时之和）:')
+    for package, (us, count) in sorted(packages.items(), key=lambda item: item[1][0], reverse=True)[:top]:
+        lines.append(f'  {package:28} {us / 1000:8.1f} ms  {us / total if total else 0:6.1%}  {count:4} 个模块')
+    lines.append('耗时最多的直接导入（含依赖）:')
+    for record in roots[:top]:
+        lines.append(f'  {record.module:28} {record.cumulative_us / 1000:8.1f} ms')
+    return '\n'.join(lines)
+
+
+def run_profiled(args, top=15, out=None):
+    """
+    用 -X importtime 运行 python <args>，标准输出照常显示；导入记录从标准错误中分出，
+    其余错误输出照常转发。结束后把报告写到 out（默认标准错误），返回命令的退出码
+    """
+    out = sys.stderr if out is None else out
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', *args],
+        stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace',
+    )
+    records = []
+    for line in process.stderr:
+        record = parse_line(line)
+        if record is not None:
+            records.append(record)
+        elif not line.startswith(_PREFIX):
+            sys.stderr.write(line)
+    returncode = process.wait()
+    print('\n' + report(records, top), file=out)
+    return returncode
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    top = 15
+    if len(argv) >= 2 and argv[0] == '--top':
+        top = int(argv[1])
+        argv = argv[2:]
+    if not argv:
+        print(__doc__)
+        return 1
+    return run_profiled(argv, top)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
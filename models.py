@@ -2,13 +2,49 @@
 数据库模型定义
 """
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Numeric, case, cast, event, func
 from datetime import datetime
+from config import Config
 
 db = SQLAlchemy()
 
+
+def calculate_suan(price_jp_msrp, price_cn_market, jpy_to_cny_rate=None):
+    """按日本定价和中国市场价格计算"算"，任一价格缺失时返回 None"""
+    if jpy_to_cny_rate is None:
+        jpy_to_cny_rate = Config.JPY_TO_CNY_RATE
+    if price_jp_msrp and price_cn_market:
+        # 将日元定价转换为人民币
+        jp_yuan = price_jp_msrp / jpy_to_cny_rate
+        if jp_yuan > 0:
+            return round((price_cn_market / jp_yuan) * 100, 2)
+    return None
+
+
+def suan_expression(price_jp_msrp, price_cn_market, jpy_to_cny_rate=None):
+    """
+    "算"的SQL表达式（与 Gunpla.calculate_suan 相同，任一价格缺失时为NULL）
+    参数为列或其他SQL表达式，用于批量UPDATE和 upsert
+    """
+    if jpy_to_cny_rate is None:
+        jpy_to_cny_rate = Config.JPY_TO_CNY_RATE
+    suan = func.round(cast(price_cn_market * jpy_to_cny_rate * 100 / price_jp_msrp, Numeric), 2)
+    return case(((price_jp_msrp > 0) & (price_cn_market > 0), suan), else_=None)
+
+
 class Gunpla(db.Model):
     """高达模型信息表"""
     __tablename__ = 'gunpla'
+    __table_args__ = (
+        # 列表页按 (name_cn, id) 游标分页
+        db.Index('ix_gunpla_name_cn_id', 'name_cn', 'id'),
+        # 按"算"排序/筛选
+        db.Index('ix_gunpla_suan_id', 'suan', 'id'),
+        # 按级别/子分类筛选
+        db.Index('ix_gunpla_grade_subcategory', 'grade', 'subcategory'),
+        # 同一级别下名称唯一：爬虫批量 upsert 的冲突键，CSV导入也按它查找已有记录
+        db.Index('uq_gunpla_name_cn_grade', 'name_cn', 'grade', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name_cn = db.Column(db.String(200), nullable=False, comment='中文名称')
@@ -31,6 +67,14 @@ class Gunpla(db.Model):
     price_cn_msrp = db.Column(db.Float, comment='中国定价（人民币）')
     price_cn_market = db.Column(db.Float, comment='中国市场价格（人民币）')
     
+    # "算"（按配置汇率预先计算并存储，价格或汇率变化时重算）
+    suan = db.Column(db.Float, comment='算 = 中国市场价格 / (日本定价 / 汇率) * 100')
+    
+    # 爬虫记录（增量爬取：只重新抓取过期、缺价格或列表条目有变化的记录）
+    source_url = db.Column(db.String(500), comment='78动漫详情页URL')
+    last_crawled_at = db.Column(db.DateTime, comment='上次抓取详情页的时间')
+    content_hash = db.Column(db.String(64), comment='级别页面中列表条目（名称、URL、子分类）的哈希')
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -38,19 +82,29 @@ class Gunpla(db.Model):
     wishlist_items = db.relationship('Wishlist', backref='gunpla', lazy=True, cascade='all, delete-orphan')
     collection_items = db.relationship('Collection', backref='gunpla', lazy=True, cascade='all, delete-orphan')
     price_history = db.relationship('PriceHistory', backref='gunpla', lazy=True, cascade='all, delete-orphan')
+    price_daily = db.relationship('PriceHistoryDaily', lazy=True, cascade='all, delete-orphan')
+    price_weekly = db.relationship('PriceHistoryWeekly', lazy=True, cascade='all, delete-orphan')
     
-    def calculate_suan(self, jpy_to_cny_rate=20.0):
+    def calculate_suan(self, jpy_to_cny_rate=None):
         """
         计算"算"数
         算 = (中国市场价格 / 日本定价) * 100
         例如：1000日元定价，卖100元人民币 = 10算
+        jpy_to_cny_rate 默认使用配置的汇率
+        """
+        return calculate_suan(self.price_jp_msrp, self.price_cn_market, jpy_to_cny_rate)
+    
+    @classmethod
+    def recompute_suan(cls, session, jpy_to_cny_rate=None):
+        """
+        用一条UPDATE语句批量重算所有记录的"算"
+        （汇率变化，或批量导入绕过了ORM事件之后调用）
+        返回: 更新的行数
         """
-        if self.price_jp_msrp and self.price_cn_market:
-            # 将日元定价转换为人民币
-            jp_yuan = self.price_jp_msrp / jpy_to_cny_rate
-            if jp_yuan > 0:
-                return round((self.price_cn_market / jp_yuan) * 100, 2)
-        return None
+        result = session.execute(
+            db.update(cls).values(suan=suan_expression(cls.price_jp_msrp, cls.price_cn_market, jpy_to_cny_rate))
+        )
+        return result.rowcount
     
     def to_dict(self):
         """转换为字典格式（用于JSON响应）"""
@@ -69,16 +123,28 @@ class Gunpla(db.Model):
             'price_us_market': self.price_us_market,
             'price_cn_msrp': self.price_cn_msrp,
             'price_cn_market': self.price_cn_market,
-            'suan': self.calculate_suan()
+            'suan': self.suan,
+            'source_url': self.source_url,
+            'last_crawled_at': self.last_crawled_at.isoformat() if self.last_crawled_at else None,
         }
     
     def __repr__(self):
         return f'<Gunpla {self.name_cn}>'
 
 
+@event.listens_for(Gunpla, 'before_insert')
+@event.listens_for(Gunpla, 'before_update')
+def _update_suan(mapper, connection, target):
+    """写入时同步"算"的值"""
+    target.suan = target.calculate_suan()
+
+
 class Wishlist(db.Model):
     """想要列表"""
     __tablename__ = 'wishlist'
+    __table_args__ = (
+        db.Index('ix_wishlist_user_id_gunpla_id', 'user_id', 'gunpla_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, comment='用户ID（可选，如果为None则为公共列表）')
@@ -103,6 +169,9 @@ class Wishlist(db.Model):
 class Collection(db.Model):
     """已购买列表"""
     __tablename__ = 'collection'
+    __table_args__ = (
+        db.Index('ix_collection_user_id_gunpla_id', 'user_id', 'gunpla_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, comment='用户ID（可选，如果为None则为公共列表）')
@@ -197,8 +266,15 @@ class Coupon(db.Model):
 
 
 class PriceHistory(db.Model):
-    """价格历史表"""
+    """
+    价格历史表（只追加的时间序列）
+    写入请使用 price_history.record_prices，它同时增量更新日/周汇总表
+    """
     __tablename__ = 'price_history'
+    __table_args__ = (
+        # 覆盖索引：按高达+平台取一段时间的价格只读索引，不回表
+        db.Index('ix_price_history_gunpla_platform_recorded_at', 'gunpla_id', 'platform', 'recorded_at', 'price'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     gunpla_id = db.Column(db.Integer, db.ForeignKey('gunpla.id'), nullable=False)
@@ -222,6 +298,37 @@ class PriceHistory(db.Model):
         return f'<PriceHistory {self.gunpla_id} {self.platform} {self.price}>'
 
 
+class PriceRollupMixin:
+    """
+    价格汇总表的公共字段：每个 (高达, 平台, 时间段) 一行
+    保存最低价、最高价、价格之和与点数（平均价 = 和 / 点数），新价格点可以直接合并进来
+    """
+    gunpla_id = db.Column(db.Integer, db.ForeignKey('gunpla.id'), primary_key=True)
+    platform = db.Column(db.String(100), primary_key=True)
+    bucket = db.Column(db.Date, primary_key=True, comment='时间段的第一天')
+    min_price = db.Column(db.Float, nullable=False)
+    max_price = db.Column(db.Float, nullable=False)
+    price_sum = db.Column(db.Float, nullable=False)
+    price_count = db.Column(db.Integer, nullable=False)
+
+    @property
+    def avg_price(self):
+        return self.price_sum / self.price_count if self.price_count else None
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.gunpla_id} {self.platform} {self.bucket}>'
+
+
+class PriceHistoryDaily(PriceRollupMixin, db.Model):
+    """价格日汇总"""
+    __tablename__ = 'price_history_daily'
+
+
+class PriceHistoryWeekly(PriceRollupMixin, db.Model):
+    """价格周汇总（bucket 为周一）"""
+    __tablename__ = 'price_history_weekly'
+
+
 class User(db.Model):
     """用户表"""
     __tablename__ = 'users'
@@ -282,6 +389,9 @@ class User(db.Model):
 class ShareLink(db.Model):
     """分享链接表"""
     __tablename__ = 'share_links'
+    __table_args__ = (
+        db.Index('ix_share_links_user_id_list_type_is_active', 'user_id', 'list_type', 'is_active'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, comment='用户ID')
@@ -294,3 +404,43 @@ class ShareLink(db.Model):
     def __repr__(self):
         return f'<ShareLink {self.user_id} {self.list_type}>'
 
+
+class AppSetting(db.Model):
+    """应用设置（键值对）"""
+    __tablename__ = 'app_settings'
+
+    key = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.String(500), comment='设置值')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def get_value(cls, session, key, default=None):
+        setting = session.get(cls, key)
+        return setting.value if setting else default
+
+    @classmethod
+    def set_value(cls, session, key, value):
+        setting = session.get(cls, key)
+        if setting is None:
+            setting = cls(key=key)
+            session.add(setting)
+        setting.value = str(value)
+
+    def __repr__(self):
+        return f'<AppSetting {self.key}={self.value}>'
+
+
+def sync_suan_rate(session, jpy_to_cny_rate=None):
+    """
+    汇率与上次计算"算"时不同则批量重算
+    返回: 是否进行了重算
+    """
+    if jpy_to_cny_rate is None:
+        jpy_to_cny_rate = Config.JPY_TO_CNY_RATE
+    stored = AppSetting.get_value(session, 'suan_jpy_to_cny_rate')
+    if stored is not None and float(stored) == float(jpy_to_cny_rate):
+        return False
+    Gunpla.recompute_suan(session, jpy_to_cny_rate)
+    AppSetting.set_value(session, 'suan_jpy_to_cny_rate', jpy_to_cny_rate)
+    session.commit()
+    return True
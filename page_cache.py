@@ -0,0 +1,235 @@
+"""
+爬虫的磁盘页面缓存
+
+- 按URL建立索引，记录 ETag / Last-Modified、抓取时间和正文的 SHA-256；
+  正文按内容哈希压缩存放（内容相同的页面只存一份）
+- 按页面类型设置有效期（级别列表页短，详情页长）：有效期内直接使用缓存不发请求，
+  过期后带 If-None-Match / If-Modified-Since 重新验证，304 时沿用缓存的正文
+- 离线模式只读缓存，可以在没有网络的情况下反复调试解析代码
+
+目录结构:
+    <root>/index/<url哈希前2位>/<url哈希>.json   URL索引
+    <root>/objects/<内容哈希前2位>/<内容哈希>     zlib 压缩的正文
+
+命令行:
+    python page_cache.py stats              缓存条目数和占用空间
+    python page_cache.py get <URL>          输出缓存的页面
+    python page_cache.py prune              删除没有URL引用的正文
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+# 未指定页面类型时的有效期（秒）
+DEFAULT_TTL = 24 * 3600
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class CacheEntry:
+    """一个URL的缓存记录"""
+    __slots__ = ('url', 'digest', 'etag', 'last_modified', 'fetched_at', 'encoding', 'size')
+
+    def __init__(self, url, digest, etag=None, last_modified=None, fetched_at=None,
+                 encoding=None, size=0):
+        self.url = url
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at or time.time()
+        self.encoding = encoding
+        self.size = size
+
+    def age(self, now=None):
+        return (now or time.time()) - self.fetched_at
+
+    def validators(self):
+        """重新验证用的条件请求头"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PageCache:
+    """
+    磁盘页面缓存（多线程安全：所有写入都是先写临时文件再原子替换）
+
+    参数:
+        root: 缓存目录
+        ttl: {页面类型: 有效期秒数}，如 {'series': 6 * 3600, 'detail': 30 * 86400}
+        default_ttl: 未列出的页面类型的有效期
+        compress_level: zlib 压缩级别
+    """
+
+    def __init__(self, root, ttl=None, default_ttl=DEFAULT_TTL, compress_level=6):
+        self.root = root
+        self.ttl = dict(ttl or {})
+        self.default_ttl = default_ttl
+        self.compress_level = compress_level
+
+    # ---- 路径 ----
+
+    def _index_path(self, url):
+        key = _sha256(url.encode('utf-8'))
+        return os.path.join(self.root, 'index', key[:2], key + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def _write(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    # ---- 读写 ----
+
+    def ttl_for(self, kind):
+        return self.ttl.get(kind, self.default_ttl)
+
+    def lookup(self, url):
+        """读取URL的缓存记录，没有（或正文丢失）时返回 None"""
+        try:
+            with open(self._index_path(url), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry = CacheEntry(**data)
+        if not os.path.exists(self._object_path(entry.digest)):
+            return None
+        return entry
+
+    def is_fresh(self, entry, kind=None, now=None):
+        return entry.age(now) < self.ttl_for(kind)
+
+    def body(self, entry):
+        """缓存的正文（bytes）"""
+        with open(self._object_path(entry.digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def get(self, url):
+        """URL缓存的正文（不检查有效期），没有时返回 None"""
+        entry = self.lookup(url)
+        return None if entry is None else self.body(entry)
+
+    def store(self, url, content, etag=None, last_modified=None, encoding=None):
+        """保存一次完整响应，返回 CacheEntry；正文与已有内容相同时不重复写入"""
+        digest = _sha256(content)
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write(object_path, zlib.compress(content, self.compress_level))
+        entry = CacheEntry(url, digest, etag=etag, last_modified=last_modified,
+                           encoding=encoding, size=len(content))
+        self._save_entry(entry)
+        return entry
+
+    def touch(self, entry, etag=None, last_modified=None):
+        """重新验证结果为 304：刷新抓取时间（服务器给了新的验证头时一并更新）"""
+        entry.fetched_at = time.time()
+        if etag:
+            entry.etag = etag
+        if last_modified:
+            entry.last_modified = last_modified
+        self._save_entry(entry)
+        return entry
+
+    def _save_entry(self, entry):
+        data = json.dumps(entry.to_dict(), ensure_ascii=False).encode('utf-8')
+        self._write(self._index_path(entry.url), data)
+
+    # ---- 维护 ----
+
+    def entries(self):
+        index_root = os.path.join(self.root, 'index')
+        for directory, _, files in os.walk(index_root):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                        yield CacheEntry(**json.load(f))
+                except (OSError, ValueError):
+                    continue
+
+    def stats(self):
+        entries = list(self.entries())
+        objects = 0
+        stored = 0
+        for directory, _, files in os.walk(os.path.join(self.root, 'objects')):
+            for name in files:
+                objects += 1
+                stored += os.path.getsize(os.path.join(directory, name))
+        return {
+            'urls': len(entries),
+            'objects': objects,
+            'raw_bytes': sum(entry.size for entry in entries),
+            'stored_bytes': stored,
+        }
+
+    def prune(self):
+        """删除没有任何URL引用的正文，返回删除的文件数"""
+        referenced = {entry.digest for entry in self.entries()}
+        removed = 0
+        for directory, _, files in os.walk(os.path.join(self.root, 'objects')):
+            for name in files:
+                if name not in referenced:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+        return removed
+
+
+def from_config(config=None):
+    """按配置创建页面缓存；PAGE_CACHE_DIR 为空时不使用缓存（返回 None）"""
+    if config is None:
+        from config import Config as config
+    if not config.PAGE_CACHE_DIR:
+        return None
+    return PageCache(config.PAGE_CACHE_DIR, ttl=config.PAGE_CACHE_TTL)
+
+
+def main(argv):
+    cache = from_config()
+    if cache is None:
+        print('PAGE_CACHE_DIR 未配置')
+        return 1
+    command = argv[0] if argv else 'stats'
+    if command == 'stats':
+        stats = cache.stats()
+        print(f"目录: {cache.root}")
+        print(f"URL: {stats['urls']} 个，正文: {stats['objects']} 份")
+        print(f"原始大小: {stats['raw_bytes'] / 1024:.1f} KB，占用: {stats['stored_bytes'] / 1024:.1f} KB")
+    elif command == 'get' and len(argv) == 2:
+        body = cache.get(argv[1])
+        if body is None:
+            print(f'未缓存: {argv[1]}', file=sys.stderr)
+            return 1
+        sys.stdout.buffer.write(body)
+    elif command == 'prune':
+        print(f'删除 {cache.prune()} 份未引用的正文')
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,139 @@
+"""
+价格走势图降采样（Largest-Triangle-Three-Buckets）
+
+一个高达在一个平台上的价格点可能有几十万个，全部发给浏览器画图太慢。
+LTTB 保留首尾两点，把中间的点按顺序平均分成 (目标点数 - 2) 个桶，每个桶选一个点：
+与上一个选中的点、下一个桶的平均点组成的三角形面积最大的那个，尖峰和拐点因此不会被平均掉。
+无论原始数据有多少，返回的点数都固定。
+
+- 时间直接在数据库中换算成秒数（SQLite julianday / PostgreSQL extract epoch），
+  按覆盖索引 (gunpla_id, platform, recorded_at, price) 读出后用 NumPy 计算
+- 桶的平均点一次算出；每个桶选点依赖上一个桶的结果，所以按桶循环，
+  桶内所有候选点的三角形面积用 NumPy 一次算出，循环次数只取决于目标点数
+- 结果按 (高达, 平台, 点数) 缓存，并记录生成时最新的 recorded_at，
+  有更新的价格点写入后重新计算（补录更早的价格点不会使缓存失效）
+"""
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import func
+
+from models import PriceHistory
+
+# Unix 纪元（1970-01-01）的儒略日
+_UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+
+def lttb(x, y, threshold):
+    """
+    LTTB 降采样，返回选中点的下标（升序）
+    x 需已排序；点数不超过 threshold（或 threshold < 3）时返回全部下标
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # 中间的点 [1, n-1) 分成 threshold-2 个桶，edges[i]..edges[i+1] 为第 i 个桶
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # 每个桶的第三个顶点：下一个桶的平均点，最后一个桶用最后一个点
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # 三角形面积的两倍（只比较大小）
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _epoch_seconds(dialect):
+    """recorded_at 换算成 Unix 秒数的 SQL 表达式（时间按 UTC 保存）"""
+    column = PriceHistory.recorded_at
+    if dialect == 'postgresql':
+        return func.extract('epoch', column)
+    return (func.julianday(column) - _UNIX_EPOCH_JULIAN_DAY) * 86400.0
+
+
+def load_series(session, gunpla_id, platform):
+    """按时间顺序读出价格点，返回 (秒数数组, 价格数组)"""
+    seconds = _epoch_seconds(session.get_bind().dialect.name)
+    rows = session.query(seconds, PriceHistory.price).filter(
+        PriceHistory.gunpla_id == gunpla_id,
+        PriceHistory.platform == platform,
+        PriceHistory.recorded_at.isnot(None),
+        PriceHistory.price.isnot(None),
+    ).order_by(PriceHistory.recorded_at).all()
+    values = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64, count=2 * len(rows))
+    values = values.reshape(-1, 2)
+    return values[:, 0], values[:, 1]
+
+
+def downsample(t, price, points):
+    """降采样并整理成接口返回的点列表 [{'recorded_at', 'price'}]"""
+    index = lttb(t, price, points)
+    # 秒数四舍五入到整秒后转成 ISO 时间
+    stamps = np.datetime_as_string(np.rint(t[index]).astype('datetime64[s]'), unit='s')
+    return [
+        {'recorded_at': str(stamp), 'price': round(float(value), 2)}
+        for stamp, value in zip(stamps, price[index])
+    ]
+
+
+class PriceChartCache:
+    """降采样结果缓存（LRU），键为 (高达, 平台, 点数)，最新 recorded_at 变化时重新计算"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session, gunpla_id, platform, points):
+        """
+        返回 {'platform', 'latest', 'raw_count', 'points'}
+        先查最新的 recorded_at（索引上的一次查找），与缓存一致时直接返回缓存结果
+        """
+        latest = session.query(func.max(PriceHistory.recorded_at)).filter(
+            PriceHistory.gunpla_id == gunpla_id,
+            PriceHistory.platform == platform,
+        ).scalar()
+        if latest is None:
+            return {'platform': platform, 'latest': None, 'raw_count': 0, 'points': []}
+
+        key = (gunpla_id, platform, points)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == latest:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        t, price = load_series(session, gunpla_id, platform)
+        chart = {
+            'platform': platform,
+            'latest': latest.isoformat(),
+            'raw_count': len(t),
+            'points': downsample(t, price, points),
+        }
+        with self._lock:
+            self._entries[key] = (latest, chart)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return chart
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,174 @@
+"""
+详情页价格提取
+
+原来的做法是依次尝试：表格、若干个 re.search（每个都要重新生成整页文本）、
+再用 find_all(string=正则) 遍历一次所有元素。这里改为：
+- 页面只解析一次（有 lxml 时直接用 lxml.html，不建 BeautifulSoup 树），整页文本只生成一次
+- 所有文本写法预先编译成一个带命名分组的正则，一次 finditer 扫描全文
+- 结果是带来源和可信度的候选价格（PriceCandidate），由 best_price 按可信度和位置选出
+
+可信度从高到低：表格中"定价/价格/日元"标签后的单元格、"定价：" "价格："、
+"2500→2800日元"中的原价、"¥2500日元"、"2500日元/円"、"JPY 2500"。
+原来的第三种方法（包含"日元"的 div/span/p 中的第一个数字）不再使用：
+这些文字已经包含在全文扫描中，它只在"日元"前的数字不合理时才生效，取到的往往是年份等无关数字
+"""
+import importlib.util
+import re
+
+# lxml 在第一次解析时才导入：import gunpla_scrape（以及只用到配置的命令行）不必加载它
+HAS_LXML = importlib.util.find_spec('lxml') is not None
+
+JPY = 'JPY'
+
+# 表格中价格标签
+TABLE_LABELS = ('定价', '价格', '日元')
+TABLE_CONFIDENCE = 1.0
+
+# 页面文本中的价格写法：(来源, 正则, 币种, 可信度)，正则中 {v} 为价格数字的位置
+TEXT_PATTERNS = [
+    ('定价', r'定价[：:]\s*[¥￥]?\s*{v}', JPY, 0.9),
+    ('价格', r'价格[：:]\s*[¥￥]?\s*{v}', JPY, 0.85),
+    ('改价前', r'{v}\s*→\s*\d+\s*(?:日元|円)', JPY, 0.8),  # 2500→2800日元，取原定价
+    ('¥日元', r'[¥￥]\s*{v}\s*(?:日元|円)', JPY, 0.75),
+    ('日元', r'{v}\s*(?:日元|円)', JPY, 0.7),
+    ('JPY', r'JPY\s*{v}', JPY, 0.6),
+]
+
+# 合并成一个正则：第 i 种写法的价格数字在分组 v<i> 中，同一位置按上面的顺序优先
+PRICE_RE = re.compile('|'.join(
+    pattern.format(v=f'(?P<v{i}>\\d+)') for i, (_, pattern, _, _) in enumerate(TEXT_PATTERNS)
+))
+
+NUMBER_RE = re.compile(r'\d+')
+
+# 默认的合理价格范围（日元）
+PRICE_MIN = 100
+PRICE_MAX = 50000
+
+
+class PriceCandidate:
+    """一个候选价格：数值、币种、来源（'table' 或 TEXT_PATTERNS 中的来源）、可信度、在页面中的位置"""
+    __slots__ = ('value', 'currency', 'source', 'confidence', 'position')
+
+    def __init__(self, value, currency, source, confidence, position):
+        self.value = value
+        self.currency = currency
+        self.source = source
+        self.confidence = confidence
+        self.position = position
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f'<PriceCandidate {self.value:g} {self.currency} {self.source} {self.confidence}>'
+
+
+def first_number(text):
+    """文本中的第一个数字（去掉千分位逗号），没有时返回 None"""
+    match = NUMBER_RE.search(text.replace(',', '').replace('，', ''))
+    return float(match.group()) if match else None
+
+
+def _parse_lxml(html, encoding):
+    import lxml.etree
+    import lxml.html
+
+    if isinstance(html, bytes):
+        parser = lxml.html.HTMLParser(encoding=encoding or 'utf-8')
+        root = lxml.html.document_fromstring(html, parser=parser)
+    else:
+        root = lxml.html.document_fromstring(html)
+    lxml.etree.strip_elements(root, 'script', 'style', lxml.etree.Comment, with_tail=False)
+    rows = [
+        [cell.text_content().strip() for cell in row.iter('td', 'th')]
+        for row in root.iter('tr')
+    ]
+    return root.text_content(), rows
+
+
+def _parse_soup(soup):
+    rows = [
+        [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
+        for row in soup.find_all('tr')
+    ]
+    return soup.get_text(), rows
+
+
+def page_text_and_rows(html, encoding=None):
+    """
+    解析一次页面，返回 (整页文本, 表格行)；表格行是每行单元格文本的列表
+    html 可以是 str、bytes（按 encoding 解码）或 BeautifulSoup
+    """
+    if not isinstance(html, (str, bytes)):
+        return _parse_soup(html)
+    if not html.strip():
+        return '', []
+    if HAS_LXML:
+        from lxml.etree import ParserError
+        try:
+            return _parse_lxml(html, encoding)
+        except ParserError:
+            # 没有任何元素的文档
+            return '', []
+    from bs4 import BeautifulSoup
+    if isinstance(html, bytes):
+        return _parse_soup(BeautifulSoup(html, 'html.parser', from_encoding=encoding or 'utf-8'))
+    return _parse_soup(BeautifulSoup(html, 'html.parser'))
+
+
+def table_candidates(rows):
+    """表格中价格标签之后每个单元格的第一个数字"""
+    candidates = []
+    for row in rows:
+        for i, cell in enumerate(row):
+            if not any(label in cell for label in TABLE_LABELS):
+                continue
+            for value_cell in row[i + 1:]:
+                value = first_number(value_cell)
+                if value is not None:
+                    candidates.append(PriceCandidate(value, JPY, 'table', TABLE_CONFIDENCE, len(candidates)))
+    return candidates
+
+
+def text_candidates(text):
+    """扫描一次全文，返回所有价格写法的匹配"""
+    candidates = []
+    for match in PRICE_RE.finditer(text.replace(',', '')):
+        i = int(match.lastgroup[1:])
+        source, _, currency, confidence = TEXT_PATTERNS[i]
+        candidates.append(PriceCandidate(
+            float(match.group(match.lastgroup)), currency, source, confidence, match.start()
+        ))
+    return candidates
+
+
+def find_candidates(html, encoding=None):
+    """页面中所有的候选价格（不检查范围）"""
+    text, rows = page_text_and_rows(html, encoding)
+    return table_candidates(rows) + text_candidates(text)
+
+
+def best_price(candidates, price_min=PRICE_MIN, price_max=PRICE_MAX, currency=JPY):
+    """范围内可信度最高的候选（同等可信度取页面中靠前的），没有时返回 None；price_max 为 None 表示不限上限"""
+    best = None
+    for candidate in candidates:
+        if candidate.currency != currency or candidate.value < price_min:
+            continue
+        if price_max is not None and candidate.value > price_max:
+            continue
+        if best is None or (candidate.confidence, -candidate.position) > (best.confidence, -best.position):
+            best = candidate
+    return best
+
+
+def extract_price(html, price_max=PRICE_MAX, encoding=None, price_min=PRICE_MIN):
+    """
+    从详情页提取日本定价（日元），找不到时返回 None
+    表格中有合理价格时不再扫描全文
+    """
+    text, rows = page_text_and_rows(html, encoding)
+    best = best_price(table_candidates(rows), price_min, price_max)
+    if best is None:
+        best = best_price(text_candidates(text), price_min, price_max)
+    return best.value if best is not None else None
@@ -0,0 +1,295 @@
+"""
+价格历史（时间序列）
+
+- price_history 是只追加的原始价格点，覆盖索引 (gunpla_id, platform, recorded_at, price)
+- price_history_daily / price_history_weekly 是按 (高达, 平台, 日/周) 预先汇总的最低、最高、和与点数
+- record_prices 批量写入价格点，同一事务内把这批点合并进汇总表
+  （INSERT ... ON CONFLICT DO UPDATE，SQLite 和 PostgreSQL 都支持），不重新扫描原始数据
+- 走势查询只读汇总表：返回的行数取决于时间段数，与原始价格点的多少无关
+- 绕过 record_prices 直接写入或删除了 price_history 时，用 rebuild_rollups 从原始数据重建
+
+命令行:
+    python price_history.py import prices.csv    导入价格点（列: gunpla_id,platform,price[,recorded_at][,url]）
+    python price_history.py rebuild              从原始数据重建全部汇总
+"""
+import argparse
+import csv
+import itertools
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, case, cast, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import Config
+from models import PriceHistory, PriceHistoryDaily, PriceHistoryWeekly
+
+RESOLUTIONS = ('day', 'week')
+
+_INSERT = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def monday_of(day):
+    return day - timedelta(days=day.weekday())
+
+
+def day_bucket(recorded_at):
+    return recorded_at.date()
+
+
+def week_bucket(recorded_at):
+    """所在周的周一"""
+    return monday_of(recorded_at.date())
+
+
+# 分辨率 -> (汇总表模型, 价格点所属时间段)
+ROLLUPS = {
+    'day': (PriceHistoryDaily, day_bucket),
+    'week': (PriceHistoryWeekly, week_bucket),
+}
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _normalize(point, now):
+    """检查并整理一个价格点，返回 price_history 的一行"""
+    try:
+        gunpla_id = int(point['gunpla_id'])
+        price = float(point['price'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f'价格点缺少有效的 gunpla_id 或 price: {point!r}')
+    platform = (point.get('platform') or '').strip()
+    if not platform or price <= 0:
+        raise ValueError(f'价格点缺少平台或价格不是正数: {point!r}')
+    recorded_at = point.get('recorded_at') or now
+    if isinstance(recorded_at, str):
+        recorded_at = datetime.fromisoformat(recorded_at)
+    return {
+        'gunpla_id': gunpla_id,
+        'platform': platform,
+        'price': price,
+        'url': point.get('url') or None,
+        'recorded_at': recorded_at,
+    }
+
+
+# ---- 写入 ----
+
+def _upsert_statement(dialect, model):
+    """
+    汇总表的 upsert 语句：最低/最高价取较小/较大值，和与点数相加
+    不带 VALUES，按参数列表 executemany，语句只编译一次
+    """
+    table = model.__table__
+    stmt = _INSERT[dialect](table)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=['gunpla_id', 'platform', 'bucket'],
+        set_={
+            'min_price': case((excluded.min_price < table.c.min_price, excluded.min_price),
+                              else_=table.c.min_price),
+            'max_price': case((excluded.max_price > table.c.max_price, excluded.max_price),
+                              else_=table.c.max_price),
+            'price_sum': table.c.price_sum + excluded.price_sum,
+            'price_count': table.c.price_count + excluded.price_count,
+        },
+    )
+
+
+def _merge_rollup(session, model, bucket_of, rows):
+    """把一批价格点按时间段汇总后合并进汇总表"""
+    buckets = {}
+    for row in rows:
+        key = (row['gunpla_id'], row['platform'], bucket_of(row['recorded_at']))
+        price = row['price']
+        current = buckets.get(key)
+        if current is None:
+            buckets[key] = [price, price, price, 1]
+        else:
+            current[0] = min(current[0], price)
+            current[1] = max(current[1], price)
+            current[2] += price
+            current[3] += 1
+    values = [
+        {'gunpla_id': gunpla_id, 'platform': platform, 'bucket': bucket,
+         'min_price': low, 'max_price': high, 'price_sum': total, 'price_count': count}
+        for (gunpla_id, platform, bucket), (low, high, total, count) in buckets.items()
+    ]
+
+    if values:
+        session.execute(_upsert_statement(session.get_bind().dialect.name, model), values)
+
+
+def record_prices(session, points, batch_size=None):
+    """
+    批量写入价格点并增量更新日/周汇总（不提交事务，由调用方提交）
+
+    参数:
+        points: 可迭代的 dict，包含 gunpla_id、platform、price，可选 recorded_at（datetime 或
+            ISO 字符串，默认当前 UTC 时间）和 url；可以是生成器，内存中最多只有一批
+        batch_size: 每批的点数，默认 Config.PRICE_HISTORY_BATCH_SIZE
+
+    返回:
+        写入的点数
+    异常:
+        ValueError - 价格点缺少字段或价格不是正数（此前的批次已写入当前事务）
+    """
+    batch_size = batch_size or Config.PRICE_HISTORY_BATCH_SIZE
+    dialect = session.get_bind().dialect.name
+    if dialect not in _INSERT:
+        raise NotImplementedError(f'不支持的数据库: {dialect}')
+    now = datetime.utcnow()
+    count = 0
+    for batch in _batches(points, batch_size):
+        rows = [_normalize(point, now) for point in batch]
+        session.execute(PriceHistory.__table__.insert(), rows)
+        for model, bucket_of in ROLLUPS.values():
+            _merge_rollup(session, model, bucket_of, rows)
+        count += len(rows)
+    return count
+
+
+def _bucket_expression(resolution, dialect):
+    """SQL 中价格点所属时间段（与 day_bucket / week_bucket 一致）"""
+    column = PriceHistory.recorded_at
+    if dialect == 'postgresql':
+        return cast(func.date_trunc(resolution, column), Date)
+    if resolution == 'day':
+        return func.date(column)
+    # 下一个周日（当天是周日则为当天）再往前6天，即所在周的周一
+    return func.date(column, 'weekday 0', '-6 days')
+
+
+def rebuild_rollups(session, gunpla_ids=None):
+    """
+    从 price_history 重建汇总（不提交事务）；gunpla_ids 为 None 时重建全部
+    返回 {分辨率: 汇总行数}
+    """
+    dialect = session.get_bind().dialect.name
+    result = {}
+    for resolution, (model, _) in ROLLUPS.items():
+        delete = model.__table__.delete()
+        if gunpla_ids is not None:
+            delete = delete.where(model.gunpla_id.in_(gunpla_ids))
+        session.execute(delete)
+
+        bucket = _bucket_expression(resolution, dialect)
+        select = session.query(
+            PriceHistory.gunpla_id, PriceHistory.platform, bucket,
+            func.min(PriceHistory.price), func.max(PriceHistory.price),
+            func.sum(PriceHistory.price), func.count(PriceHistory.id),
+        ).filter(PriceHistory.recorded_at.isnot(None))
+        if gunpla_ids is not None:
+            select = select.filter(PriceHistory.gunpla_id.in_(gunpla_ids))
+        select = select.group_by(PriceHistory.gunpla_id, PriceHistory.platform, bucket)
+        inserted = session.execute(model.__table__.insert().from_select(
+            ['gunpla_id', 'platform', 'bucket', 'min_price', 'max_price', 'price_sum', 'price_count'],
+            select.statement,
+        ))
+        result[resolution] = inserted.rowcount
+    return result
+
+
+# ---- 查询 ----
+
+def _load(session, model, gunpla_id, platform, since):
+    query = session.query(
+        model.platform, model.bucket, model.min_price, model.max_price, model.price_sum, model.price_count,
+    ).filter(model.gunpla_id == gunpla_id)
+    if platform:
+        query = query.filter(model.platform == platform)
+    if since:
+        query = query.filter(model.bucket >= since)
+    return query.order_by(model.platform, model.bucket).all()
+
+
+def price_series(session, gunpla_id, resolution='auto', platform=None, since=None):
+    """
+    从汇总表读取价格走势
+
+    参数:
+        resolution: 'day'、'week'，或 'auto'（跨度不超过 Config.PRICE_HISTORY_DAILY_MAX_DAYS 天用日汇总，
+            否则用周汇总）
+        platform: 只取一个平台
+        since: date，只取这一天所在时间段及之后的数据
+
+    返回:
+        (实际使用的分辨率, {平台: [{'date', 'min', 'avg', 'max', 'count'}]})，每个平台按日期排序
+    """
+    if resolution not in RESOLUTIONS + ('auto',):
+        raise ValueError(f'resolution 只能是 {", ".join(RESOLUTIONS)} 或 auto')
+    week_since = monday_of(since) if since else None
+
+    if resolution == 'auto':
+        # 周汇总的行数很少，先取周汇总判断跨度，跨度短时再取日汇总
+        rows = _load(session, PriceHistoryWeekly, gunpla_id, platform, week_since)
+        resolution = 'week'
+        if rows:
+            first = min(row.bucket for row in rows)
+            last = max(row.bucket for row in rows)
+            if (last - first).days <= Config.PRICE_HISTORY_DAILY_MAX_DAYS:
+                resolution = 'day'
+                rows = _load(session, PriceHistoryDaily, gunpla_id, platform, since)
+    else:
+        rows = _load(session, ROLLUPS[resolution][0], gunpla_id, platform,
+                     week_since if resolution == 'week' else since)
+
+    series = {}
+    for row in rows:
+        series.setdefault(row.platform, []).append({
+            'date': row.bucket.isoformat(),
+            'min': row.min_price,
+            'avg': round(row.price_sum / row.price_count, 2),
+            'max': row.max_price,
+            'count': row.price_count,
+        })
+    return resolution, series
+
+
+# ---- 命令行 ----
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='价格历史')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('import', help='从 CSV 导入价格点并更新汇总')
+    p.add_argument('path')
+    commands.add_parser('rebuild', help='从原始数据重建全部日/周汇总')
+    args = parser.parse_args(argv)
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        try:
+            if args.command == 'import':
+                count = record_prices(db.session, _read_csv(args.path))
+                db.session.commit()
+                print(f'导入 {count} 个价格点')
+            else:
+                counts = rebuild_rollups(db.session)
+                db.session.commit()
+                print(f"日汇总 {counts['day']} 行，周汇总 {counts['week']} 行")
+        except ValueError as e:
+            db.session.rollback()
+            print(f'导入失败（未写入任何数据）: {e}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+每个请求的SQL查询计数与预算检查
+
+用 @query_budget(n) 标注视图允许的最大查询数。
+超出预算时：QUERY_BUDGET_ENFORCE 为 True（测试时默认开启）抛出 QueryBudgetExceeded，
+否则记录警告日志。调试/测试模式下响应头 X-Query-Count 返回本次请求的查询数
+"""
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """请求的查询数超出预算"""
+
+
+def query_budget(max_queries):
+    """视图装饰器：设置该视图的查询预算"""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def init_query_budget(app):
+    """注册查询计数和预算检查"""
+    app.config.setdefault('QUERY_BUDGET_DEFAULT', None)
+    app.config.setdefault('QUERY_BUDGET_ENFORCE', app.testing)
+
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+    @app.after_request
+    def check_query_budget(response):
+        count = g.get('query_count', 0)
+        if app.debug or app.testing:
+            response.headers['X-Query-Count'] = str(count)
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', app.config['QUERY_BUDGET_DEFAULT'])
+        if budget is not None and count > budget:
+            message = f'{request.endpoint} 执行了 {count} 次查询，超出预算 {budget}'
+            if app.config['QUERY_BUDGET_ENFORCE']:
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
@@ -0,0 +1,150 @@
+"""
+详情页价格提取基准测试：旧的正则级联（BeautifulSoup + 多次 get_text / re.search + find_all）
+与 price_extractor（一次解析、一个合并正则）对比每页耗时，并检查两者的结果是否一致
+
+语料默认是页面缓存（PAGE_CACHE_DIR）中的全部页面，先运行一次 python -m gunpla_scrape 就有；
+也可以用 --dir 指定保存了 *.html 的目录
+
+用法:
+  py scripts/benchmarks/bench_price_extraction.py
+  py scripts/benchmarks/bench_price_extraction.py --dir saved_pages --repeat 5
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+import page_cache
+import price_extractor
+
+# ---- 旧实现（gunpla_scrape.engine.extract_price 原来的写法），作为对照 ----
+
+LEGACY_PRICE_PATTERNS = [re.compile(pattern) for pattern in (
+    r'定价[：:]\s*[¥￥]?\s*(\d+)',
+    r'价格[：:]\s*[¥￥]?\s*(\d+)',
+    r'(\d+)\s*→\s*\d+\s*日元',
+    r'[¥￥]\s*(\d+)\s*日元',
+    r'(\d+)\s*日元',
+    r'JPY\s*(\d+)',
+)]
+
+
+def legacy_extract_price(html, price_max=50000):
+    soup = BeautifulSoup(html, 'html.parser')
+
+    def valid(text):
+        match = re.search(r'(\d+)', text.replace(',', '').replace('，', ''))
+        if match:
+            price = float(match.group(1))
+            if 100 <= price <= price_max:
+                return price
+        return None
+
+    for row in soup.find_all('tr'):
+        cells = row.find_all(['td', 'th'])
+        for i, cell in enumerate(cells):
+            if any(label in cell.get_text(strip=True) for label in ('定价', '价格', '日元')):
+                for next_cell in cells[i + 1:]:
+                    price = valid(next_cell.get_text(strip=True))
+                    if price:
+                        return price
+
+    page_text = soup.get_text().replace(',', '')
+    for pattern in LEGACY_PRICE_PATTERNS:
+        for match in pattern.finditer(page_text):
+            price = float(match.group(1))
+            if 100 <= price <= price_max:
+                return price
+
+    for element in soup.find_all(['div', 'span', 'p'], string=re.compile(r'.*\d+.*日元')):
+        price = valid(element.get_text(strip=True))
+        if price:
+            return price
+    return None
+
+
+# ---- 语料 ----
+
+def load_corpus(directory=None, limit=None):
+    """[(名称, 正文bytes, 编码)]"""
+    pages = []
+    if directory:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(('.html', '.htm')):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    pages.append((name, f.read(), 'utf-8'))
+    else:
+        cache = page_cache.from_config()
+        if cache is not None:
+            for entry in cache.entries():
+                try:
+                    pages.append((entry.url, cache.body(entry), entry.encoding or 'utf-8'))
+                except OSError:
+                    continue
+    return pages[:limit] if limit else pages
+
+
+def time_per_page(func, pages, repeat):
+    """每页取 repeat 次中最快的一次（秒），同时返回结果"""
+    timings = []
+    results = []
+    for _, content, encoding in pages:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(content, encoding)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+        results.append(result)
+    return timings, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='详情页价格提取基准测试')
+    parser.add_argument('--dir', help='保存了 *.html 详情页的目录（默认使用页面缓存）')
+    parser.add_argument('--repeat', type=int, default=3, help='每页重复次数，取最快的一次')
+    parser.add_argument('--limit', type=int, help='最多使用的页面数')
+    parser.add_argument('--price-max', type=float, default=price_extractor.PRICE_MAX)
+    args = parser.parse_args(argv)
+
+    pages = load_corpus(args.dir, args.limit)
+    if not pages:
+        print('没有页面：先运行一次爬虫填充页面缓存，或用 --dir 指定页面目录')
+        return 1
+
+    legacy_timings, legacy_results = time_per_page(
+        lambda content, encoding: legacy_extract_price(content.decode(encoding, 'replace'), args.price_max),
+        pages, args.repeat,
+    )
+    new_timings, new_results = time_per_page(
+        lambda content, encoding: price_extractor.extract_price(content, args.price_max, encoding),
+        pages, args.repeat,
+    )
+
+    size = sum(len(content) for _, content, _ in pages)
+    print(f"页面: {len(pages)} 个，共 {size / 1024:.0f} KB（引擎: {'lxml' if price_extractor.HAS_LXML else 'html.parser'}）")
+    print(f"{'':16}{'平均(ms)':>10}{'中位数(ms)':>12}{'最慢(ms)':>10}{'合计(s)':>10}")
+    for label, timings in (('旧正则级联', legacy_timings), ('price_extractor', new_timings)):
+        print(f"{label:16}{statistics.mean(timings) * 1000:>10.2f}{statistics.median(timings) * 1000:>12.2f}"
+              f"{max(timings) * 1000:>10.2f}{sum(timings):>10.2f}")
+    speedups = [old / new for old, new in zip(legacy_timings, new_timings) if new > 0]
+    print(f"每页加速: 中位数 {statistics.median(speedups):.1f}x，"
+          f"合计 {sum(legacy_timings) / sum(new_timings):.1f}x")
+
+    found = sum(1 for result in new_results if result)
+    differences = [
+        (name, old, new) for (name, _, _), old, new in zip(pages, legacy_results, new_results) if old != new
+    ]
+    print(f"找到价格: {found}/{len(pages)}，与旧实现不同: {len(differences)} 个")
+    for name, old, new in differences[:10]:
+        print(f"  {name}: 旧 {old} → 新 {new}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
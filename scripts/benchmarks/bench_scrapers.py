@@ -0,0 +1,144 @@
+"""
+级别爬虫基准测试（离线）：用录制的页面（http_fixtures.py）在本地回放服务上运行 gunpla_scrape，
+每个级别报告 页面/秒、详情页解析 ms/页 和 数据库写入 行/秒
+
+不访问网络，数据写入临时 SQLite 数据库，可以在 CI 中运行。
+测试数据包需要先录制一次：
+  python http_fixtures.py record --grades all --out data/fixtures/78dm.zip
+  python http_fixtures.py from-cache --out data/fixtures/78dm.zip   # 或者从页面缓存生成
+
+用法:
+  py scripts/benchmarks/bench_scrapers.py
+  py scripts/benchmarks/bench_scrapers.py --grades RG,MG --latency 80 --jitter 40 --fail-rate 0.02
+  py scripts/benchmarks/bench_scrapers.py --parse-workers 0 --json results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+import http_fixtures
+
+
+def run_grade(grade, engine, server, args):
+    """爬取一个级别并入库，返回该级别的测量结果（失败时为 None）"""
+    from gunpla_scrape import scrape_grades
+
+    served = server.stats['served'] + server.stats['not_modified']
+    engine_stats = dict(engine.stats)
+    output = io.StringIO()
+    started = time.perf_counter()
+    # 不使用爬取检查点：用户的检查点会让已完成的详情页被跳过（测量失真），结束时还会被删除
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+        results = scrape_grades(
+            [grade], include_price=not args.no_price, save=True, engine=engine,
+            parse_workers=args.parse_workers, checkpoint=False,
+        )
+    elapsed = time.perf_counter() - started
+    result = results.get(grade)
+    if result is None:
+        print(output.getvalue()[-2000:], file=sys.stderr)
+        return None
+
+    pages = server.stats['served'] + server.stats['not_modified'] - served
+    written = result['saved'] + result['updated']
+    return {
+        'grade': grade,
+        'found': result['found'],
+        'pages': pages,
+        'elapsed': elapsed,
+        'pages_per_sec': pages / elapsed if elapsed else 0.0,
+        'parsed': result['parsed'],
+        'parse_ms_per_page': result['parse_seconds'] / result['parsed'] * 1000 if result['parsed'] else 0.0,
+        'written': written,
+        'save_seconds': result['save_seconds'],
+        'writes_per_sec': written / result['save_seconds'] if result['save_seconds'] else 0.0,
+        'retries': engine.stats['retries'] - engine_stats['retries'],
+        'failures': engine.stats['failures'] - engine_stats['failures'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='级别爬虫离线基准测试')
+    parser.add_argument('--fixtures', default=http_fixtures.DEFAULT_ARCHIVE, help='测试数据包')
+    parser.add_argument('--grades', help='逗号分隔的级别（默认为数据包中录制了列表页的全部级别）')
+    parser.add_argument('--latency', type=float, default=0, help='回放服务每个响应的延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0, help='随机附加延迟上限（毫秒）')
+    parser.add_argument('--fail-rate', type=float, default=0, help='回放服务返回 503 的概率')
+    parser.add_argument('--seed', type=int, default=0, help='延迟和故障的随机数种子')
+    parser.add_argument('--rps', type=float, default=0, help='每秒请求数（默认 0，不限速）')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--parse-workers', type=int, help='解析进程数（默认取配置 SCRAPER_PARSE_WORKERS）')
+    parser.add_argument('--no-price', action='store_true', help='只爬取列表页')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    parser.add_argument('--verbose', action='store_true', help='显示爬虫的输出')
+    args = parser.parse_args(argv)
+
+    archive = http_fixtures.FixtureArchive(args.fixtures)
+    if not len(archive):
+        print(f'{args.fixtures} 不存在或没有页面，先用 http_fixtures.py record / from-cache 生成')
+        return 1
+
+    # 导入 app 之前指定临时数据库（空库，不复制种子快照），不碰 gunpla.db
+    workdir = tempfile.mkdtemp(prefix='bench_scrapers_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db').replace('\\', '/')
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import app, init_db
+        from fetch_engine import FetchEngine
+        from gunpla_scrape import GRADES, get_grade
+        init_db(app, snapshot=False)
+
+    if args.grades:
+        grades = [get_grade(name).grade for name in args.grades.split(',') if name.strip()]
+    else:
+        grades = [grade for grade, config in GRADES.items() if config.url in archive]
+    missing = [grade for grade in grades if get_grade(grade).url not in archive]
+    if missing:
+        print(f"数据包中没有这些级别的列表页: {', '.join(missing)}")
+        return 1
+
+    server = http_fixtures.FixtureServer(
+        archive, latency_ms=args.latency, jitter_ms=args.jitter, fail_rate=args.fail_rate, seed=args.seed,
+    )
+    engine = FetchEngine(
+        requests_per_second=args.rps, concurrency=args.concurrency,
+        max_retries=3, backoff=0.05, max_backoff=0.5,
+        adapter_factory=partial(http_fixtures.RedirectAdapter, server.url),
+    )
+    rows = []
+    failed = []
+    with server:
+        try:
+            for grade in grades:
+                row = run_grade(grade, engine, server, args)
+                if row is None:
+                    failed.append(grade)
+                else:
+                    rows.append(row)
+        finally:
+            engine.close()
+
+    print(f"回放: {len(archive)} 个页面，延迟 {args.latency:g}±{args.jitter:g} ms，故障率 {args.fail_rate:g}，"
+          f"并发 {args.concurrency}")
+    print(f"{'级别':8}{'条目':>6}{'页面':>6}{'页面/秒':>10}{'解析ms/页':>11}{'写入行':>8}{'写入行/秒':>11}{'重试':>6}{'失败':>6}")
+    for row in rows:
+        print(f"{row['grade']:8}{row['found']:>6}{row['pages']:>6}{row['pages_per_sec']:>10.1f}"
+              f"{row['parse_ms_per_page']:>11.2f}{row['written']:>8}{row['writes_per_sec']:>11.0f}"
+              f"{row['retries']:>6}{row['failures']:>6}")
+    if failed:
+        print(f"失败: {', '.join(failed)}")
+    print(' '.join(f'{key}={value}' for key, value in server.stats.items()))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'grades': rows, 'failed': failed, 'server': server.stats}, f, ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,27 +2,18 @@
 修复RG数据库 - 改进版本
 使用更简单的方法：按顺序查找，遇到子分类标题时更新当前子分类
 """
-import requests
-from bs4 import BeautifulSoup
-import time
 import re
-from models import db, Gunpla
-from app import app
-import sys
-import importlib.util
+from gunpla_scrape.database import app_context
+from gunpla_scrape.scraper78dm import Scraper78DM
 
-# 导入基础爬虫类
-spec = importlib.util.spec_from_file_location("scraper78dm", "78dm_scraper.py")
-scraper78dm_module = importlib.util.module_from_spec(spec)
-sys.modules["scraper78dm"] = scraper78dm_module
-spec.loader.exec_module(scraper78dm_module)
-Scraper78DM = scraper78dm_module.Scraper78DM
 
 def scrape_rg_complete():
     """
     完整爬取RG系列 - 改进版本
     只爬取列表信息，不爬取价格（价格爬取有问题，后续改进）
     """
+    from bs4 import BeautifulSoup
+
     scraper = Scraper78DM()
     
     # RG系列URL
@@ -34,11 +25,8 @@ def scrape_rg_complete():
     print(f"URL: {rg_url}\n")
     
     try:
-        response = scraper.session.get(rg_url, timeout=15)
-        response.encoding = 'utf-8'
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # 经过 FetchEngine 抓取（限速、重试、页面缓存）
+        soup = BeautifulSoup(scraper.fetch(rg_url, kind='series'), 'html.parser')
         gunpla_list = []
         
         # 获取所有文本内容，用于查找子分类位置
@@ -140,7 +128,8 @@ def scrape_rg_complete():
         
         # 保存到数据库（清除旧数据并重新保存，或更新）
         print(f"\n保存数据到数据库...")
-        with app.app_context():
+        from models import db, Gunpla
+        with app_context():
             saved_count = 0
             updated_count = 0
             skipped_count = 0
@@ -207,6 +196,8 @@ def scrape_rg_complete():
         print(f"爬取失败: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        scraper.close()
 
 
 if __name__ == '__main__':
@@ -1,26 +1,18 @@
 """
 完善RG数据库 - 使用已知URL，只爬取列表信息（不含价格）
 """
-import requests
-from bs4 import BeautifulSoup
 import re
-from models import db, Gunpla
-from app import app
-import sys
-import importlib.util
+from gunpla_scrape.database import app_context
+from gunpla_scrape.scraper78dm import Scraper78DM
 
-# 导入基础爬虫类
-spec = importlib.util.spec_from_file_location("scraper78dm", "78dm_scraper.py")
-scraper78dm_module = importlib.util.module_from_spec(spec)
-sys.modules["scraper78dm"] = scraper78dm_module
-spec.loader.exec_module(scraper78dm_module)
-Scraper78DM = scraper78dm_module.Scraper78DM
 
 def scrape_rg_list():
     """
     爬取RG系列列表（不含价格）
     使用已知的RG URL: https://acg.78dm.net/ct/341672.html
     """
+    from bs4 import BeautifulSoup
+
     scraper = Scraper78DM()
     
     # RG系列URL（已知）
@@ -32,11 +24,8 @@ def scrape_rg_list():
     print(f"URL: {rg_url}\n")
     
     try:
-        response = scraper.session.get(rg_url, timeout=15)
-        response.encoding = 'utf-8'
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # 经过 FetchEngine 抓取（限速、重试、页面缓存）
+        soup = BeautifulSoup(scraper.fetch(rg_url, kind='series'), 'html.parser')
         gunpla_list = []
         
         # 查找所有模型链接
@@ -127,7 +116,8 @@ def scrape_rg_list():
         
         # 保存到数据库
         print(f"\n保存数据到数据库...")
-        with app.app_context():
+        from models import db, Gunpla
+        with app_context():
             saved_count = 0
             updated_count = 0
             skipped_count = 0
@@ -195,6 +185,8 @@ def scrape_rg_list():
         print(f"爬取失败: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        scraper.close()
 
 
 if __name__ == '__main__':
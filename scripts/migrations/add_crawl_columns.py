@@ -0,0 +1,49 @@
+"""
+更新数据库，添加爬取记录字段（增量爬取使用）
+- source_url: 78动漫详情页URL
+- last_crawled_at: 上次抓取详情页的时间
+- content_hash: 级别页面中列表条目的哈希
+
+已有记录的这些字段为空，下一次 python -m gunpla_scrape（或 --incremental）爬取时补全
+"""
+from app import app, db
+from sqlalchemy import text
+
+COLUMNS = [
+    ('source_url', 'VARCHAR(500)'),
+    ('last_crawled_at', 'TIMESTAMP'),
+    ('content_hash', 'VARCHAR(64)'),
+]
+
+def add_crawl_columns():
+    """添加爬取记录字段到gunpla表"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('gunpla')]
+
+            for name, column_type in COLUMNS:
+                if name in columns:
+                    print(f"{name}字段已存在，跳过添加")
+                    continue
+                print(f"正在添加{name}字段...")
+                db.session.execute(text(f'ALTER TABLE gunpla ADD COLUMN {name} {column_type}'))
+                print(f"[成功] {name}字段添加成功！")
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"更新数据库失败: {e}")
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("更新数据库结构 - 添加爬取记录字段")
+    print("=" * 60)
+    print()
+    add_crawl_columns()
+    print()
+    print("=" * 60)
+    print("更新完成！")
+    print("=" * 60)
+    print("\n下一步：运行爬虫记录详情页URL")
+    print("命令：python -m gunpla_scrape --grades all --incremental")
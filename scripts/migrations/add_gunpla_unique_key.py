@@ -0,0 +1,95 @@
+"""
+数据库迁移脚本：gunpla 表的 (name_cn, grade) 改为唯一索引
+（爬虫批量 upsert 使用 ON CONFLICT (name_cn, grade)，需要唯一约束）
+
+1. 合并重复记录：保留每组中 id 最小的一条，用其余记录补全它的空字段，
+   想要列表、已购买列表和价格历史改为指向保留的记录，然后删除其余记录，
+   并重建保留记录的价格日/周汇总
+2. 删除原来的普通索引 ix_gunpla_name_cn_grade
+3. 创建唯一索引 uq_gunpla_name_cn_grade
+"""
+from sqlalchemy import func
+
+from app import app
+from models import db, Gunpla, Wishlist, Collection, PriceHistory, PriceHistoryDaily, PriceHistoryWeekly
+from price_history import rebuild_rollups
+
+OLD_INDEX = 'ix_gunpla_name_cn_grade'
+NEW_INDEX = 'uq_gunpla_name_cn_grade'
+
+# 合并时用重复记录补全的字段
+MERGE_FIELDS = [
+    'name_jp', 'name_en', 'ms_number', 'series', 'subcategory',
+    'price_jp_msrp', 'price_jp_market', 'price_us_msrp', 'price_us_market',
+    'price_cn_msrp', 'price_cn_market',
+]
+
+
+def merge_duplicates():
+    """合并 (name_cn, grade) 重复的记录，返回删除的记录数"""
+    groups = db.session.query(Gunpla.name_cn, Gunpla.grade).group_by(
+        Gunpla.name_cn, Gunpla.grade
+    ).having(func.count(Gunpla.id) > 1).all()
+
+    # 删除重复记录时会级联删除它们的价格汇总，旧数据库可能还没有汇总表
+    for model in (PriceHistoryDaily, PriceHistoryWeekly):
+        model.__table__.create(bind=db.session.connection(), checkfirst=True)
+
+    removed = 0
+    for name_cn, grade in groups:
+        rows = Gunpla.query.filter_by(name_cn=name_cn, grade=grade).order_by(Gunpla.id).all()
+        keep, duplicates = rows[0], rows[1:]
+        duplicate_ids = [row.id for row in duplicates]
+        for row in duplicates:
+            for field in MERGE_FIELDS:
+                if getattr(keep, field) is None and getattr(row, field) is not None:
+                    setattr(keep, field, getattr(row, field))
+        for model in (Wishlist, Collection, PriceHistory):
+            db.session.query(model).filter(model.gunpla_id.in_(duplicate_ids)).update(
+                {model.gunpla_id: keep.id}, synchronize_session=False
+            )
+        rebuild_rollups(db.session, [keep.id] + duplicate_ids)
+        # 子记录已改为指向保留的记录，刷新后再删除，避免级联删除
+        for row in duplicates:
+            db.session.expire(row)
+            db.session.delete(row)
+        removed += len(duplicates)
+        print(f"  [合并] {grade} {name_cn}: 保留 id={keep.id}，删除 {duplicate_ids}")
+    return removed
+
+
+def add_gunpla_unique_key():
+    with app.app_context():
+        print("=" * 60)
+        print("数据库迁移：gunpla (name_cn, grade) 唯一索引")
+        print("=" * 60)
+
+        inspector = db.inspect(db.engine)
+        existing_indexes = {ix['name'] for ix in inspector.get_indexes('gunpla')}
+        if NEW_INDEX in existing_indexes and OLD_INDEX not in existing_indexes:
+            print(f"  [OK] {NEW_INDEX} 已存在")
+            return
+
+        try:
+            removed = merge_duplicates()
+            db.session.commit()
+            print(f"  合并重复记录: 删除 {removed} 条")
+
+            if OLD_INDEX in existing_indexes:
+                db.session.execute(db.text(f'DROP INDEX IF EXISTS {OLD_INDEX}'))
+                print(f"  [删除] {OLD_INDEX}")
+            if NEW_INDEX not in existing_indexes:
+                index = next(ix for ix in Gunpla.__table__.indexes if ix.name == NEW_INDEX)
+                index.create(bind=db.session.connection())
+                print(f"  [创建] {NEW_INDEX} (name_cn, grade) UNIQUE")
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"  [错误] {e}")
+            raise
+
+        print("\n迁移完成！")
+
+
+if __name__ == '__main__':
+    add_gunpla_unique_key()
@@ -0,0 +1,38 @@
+"""
+数据库迁移脚本：为已有数据库创建模型中声明的所有索引
+（db.create_all() 只会为新建的表创建索引）
+"""
+from app import app
+from models import db
+
+def add_indexes():
+    """创建缺失的索引（已存在的跳过）"""
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        existing_tables = set(inspector.get_table_names())
+        
+        print("=" * 60)
+        print("数据库迁移：创建索引")
+        print("=" * 60)
+        
+        created = 0
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                print(f"  [跳过] 表不存在: {table.name}")
+                continue
+            existing_indexes = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                if index.name in existing_indexes:
+                    print(f"  [OK] {index.name} 已存在")
+                    continue
+                try:
+                    index.create(bind=db.engine)
+                    created += 1
+                    print(f"  [创建] {index.name} ({', '.join(c.name for c in index.columns)})")
+                except Exception as e:
+                    print(f"  [错误] {index.name}: {e}")
+        
+        print(f"\n迁移完成！新建索引 {created} 个")
+
+if __name__ == '__main__':
+    add_indexes()
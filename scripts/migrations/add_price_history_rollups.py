@@ -0,0 +1,52 @@
+"""
+数据库迁移脚本：价格历史日/周汇总
+
+1. 创建汇总表 price_history_daily、price_history_weekly
+2. price_history 的索引 (gunpla_id, recorded_at) 换成覆盖索引
+   (gunpla_id, platform, recorded_at, price)
+3. 从已有的价格历史重建汇总（可重复运行）
+
+之后价格点请通过 price_history.record_prices 写入，汇总会随之更新
+"""
+from app import app
+from models import db, PriceHistory, PriceHistoryDaily, PriceHistoryWeekly
+from price_history import rebuild_rollups
+
+OLD_INDEX = 'ix_price_history_gunpla_id_recorded_at'
+NEW_INDEX = 'ix_price_history_gunpla_platform_recorded_at'
+
+
+def add_price_history_rollups():
+    with app.app_context():
+        print("=" * 60)
+        print("数据库迁移：价格历史日/周汇总")
+        print("=" * 60)
+
+        try:
+            connection = db.session.connection()
+            for model in (PriceHistory, PriceHistoryDaily, PriceHistoryWeekly):
+                model.__table__.create(bind=connection, checkfirst=True)
+            print("  [OK] price_history_daily / price_history_weekly")
+
+            existing_indexes = {ix['name'] for ix in db.inspect(connection).get_indexes('price_history')}
+            if NEW_INDEX not in existing_indexes:
+                index = next(ix for ix in PriceHistory.__table__.indexes if ix.name == NEW_INDEX)
+                index.create(bind=connection)
+                print(f"  [创建] {NEW_INDEX} (gunpla_id, platform, recorded_at, price)")
+            if OLD_INDEX in existing_indexes:
+                db.session.execute(db.text(f'DROP INDEX IF EXISTS {OLD_INDEX}'))
+                print(f"  [删除] {OLD_INDEX}")
+
+            counts = rebuild_rollups(db.session)
+            db.session.commit()
+            print(f"  重建汇总: 日汇总 {counts['day']} 行，周汇总 {counts['week']} 行")
+        except Exception as e:
+            db.session.rollback()
+            print(f"  [错误] {e}")
+            raise
+
+        print("\n迁移完成！")
+
+
+if __name__ == '__main__':
+    add_price_history_rollups()
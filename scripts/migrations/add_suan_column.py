@@ -0,0 +1,47 @@
+"""
+更新数据库，添加suan（算）字段及索引，并按当前汇率批量计算
+"""
+from app import app, db
+from models import Gunpla, AppSetting
+from sqlalchemy import text
+
+def add_suan_column():
+    """添加suan字段到gunpla表"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('gunpla')]
+            
+            if 'suan' in columns:
+                print("suan字段已存在，跳过添加")
+            else:
+                print("正在添加suan字段...")
+                db.session.execute(text('ALTER TABLE gunpla ADD COLUMN suan FLOAT'))
+                db.session.commit()
+                print("[成功] suan字段添加成功！")
+            
+            db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_gunpla_suan_id ON gunpla (suan, id)'))
+            db.session.commit()
+            print("[成功] 索引 ix_gunpla_suan_id 已创建")
+            
+            rate = app.config['JPY_TO_CNY_RATE']
+            print(f"正在按汇率 {rate} 计算算...")
+            updated = Gunpla.recompute_suan(db.session, rate)
+            AppSetting.set_value(db.session, 'suan_jpy_to_cny_rate', rate)
+            db.session.commit()
+            print(f"[成功] 已计算 {updated} 条记录")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"更新数据库失败: {e}")
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("更新数据库结构 - 添加suan字段")
+    print("=" * 60)
+    print()
+    add_suan_column()
+    print()
+    print("=" * 60)
+    print("更新完成！")
+    print("=" * 60)
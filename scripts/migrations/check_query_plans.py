@@ -0,0 +1,157 @@
+"""
+检查应用中主要查询的执行计划，发现全表扫描（缺少索引）
+
+SQLite 使用 EXPLAIN QUERY PLAN，PostgreSQL 使用 EXPLAIN ANALYZE
+（PostgreSQL 上先关闭 enable_seqscan，这样仍出现 Seq Scan 就说明没有可用的索引，
+避免小表上规划器主动选择顺序扫描造成误报）
+
+用法:
+  py scripts/migrations/check_query_plans.py
+发现全表扫描时退出码为1，可在部署前运行
+"""
+import sys
+from datetime import date
+
+from sqlalchemy import and_, func, or_
+
+from app import app
+from models import db, Gunpla, Wishlist, Collection, ShareLink, PriceHistory, PriceHistoryDaily, PriceHistoryWeekly, User
+
+
+def _query_shapes():
+    """
+    应用中的查询形态: (名称, 查询, 是否允许全表扫描)
+    参数值只用于生成执行计划，不影响结果
+    """
+    session = db.session
+    return [
+        ('高达列表 第1页',
+         Gunpla.query.order_by(Gunpla.name_cn, Gunpla.id).limit(51), True),
+        ('高达列表 第N页（游标）',
+         Gunpla.query.filter(or_(
+             Gunpla.name_cn > 'M',
+             and_(Gunpla.name_cn == 'M', Gunpla.id > 100)
+         )).order_by(Gunpla.name_cn, Gunpla.id).limit(51), False),
+        ('按级别+子分类筛选',
+         Gunpla.query.filter(Gunpla.grade == 'RG', Gunpla.subcategory == '普通版'), False),
+        ('按算筛选排序',
+         Gunpla.query.filter(Gunpla.suan.isnot(None), Gunpla.suan <= 60)
+         .order_by(Gunpla.suan, Gunpla.id).limit(51), False),
+        ('爬虫/导入查找已有记录 (name_cn, grade)',
+         Gunpla.query.filter_by(name_cn='RX-78-2 高达', grade='RG').limit(1), False),
+        ('筛选项统计 (GROUP BY)',
+         session.query(Gunpla.grade, Gunpla.subcategory, func.count(Gunpla.id))
+         .group_by(Gunpla.grade, Gunpla.subcategory), True),
+        ('想要列表（按用户）',
+         Wishlist.query.filter_by(user_id=1).order_by(Wishlist.added_at.desc()), False),
+        ('想要列表 是否已添加',
+         Wishlist.query.filter_by(gunpla_id=1, user_id=1).limit(1), False),
+        ('详情页 是否在想要列表（登录）',
+         Wishlist.query.filter_by(user_id=1, gunpla_id=1).limit(1), False),
+        ('详情页 是否在想要列表（未登录，公共列表）',
+         Wishlist.query.filter_by(user_id=None, gunpla_id=1).limit(1), False),
+        ('已购买列表（按用户）',
+         Collection.query.filter_by(user_id=1).order_by(Collection.purchase_date.desc()), False),
+        ('已购买列表 是否已添加',
+         Collection.query.filter_by(gunpla_id=1, user_id=1).limit(1), False),
+        ('详情页 是否在已购买列表（登录）',
+         Collection.query.filter_by(user_id=1, gunpla_id=1).limit(1), False),
+        ('详情页 是否在已购买列表（未登录，公共列表）',
+         Collection.query.filter_by(user_id=None, gunpla_id=1).limit(1), False),
+        ('当前分享链接',
+         ShareLink.query.filter_by(user_id=1, list_type='wishlist', is_active=True).limit(1), False),
+        ('分享链接 按token查找',
+         ShareLink.query.filter_by(token='x', is_active=True).limit(1), False),
+        ('价格历史（按高达+平台、时间）',
+         session.query(PriceHistory.recorded_at, PriceHistory.price)
+         .filter(PriceHistory.gunpla_id == 1, PriceHistory.platform == '淘宝')
+         .order_by(PriceHistory.recorded_at), False),
+        ('价格走势图 最新记录时间',
+         session.query(func.max(PriceHistory.recorded_at))
+         .filter(PriceHistory.gunpla_id == 1, PriceHistory.platform == '淘宝'), False),
+        ('详情页 有价格历史的平台',
+         session.query(PriceHistoryWeekly.platform).filter(PriceHistoryWeekly.gunpla_id == 1)
+         .distinct().order_by(PriceHistoryWeekly.platform), False),
+        ('价格走势 日汇总',
+         session.query(PriceHistoryDaily.platform, PriceHistoryDaily.bucket, PriceHistoryDaily.price_sum)
+         .filter(PriceHistoryDaily.gunpla_id == 1)
+         .order_by(PriceHistoryDaily.platform, PriceHistoryDaily.bucket), False),
+        ('价格走势 周汇总（按平台、起始日期）',
+         session.query(PriceHistoryWeekly.bucket, PriceHistoryWeekly.price_sum)
+         .filter(PriceHistoryWeekly.gunpla_id == 1, PriceHistoryWeekly.platform == '淘宝',
+                 PriceHistoryWeekly.bucket >= date(2024, 1, 1))
+         .order_by(PriceHistoryWeekly.bucket), False),
+        ('用户名查找',
+         User.query.filter_by(username='x').limit(1), False),
+    ]
+
+
+def _compile(query):
+    return str(query.statement.compile(
+        dialect=db.engine.dialect,
+        compile_kwargs={'literal_binds': True},
+    ))
+
+
+def _sqlite_plan(conn, sql):
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    details = [row[-1] for row in rows]
+    # "SCAN table" 为全表扫描；"SCAN table USING INDEX" 为按索引顺序遍历
+    scans = [d for d in details if d.startswith('SCAN ') and 'USING' not in d and 'VIRTUAL TABLE' not in d]
+    return details, scans
+
+
+def _postgres_plan(conn, sql):
+    conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    rows = conn.exec_driver_sql('EXPLAIN ANALYZE ' + sql).fetchall()
+    details = [row[0] for row in rows]
+    scans = [d.strip() for d in details if 'Seq Scan' in d]
+    return details, scans
+
+
+def check_query_plans(verbose=False):
+    """
+    检查所有查询形态
+    返回: 出现意外全表扫描的查询数量
+    """
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            explain = _sqlite_plan
+        elif dialect == 'postgresql':
+            explain = _postgres_plan
+        else:
+            print(f"不支持的数据库: {dialect}")
+            return 0
+
+        print("=" * 60)
+        print(f"检查查询执行计划 ({dialect})")
+        print("=" * 60)
+
+        problems = 0
+        for name, query, allow_scan in _query_shapes():
+            sql = _compile(query)
+            with db.engine.connect() as conn:
+                with conn.begin():
+                    details, scans = explain(conn, sql)
+            if scans and not allow_scan:
+                problems += 1
+                print(f"[全表扫描] {name}")
+                for scan in scans:
+                    print(f"    {scan}")
+            else:
+                print(f"[OK] {name}")
+            if verbose:
+                for line in details:
+                    print(f"      | {line}")
+
+        print()
+        if problems:
+            print(f"发现 {problems} 个查询存在全表扫描，请运行 scripts/migrations/add_indexes.py")
+        else:
+            print("所有查询均使用索引")
+        return problems
+
+
+if __name__ == '__main__':
+    sys.exit(1 if check_query_plans(verbose='-v' in sys.argv) else 0)
@@ -1,21 +1,11 @@
 """
 78动漫自动爬虫 - 从主页开始，自动查找并爬取所有级别
 """
-import requests
-from bs4 import BeautifulSoup
 import time
 import re
-import sys
-import importlib.util
-from models import db, Gunpla
-from app import app
+import crawl_frontier
+from gunpla_scrape.scraper78dm import Scraper78DM
 
-# 导入78dm_scraper模块（因为模块名以数字开头，需要使用特殊方法）
-spec = importlib.util.spec_from_file_location("scraper78dm", "78dm_scraper.py")
-scraper78dm_module = importlib.util.module_from_spec(spec)
-sys.modules["scraper78dm"] = scraper78dm_module
-spec.loader.exec_module(scraper78dm_module)
-Scraper78DM = scraper78dm_module.Scraper78DM
 
 class AutoScraper78DM(Scraper78DM):
     """自动爬虫类，继承自基础爬虫"""
@@ -36,6 +26,8 @@ class AutoScraper78DM(Scraper78DM):
         print("正在查找所有级别的链接...")
         print("=" * 60)
         
+        from bs4 import BeautifulSoup
+
         grade_links = {}
         
         try:
@@ -44,11 +36,8 @@ class AutoScraper78DM(Scraper78DM):
             database_url = 'https://acg.78dm.net'
             
             print(f"访问资料库: {database_url}")
-            response = self.session.get(database_url, timeout=15)
-            response.encoding = 'utf-8'
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # 经过 FetchEngine 抓取（限速、重试、页面缓存）
+            soup = BeautifulSoup(self.fetch(database_url, kind='series'), 'html.parser')
             
             # 查找高达相关的级别链接
             # 常见的级别：PG, MG, RE/100, RG, HGUC, HGGTO, HGBF/BD, SDCS等
@@ -122,6 +111,30 @@ class AutoScraper78DM(Scraper78DM):
             traceback.print_exc()
             return {}
     
+    def scrape_grade(self, grade, url, include_price=True, frontier=None):
+        """
+        爬取一个级别并入库，返回新增/更新的条数（没有爬取到数据时为 0）
+        
+        详情页由抓取引擎并发抓取（限速见 Config.SCRAPER_REQUESTS_PER_SECOND）；
+        传入 frontier（CrawlFrontier）时详情页结果写入检查点，中断后重新运行从中断处继续，
+        数据入库后删除该级别的检查点（入库失败时保留，抛出异常）
+        """
+        gunpla_list = self.scrape_series_page(url, grade=grade)
+        if not gunpla_list:
+            print(f"未能爬取到{grade}数据")
+            return 0
+        print(f"\n成功爬取 {len(gunpla_list)} 个{grade}模型")
+        
+        if include_price:
+            print(f"\n开始爬取价格信息...")
+            self.scrape_item_details(gunpla_list, frontier=frontier, grade=grade)
+        
+        print(f"\n保存{grade}数据到数据库...")
+        saved = self.save_to_database(gunpla_list, grade=grade, raise_errors=True)
+        if frontier is not None:
+            frontier.finish(grade)
+        return saved
+    
     def scrape_all_grades(self, grades_to_scrape=None, include_price=True, delay=1.5):
         """
         爬取所有级别
@@ -129,7 +142,9 @@ class AutoScraper78DM(Scraper78DM):
         参数:
             grades_to_scrape: 要爬取的级别列表，如果为None则爬取所有找到的级别
             include_price: 是否爬取价格信息
-            delay: 每个请求之间的延迟（秒）
+            delay: 级别之间的间隔（秒）；详情页的请求速率由抓取引擎控制
+        
+        详情页结果记录在爬取检查点（Config.CRAWL_FRONTIER_PATH）中，中断后重新运行时从中断处继续
         """
         print("\n" + "=" * 60)
         print("78动漫自动爬虫 - 爬取所有级别")
@@ -154,54 +169,28 @@ class AutoScraper78DM(Scraper78DM):
         
         # 逐个爬取每个级别
         total_saved = 0
-        for i, (grade, url) in enumerate(grade_links.items(), 1):
-            print("\n" + "=" * 60)
-            print(f"[{i}/{len(grade_links)}] 开始爬取 {grade} 级别")
-            print("=" * 60)
-            
-            try:
-                # 爬取该级别
-                gunpla_list = self.scrape_series_page(url, grade=grade)
+        frontier = crawl_frontier.from_config()
+        try:
+            for i, (grade, url) in enumerate(grade_links.items(), 1):
+                print("\n" + "=" * 60)
+                print(f"[{i}/{len(grade_links)}] 开始爬取 {grade} 级别")
+                print("=" * 60)
                 
-                if gunpla_list:
-                    print(f"\n成功爬取 {len(gunpla_list)} 个{grade}模型")
-                    
-                    # 爬取价格信息
-                    if include_price:
-                        print(f"\n开始爬取价格信息...")
-                        print(f"预计需要 {len(gunpla_list) * delay / 60:.1f} 分钟")
-                        
-                        for j, item in enumerate(gunpla_list, 1):
-                            if item.get('url'):
-                                print(f"[{j}/{len(gunpla_list)}] {item['name_cn']}")
-                                detail = self.scrape_item_detail(item['url'])
-                                
-                                if detail.get('price_jp_msrp'):
-                                    item['price_jp_msrp'] = detail['price_jp_msrp']
-                                    converted = self.convert_price(detail['price_jp_msrp'])
-                                    item.update(converted)
-                                    print(f"  价格: ¥{item['price_jp_msrp']:.0f} (JPY) → ${item.get('price_us_msrp', 0):.2f} (USD) / ¥{item.get('price_cn_msrp', 0):.2f} (CNY)")
-                                
-                                if j < len(gunpla_list):
-                                    time.sleep(delay)
-                    
-                    # 保存到数据库
-                    print(f"\n保存{grade}数据到数据库...")
-                    saved = self.save_to_database(gunpla_list, grade=grade)
-                    total_saved += saved
+                try:
+                    total_saved += self.scrape_grade(grade, url, include_price=include_price, frontier=frontier)
                     
                     # 级别之间延迟
                     if i < len(grade_links):
-                        print(f"\n等待 {delay * 2} 秒后继续下一个级别...")
-                        time.sleep(delay * 2)
-                else:
-                    print(f"未能爬取到{grade}数据")
-                    
-            except Exception as e:
-                print(f"爬取{grade}级别失败: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
+                        print(f"\n等待 {delay} 秒后继续下一个级别...")
+                        time.sleep(delay)
+                except Exception as e:
+                    print(f"爬取{grade}级别失败: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    continue
+        finally:
+            if frontier is not None:
+                frontier.close()
         
         print("\n" + "=" * 60)
         print("所有级别爬取完成！")
@@ -244,50 +233,25 @@ def scrape_specific_grades(grades, include_price=True):
     
     # 逐个爬取
     total_saved = 0
-    for i, (grade, url) in enumerate(grade_urls.items(), 1):
-        print("\n" + "=" * 60)
-        print(f"[{i}/{len(grade_urls)}] 开始爬取 {grade} 级别")
-        print(f"URL: {url}")
-        print("=" * 60)
-        
-        try:
-            gunpla_list = scraper.scrape_series_page(url, grade=grade)
+    frontier = crawl_frontier.from_config()
+    try:
+        for i, (grade, url) in enumerate(grade_urls.items(), 1):
+            print("\n" + "=" * 60)
+            print(f"[{i}/{len(grade_urls)}] 开始爬取 {grade} 级别")
+            print(f"URL: {url}")
+            print("=" * 60)
             
-            if gunpla_list:
-                print(f"\n成功爬取 {len(gunpla_list)} 个{grade}模型")
-                
-                if include_price:
-                    print(f"\n开始爬取价格信息...")
-                    print(f"预计需要 {len(gunpla_list) * 1.5 / 60:.1f} 分钟")
-                    
-                    for j, item in enumerate(gunpla_list, 1):
-                        if item.get('url'):
-                            print(f"[{j}/{len(gunpla_list)}] {item['name_cn']}")
-                            detail = scraper.scrape_item_detail(item['url'])
-                            
-                            if detail.get('price_jp_msrp'):
-                                item['price_jp_msrp'] = detail['price_jp_msrp']
-                                converted = scraper.convert_price(detail['price_jp_msrp'])
-                                item.update(converted)
-                                print(f"  价格: ¥{item['price_jp_msrp']:.0f} (JPY) → ${item.get('price_us_msrp', 0):.2f} (USD) / ¥{item.get('price_cn_msrp', 0):.2f} (CNY)")
-                            
-                            if j < len(gunpla_list):
-                                time.sleep(1.5)
-                
-                print(f"\n保存{grade}数据到数据库...")
-                saved = scraper.save_to_database(gunpla_list, grade=grade)
-                total_saved += saved
-                
-                if i < len(grade_urls):
-                    time.sleep(3)
-            else:
-                print(f"未能爬取到{grade}数据")
-                
-        except Exception as e:
-            print(f"爬取{grade}级别失败: {e}")
-            import traceback
-            traceback.print_exc()
-            continue
+            try:
+                total_saved += scraper.scrape_grade(grade, url, include_price=include_price, frontier=frontier)
+            except Exception as e:
+                print(f"爬取{grade}级别失败: {e}")
+                import traceback
+                traceback.print_exc()
+                continue
+    finally:
+        if frontier is not None:
+            frontier.close()
+        scraper.close()
     
     print("\n" + "=" * 60)
     print("爬取完成！")
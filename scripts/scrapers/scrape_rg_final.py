@@ -1,26 +1,18 @@
 """
 最终RG爬虫 - 正确识别子分类
-先找到所有子分类标题的位置，然后根据链接位置判断子分类
+按文档顺序遍历页面，链接属于它前面最近的子分类标题
 """
-import requests
-from bs4 import BeautifulSoup
-import re
-from models import db, Gunpla
-from app import app
-import sys
-import importlib.util
+from series_page import tag_links
+from gunpla_scrape.database import app_context
+from gunpla_scrape.scraper78dm import Scraper78DM
 
-# 导入基础爬虫类
-spec = importlib.util.spec_from_file_location("scraper78dm", "78dm_scraper.py")
-scraper78dm_module = importlib.util.module_from_spec(spec)
-sys.modules["scraper78dm"] = scraper78dm_module
-spec.loader.exec_module(scraper78dm_module)
-Scraper78DM = scraper78dm_module.Scraper78DM
 
 def scrape_rg_final():
     """
     最终版本：正确识别子分类
     """
+    from bs4 import BeautifulSoup
+
     scraper = Scraper78DM()
     
     # RG系列URL
@@ -32,50 +24,17 @@ def scrape_rg_final():
     print(f"URL: {rg_url}\n")
     
     try:
-        response = scraper.session.get(rg_url, timeout=15)
-        response.encoding = 'utf-8'
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # 经过 FetchEngine 抓取（限速、重试、页面缓存）
+        soup = BeautifulSoup(scraper.fetch(rg_url, kind='series'), 'html.parser')
         gunpla_list = []
         
-        # 方法：按顺序遍历所有元素，遇到子分类标题时切换，遇到模型链接时记录
-        # 获取页面中所有元素（按顺序）
-        all_elements = soup.find_all(True)  # 获取所有标签
-        
-        current_subcategory = '普通版'
-        
-        # 查找所有模型链接和子分类标题
-        links = soup.find_all('a', href=re.compile(r'/ct/\d+\.html'))
-        
-        print(f"找到 {len(links)} 个链接，正在处理...")
+        # 方法：按顺序遍历一次页面，遇到子分类标题时切换，遇到模型链接时记录
+        tagged_links = tag_links(soup)
         
-        # 获取页面文本，用于查找子分类标题的位置
-        page_text = soup.get_text()
-        
-        # 找到所有子分类标题的位置
-        subcategory_markers = []
-        patterns = [
-            (r'普通版共\d+款', '普通版'),
-            (r'网络限定版共\d+款', '网络限定版'),
-            (r'其他限定版共\d+款', '其他限定版'),
-            (r'EVANGELION系列共\d+款', 'EVANGELION系列'),
-            (r'勇者王系列共\d+款', '勇者王系列'),
-            (r'参考出品/开发中商品共\d+款', '参考出品/开发中'),
-        ]
-        
-        for pattern, subcat in patterns:
-            for match in re.finditer(pattern, page_text):
-                subcategory_markers.append((match.start(), subcat))
-        
-        # 按位置排序
-        subcategory_markers.sort()
-        print(f"\n找到 {len(subcategory_markers)} 个子分类标记：")
-        for pos, subcat in subcategory_markers:
-            print(f"  位置 {pos}: {subcat}")
+        print(f"找到 {len(tagged_links)} 个链接，正在处理...")
         
         # 处理每个链接
-        for link in links:
+        for link, link_subcategory in tagged_links:
             name = link.get_text(strip=True)
             href = link.get('href', '')
             
@@ -88,17 +47,6 @@ def scrape_rg_final():
             if any(keyword in name for keyword in skip_keywords):
                 continue
             
-            # 找到链接在页面中的位置
-            link_pos = page_text.find(name)
-            
-            # 确定链接属于哪个子分类（找到最近的子分类标记之前的位置）
-            link_subcategory = '普通版'  # 默认
-            for pos, subcat in subcategory_markers:
-                if link_pos > pos:
-                    link_subcategory = subcat
-                else:
-                    break
-            
             # 构建完整URL
             if href.startswith('/'):
                 full_url = scraper.base_url + href
@@ -144,7 +92,8 @@ def scrape_rg_final():
         
         # 保存到数据库
         print(f"\n保存数据到数据库...")
-        with app.app_context():
+        from models import db, Gunpla
+        with app_context():
             saved_count = 0
             updated_count = 0
             skipped_count = 0
@@ -211,6 +160,8 @@ def scrape_rg_final():
         print(f"爬取失败: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        scraper.close()
 
 
 if __name__ == '__main__':
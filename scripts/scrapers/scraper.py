@@ -6,7 +6,7 @@ import requests
 from bs4 import BeautifulSoup
 import time
 from models import db, Gunpla
-from app import app
+from gunpla_scrape.database import app_context
 import re
 
 class GunplaScraper:
@@ -171,7 +171,7 @@ class GunplaScraper:
             gunpla_data_list: 高达数据字典列表
             grade: 如果指定，会为所有数据设置这个级别
         """
-        with app.app_context():
+        with app_context():
             saved_count = 0
             skipped_count = 0
             
@@ -1,71 +1,49 @@
 """
 更新已有模型的价格信息
-只更新价格为空的模型
+只更新价格为空的模型（需要爬虫已记录详情页URL，即 gunpla.source_url）
+
+用法:
+    py scripts/scrapers/update_prices.py --grade MG
+    py scripts/scrapers/update_prices.py --grade MG --profile-imports   # 结束后报告各模块导入耗时
+
+整个级别按需重新抓取可以用增量模式：
+    python -m gunpla_scrape --grades RG --incremental
 """
-from 78dm_scraper import Scraper78DM
-from models import db, Gunpla
-from app import app
-import time
+import argparse
+import sys
+
+from gunpla_scrape import update_existing_prices
 
 def update_missing_prices(grade='RG', delay=1.5):
     """
     更新缺少价格信息的模型
-    
+
     参数:
         grade: 级别
-        delay: 每个请求之间的延迟（秒）
+        delay: 两次请求之间的平均间隔（秒）
     """
-    scraper = Scraper78DM()
-    
-    with app.app_context():
-        # 获取所有该级别且没有价格的模型
-        gunpla_list = Gunpla.query.filter_by(grade=grade).filter(
-            db.or_(
-                Gunpla.price_jp_msrp.is_(None),
-                Gunpla.price_jp_msrp == 0
-            )
-        ).all()
-        
-        if not gunpla_list:
-            print(f"所有{grade}系列模型都已包含价格信息")
-            return
-        
-        print(f"找到 {len(gunpla_list)} 个需要更新价格的模型")
-        print(f"开始更新价格信息...")
-        print(f"预计需要 {len(gunpla_list) * delay / 60:.1f} 分钟\n")
-        
-        updated_count = 0
-        failed_count = 0
-        
-        for i, gunpla in enumerate(gunpla_list, 1):
-            # 尝试构建78动漫的URL
-            # 78动漫的URL格式通常是：https://acg.78dm.net/ct/数字.html
-            # 由于我们没有存储原始URL，需要搜索或手动提供
-            
-            # 方法1：尝试在78动漫搜索
-            search_url = f"https://acg.78dm.net/search?q={gunpla.name_cn}"
-            print(f"[{i}/{len(gunpla_list)}] {gunpla.name_cn}")
-            
-            # 这里简化处理：提示用户需要手动查找URL
-            # 或者可以改进为自动搜索功能
-            print(f"  提示：需要手动查找 {gunpla.name_cn} 的78动漫URL")
-            print(f"  或者等待自动搜索功能实现")
-            
-            # TODO: 实现自动搜索功能
-            # 暂时跳过，等待改进
-            failed_count += 1
-            continue
-        
-        print(f"\n更新完成！")
-        print(f"成功更新: {updated_count} 个")
-        print(f"需要手动处理: {failed_count} 个")
+    return update_existing_prices(grade=grade, delay=delay)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='更新缺少价格信息的模型')
+    parser.add_argument('--grade', default='RG', help='级别（默认 RG）')
+    parser.add_argument('--delay', type=float, default=1.5, help='两次请求之间的平均间隔（秒）')
+    parser.add_argument('--profile-imports', action='store_true',
+                        help='用 -X importtime 运行本命令，结束后报告各模块的导入耗时（见 import_profile.py）')
+    args = parser.parse_args(argv)
+
+    if args.profile_imports:
+        import import_profile
+        argv = sys.argv[1:] if argv is None else list(argv)
+        return import_profile.run_profiled(
+            [__file__] + [arg for arg in argv if arg != '--profile-imports']
+        )
 
-if __name__ == '__main__':
     print("=" * 60)
     print("更新模型价格信息")
     print("=" * 60)
-    print("\n注意：由于需要访问每个模型的详情页面，")
-    print("建议直接运行 78dm_scraper.py 重新爬取（会更新已有数据）\n")
-    
-    # 更新RG系列
-    update_missing_prices(grade='RG', delay=1.5)
+    update_missing_prices(grade=args.grade, delay=args.delay)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
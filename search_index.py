@@ -0,0 +1,160 @@
+"""
+高达名称/编号全文搜索索引
+
+- SQLite: FTS5 外部内容表 + trigram 分词器（按字切分，适合中日文），由触发器与 gunpla 表保持同步
+- PostgreSQL: pg_trgm 扩展 + GIN 三元组索引，写入时由数据库自动维护
+- 少于3个字符的查询词（如"强袭""RX"）两种索引都用不上，改用进程内联想索引（typeahead.py，
+  单字和双字倒排表）查出匹配的 id；匹配太多或没有联想索引时回退到 LIKE 查询
+- 其他情况回退到 LIKE 查询
+"""
+from sqlalchemy import func, literal_column, or_, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import Gunpla
+
+# 参与搜索的列
+SEARCH_COLUMNS = ('name_cn', 'name_jp', 'name_en', 'ms_number')
+
+FTS_TABLE = 'gunpla_fts'
+
+# trigram 分词器（以及 pg_trgm）至少需要3个字符才能命中索引
+FTS_MIN_TERM_LENGTH = 3
+
+# 短查询词匹配的记录超过这个数时不用 id 列表：这时 LIKE 按排序列扫描很快就能凑满一页
+SHORT_TERM_MAX_IDS = 5000
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {', '.join(SEARCH_COLUMNS)},
+        content='gunpla', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS gunpla_fts_ai AFTER INSERT ON gunpla BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS gunpla_fts_ad AFTER DELETE ON gunpla BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS gunpla_fts_au AFTER UPDATE OF {', '.join(SEARCH_COLUMNS)} ON gunpla BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in SEARCH_COLUMNS)});
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in SEARCH_COLUMNS)});
+    END""",
+]
+
+_POSTGRES_DDL = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+    f'CREATE INDEX IF NOT EXISTS ix_gunpla_{c}_trgm ON gunpla USING gin ({c} gin_trgm_ops)'
+    for c in SEARCH_COLUMNS
+]
+
+
+def install_search_index(db):
+    """
+    创建搜索索引（幂等），需要在 db.create_all() 之后、应用上下文中调用
+
+    返回:
+        使用的后端: 'fts5', 'pg_trgm' 或 None（回退到LIKE）
+    """
+    dialect = db.engine.dialect.name
+    try:
+        if dialect == 'sqlite':
+            existed = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+                {'name': FTS_TABLE},
+            ).first() is not None
+            for ddl in _SQLITE_DDL:
+                db.session.execute(text(ddl))
+            if not existed:
+                # 为已有数据建立索引
+                db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')"))
+            db.session.commit()
+            return 'fts5'
+        if dialect == 'postgresql':
+            for ddl in _POSTGRES_DDL:
+                db.session.execute(text(ddl))
+            db.session.commit()
+            return 'pg_trgm'
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"搜索索引不可用，回退到LIKE查询: {e}")
+    return None
+
+
+def detect_search_backend(db):
+    """
+    不建索引，只检查已经创建的搜索索引（一次查询），返回值同 install_search_index
+    """
+    dialect = db.engine.dialect.name
+    try:
+        if dialect == 'sqlite':
+            exists = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+                {'name': FTS_TABLE},
+            ).first() is not None
+            return 'fts5' if exists else None
+        if dialect == 'postgresql':
+            exists = db.session.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = :name"),
+                {'name': f'ix_gunpla_{SEARCH_COLUMNS[0]}_trgm'},
+            ).first() is not None
+            return 'pg_trgm' if exists else None
+    except SQLAlchemyError:
+        db.session.rollback()
+    return None
+
+
+def rebuild_search_index(db):
+    """重建SQLite FTS索引（绕过触发器直接改库后使用）"""
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')"))
+        db.session.commit()
+
+
+def _like_filter(term):
+    return or_(*(getattr(Gunpla, c).contains(term) for c in SEARCH_COLUMNS))
+
+
+def search_gunpla(session, term, backend, ngram_index=None):
+    """
+    构建搜索查询
+
+    参数:
+        session: 数据库会话
+        term: 搜索词
+        backend: install_search_index() 的返回值
+        ngram_index: typeahead.TypeaheadIndex，用于少于 FTS_MIN_TERM_LENGTH 个字符的查询词
+
+    返回:
+        (query, rank) - query 的每行为 (Gunpla, rank)；rank 越小越相关。
+        无法按相关度排序时 rank 为 None，query 只返回 Gunpla
+    """
+    if len(term) < FTS_MIN_TERM_LENGTH and ngram_index is not None:
+        ids = ngram_index.match_ids(session, term)
+        if len(ids) <= SHORT_TERM_MAX_IDS:
+            return session.query(Gunpla).filter(Gunpla.id.in_(ids)), None
+
+    if backend == 'fts5' and len(term) >= FTS_MIN_TERM_LENGTH:
+        fts = literal_column(FTS_TABLE)
+        phrase = '"' + term.replace('"', '""') + '"'
+        matches = select(
+            literal_column('rowid').label('gunpla_id'),
+            func.bm25(fts).label('rank'),
+        ).select_from(text(FTS_TABLE)).where(fts.op('MATCH')(phrase)).subquery()
+        query = session.query(Gunpla, matches.c.rank).join(
+            matches, matches.c.gunpla_id == Gunpla.id
+        )
+        return query, matches.c.rank
+
+    if backend == 'pg_trgm':
+        rank = -func.greatest(*(
+            func.word_similarity(term, func.coalesce(getattr(Gunpla, c), ''))
+            for c in SEARCH_COLUMNS
+        ))
+        query = session.query(Gunpla, rank.label('rank')).filter(
+            or_(*(getattr(Gunpla, c).ilike(f'%{term}%') for c in SEARCH_COLUMNS))
+        )
+        return query, rank
+
+    return session.query(Gunpla).filter(_like_filter(term)), None
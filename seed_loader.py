@@ -0,0 +1,304 @@
+"""
+种子数据（data/seed_gunpla.csv）导入
+
+- 逐行读取 CSV 并按表结构转换类型，分批写入，内存中最多只有一批
+- PostgreSQL: 每批一次 COPY FROM STDIN（psycopg2 copy_expert）
+- SQLite: WAL 模式下，一个事务内每批一次 executemany
+- 其他数据库: SQLAlchemy 的批量 INSERT
+- 可选的 SQLite 快照（python seed_loader.py snapshot 生成）：
+  SQLite 数据库文件还不存在时直接复制快照，不再解析 CSV。
+  快照旁的 .json 记录表结构和种子文件的指纹，两者有变化时快照自动失效
+
+命令行:
+    python seed_loader.py snapshot [--out 路径]    生成快照
+    python seed_loader.py check                    检查快照是否可用
+"""
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable
+
+from config import Config, basedir
+from models import db, Gunpla
+
+SEED_PATH = os.path.join(basedir, 'data', 'seed_gunpla.csv')
+
+
+class SeedReport:
+    """一次导入的结果：行数、耗时（秒）和方式（COPY / executemany / insert / snapshot）"""
+    __slots__ = ('rows', 'seconds', 'method')
+
+    def __init__(self, rows, seconds, method):
+        self.rows = rows
+        self.seconds = seconds
+        self.method = method
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return f'{self.rows} in {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s, {self.method})'
+
+
+# ---- 读取 ----
+
+def _converter(column):
+    """CSV 文本 -> 列的 Python 类型（空字符串为 None）"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = str
+    if python_type is datetime:
+        return datetime.fromisoformat
+    if python_type in (int, float):
+        return python_type
+    return str
+
+
+def read_seed(path=SEED_PATH, table=None):
+    """
+    返回 (列名列表, 行迭代器)；每行是与列名对应的元组，值已转换为列的类型
+    表中没有的 CSV 列被忽略
+    """
+    table = Gunpla.__table__ if table is None else table
+    f = open(path, newline='', encoding='utf-8')
+    reader = csv.reader(f)
+    header = next(reader, [])
+    indexes = [i for i, name in enumerate(header) if name in table.c]
+    columns = [header[i] for i in indexes]
+    converters = [_converter(table.c[name]) for name in columns]
+
+    def rows():
+        with f:
+            for record in reader:
+                yield tuple(
+                    convert(record[i]) if i < len(record) and record[i] != '' else None
+                    for i, convert in zip(indexes, converters)
+                )
+    return columns, rows()
+
+
+def _batches(rows, size):
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+# ---- 写入 ----
+
+def _copy_postgres(connection, table, columns, rows, batch_size):
+    """每批写成 CSV 后 COPY；写入显式 id 后把序列调整到最大值"""
+    cursor = connection.connection.driver_connection.cursor()
+    statement = f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+    count = 0
+    try:
+        for batch in _batches(rows, batch_size):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in batch:
+                # 空值不加引号，COPY 读作 NULL
+                writer.writerow('' if value is None else value for value in row)
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            count += len(batch)
+        if 'id' in columns:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+            )
+    finally:
+        cursor.close()
+    return count
+
+
+def _executemany_sqlite(connection, table, columns, rows, batch_size):
+    """驱动层 executemany（参数按列类型转换成 SQLite 的存储格式）"""
+    try:
+        connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+    except Exception:
+        # 已经在写事务中时不能切换日志模式，按原模式写入
+        pass
+    processors = [table.c[name].type.bind_processor(connection.dialect) for name in columns]
+    statement = f'INSERT INTO {table.name} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+    count = 0
+    for batch in _batches(rows, batch_size):
+        if any(processors):
+            batch = [
+                tuple(process(value) if process and value is not None else value
+                      for process, value in zip(processors, row))
+                for row in batch
+            ]
+        connection.exec_driver_sql(statement, batch)
+        count += len(batch)
+    return count
+
+
+def _insert(connection, table, columns, rows, batch_size):
+    count = 0
+    for batch in _batches(rows, batch_size):
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+        count += len(batch)
+    return count
+
+
+def load_seed(session, path=SEED_PATH, batch_size=None, jpy_to_cny_rate=None):
+    """
+    把种子 CSV 导入 gunpla 表（整个导入在一个事务中，最后提交），返回 SeedReport
+    批量写入不触发 ORM 事件，导入后统一重算"算"
+    """
+    batch_size = batch_size or Config.SEED_BATCH_SIZE
+    table = Gunpla.__table__
+    started = time.perf_counter()
+    columns, rows = read_seed(path, table)
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        method, load = 'COPY', _copy_postgres
+    elif dialect == 'sqlite':
+        method, load = 'executemany', _executemany_sqlite
+    else:
+        method, load = 'insert', _insert
+    count = load(connection, table, columns, rows, batch_size)
+    Gunpla.recompute_suan(session, jpy_to_cny_rate)
+    session.commit()
+    return SeedReport(count, time.perf_counter() - started, method)
+
+
+# ---- 快照 ----
+
+def sqlite_path(database_uri):
+    """SQLite 数据库文件路径；其他数据库或内存数据库返回 None"""
+    if not database_uri.startswith('sqlite:///'):
+        return None
+    path = database_uri[len('sqlite:///'):].split('?', 1)[0]
+    return path if path and path != ':memory:' else None
+
+
+def fingerprint(seed_path=SEED_PATH, metadata=None):
+    """表结构（SQLite DDL）和种子文件内容的指纹"""
+    metadata = db.metadata if metadata is None else metadata
+    digest = hashlib.sha256()
+    for table in metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=sqlite.dialect())).encode('utf-8'))
+    with open(seed_path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _meta_path(snapshot_path):
+    return snapshot_path + '.json'
+
+
+def snapshot_status(snapshot_path=None, seed_path=SEED_PATH):
+    """(快照是否可用, 说明, 快照中的行数)"""
+    if snapshot_path is None:
+        snapshot_path = Config.SEED_SNAPSHOT_PATH
+    if not snapshot_path or not os.path.exists(snapshot_path):
+        return False, '快照不存在', 0
+    try:
+        with open(_meta_path(snapshot_path), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False, '快照缺少指纹文件', 0
+    if not os.path.exists(seed_path) or meta.get('fingerprint') != fingerprint(seed_path):
+        return False, '表结构或种子数据已变化，需要重新生成快照', 0
+    return True, f"快照生成于 {meta.get('built_at')}", meta.get('rows', 0)
+
+
+def restore_snapshot(database_uri, snapshot_path=None, seed_path=SEED_PATH):
+    """
+    SQLite 数据库文件还不存在（或为空）时复制快照，返回 SeedReport；不满足条件时返回 None
+    需要在第一次连接数据库（db.create_all）之前调用
+    """
+    if snapshot_path is None:
+        snapshot_path = Config.SEED_SNAPSHOT_PATH
+    path = sqlite_path(database_uri)
+    if path is None or not snapshot_path or not os.path.exists(snapshot_path):
+        return None
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        return None
+    started = time.perf_counter()
+    usable, reason, rows = snapshot_status(snapshot_path, seed_path)
+    if not usable:
+        print(f"Seed snapshot skipped: {reason}")
+        return None
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.restore'
+    shutil.copyfile(snapshot_path, temp_path)
+    os.replace(temp_path, path)
+    return SeedReport(rows, time.perf_counter() - started, 'snapshot')
+
+
+def build_snapshot(out):
+    """用种子数据新建一个 SQLite 数据库（与应用启动时的表结构、搜索索引相同），写入 out"""
+    workdir = os.path.dirname(os.path.abspath(out))
+    os.makedirs(workdir, exist_ok=True)
+    build_path = out + '.build'
+    for path in (build_path, out):
+        if os.path.exists(path):
+            os.remove(path)
+    from app import create_app, init_db, seed_db
+
+    # 数据库指向临时文件，并且不让它反过来使用旧快照
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.abspath(build_path).replace('\\', '/'),
+        'SEED_SNAPSHOT_PATH': '',
+    })
+    init_db(app, snapshot=False)
+    seed_db(app)
+    with app.app_context():
+        rows = db.session.query(Gunpla.id).count()
+        db.session.execute(db.text('PRAGMA journal_mode=DELETE'))
+        db.session.commit()
+        db.engine.dispose()
+    # 关闭 WAL 后的单个文件，压缩空闲页
+    connection = sqlite3.connect(build_path)
+    connection.execute('VACUUM')
+    connection.close()
+    os.replace(build_path, out)
+    meta = {
+        'fingerprint': fingerprint(),
+        'rows': rows,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(_meta_path(out), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='种子数据快照')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('snapshot', help='生成 SQLite 快照')
+    p.add_argument('--out', default=Config.SEED_SNAPSHOT_PATH)
+    commands.add_parser('check', help='检查快照是否与当前表结构和种子数据一致')
+    args = parser.parse_args(argv)
+
+    if args.command == 'snapshot':
+        started = time.perf_counter()
+        rows = build_snapshot(args.out)
+        print(f'{args.out}: {rows} 行，{os.path.getsize(args.out) / 1024:.0f} KB，'
+              f'用时 {time.perf_counter() - started:.2f}s')
+        return 0
+    usable, reason, rows = snapshot_status()
+    print(f"{'可用' if usable else '不可用'}: {reason}" + (f'（{rows} 行）' if usable else ''))
+    return 0 if usable else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+系列页面（级别列表页）解析
+
+78动漫的级别页面按子分类分段，每段前有"普通版共12款"这样的标题。
+按文档顺序遍历一次页面：遇到文本时检查是否为子分类标题并更新当前子分类，
+遇到模型链接时直接记下当前子分类。整页只遍历一次，复杂度 O(页面大小)，
+不再为每个链接向上查找祖先节点的文本或在整页文本中搜索链接名称
+
+BeautifulSoup 在第一次解析页面时才导入（级别配置 grades.py 也依赖本模块）
+"""
+import hashlib
+import re
+
+# 模型单品链接
+ITEM_LINK_RE = re.compile(r'/ct/\d+\.html')
+
+# 标题可能被拆成相邻的几个文本节点，保留上一段文本的末尾用于拼接匹配
+_TAIL_LENGTH = 64
+
+# RG 等级别页面的默认子分类标题
+DEFAULT_SUBCATEGORY_PATTERNS = [
+    (r'普通版共\d+款', '普通版'),
+    (r'网络限定版共\d+款', '网络限定版'),
+    (r'其他限定版共\d+款', '其他限定版'),
+    (r'EVANGELION系列共\d+款', 'EVANGELION系列'),
+    (r'勇者王系列共\d+款', '勇者王系列'),
+    (r'参考出品/开发中(?:商品)?共\d+款', '参考出品/开发中'),
+]
+
+DEFAULT_SUBCATEGORY = '普通版'
+
+
+class SubcategoryMarkers:
+    """子分类标题的匹配规则，所有规则合并成一个正则"""
+
+    def __init__(self, patterns=None):
+        patterns = DEFAULT_SUBCATEGORY_PATTERNS if patterns is None else patterns
+        self.names = [name for _, name in patterns]
+        self.regex = re.compile('|'.join(
+            f'(?P<m{i}>{pattern})' for i, (pattern, _) in enumerate(patterns)
+        )) if patterns else None
+        # 所有标题都以同一个普通字符结尾（如"款"）时，新文本中没有该字符就不可能有标题结束，
+        # 可以跳过正则匹配
+        last_chars = {pattern[-1] for pattern, _ in patterns if pattern}
+        self.end_char = None
+        if len(last_chars) == 1 and all(len(p) < 2 or p[-2] != '\\' for p, _ in patterns):
+            char = last_chars.pop()
+            if char not in '.^$*+?{}[]()|\\':
+                self.end_char = char
+
+    def last_in(self, text, start=0):
+        """text 中结束位置在 start 之后的最后一个标题对应的子分类，没有则返回 None"""
+        if self.regex is None:
+            return None
+        if self.end_char is not None and self.end_char not in text[start:]:
+            return None
+        found = None
+        for match in self.regex.finditer(text):
+            if match.end() > start:
+                found = self.names[int(match.lastgroup[1:])]
+        return found
+
+
+def tag_links(soup, markers=None, default=DEFAULT_SUBCATEGORY, href=ITEM_LINK_RE):
+    """
+    按文档顺序遍历一次页面，给每个模型链接标注所属子分类
+
+    参数:
+        soup: BeautifulSoup 对象或HTML文本
+        markers: SubcategoryMarkers 或 [(正则, 子分类)]，默认使用 DEFAULT_SUBCATEGORY_PATTERNS
+        default: 第一个标题之前的链接所属的子分类
+        href: 模型链接的 href 规则
+
+    返回:
+        [(链接元素, 子分类)]，顺序与页面中一致
+    """
+    from bs4 import BeautifulSoup, CData, NavigableString
+
+    if isinstance(soup, (str, bytes)):
+        soup = BeautifulSoup(soup, 'html.parser')
+    if not isinstance(markers, SubcategoryMarkers):
+        markers = SubcategoryMarkers(markers)
+
+    current = default
+    tail = ''
+    tagged = []
+    for element in soup.descendants:
+        # 与 get_text() 一致，只看普通文本（不含注释、脚本、样式）
+        if type(element) in (NavigableString, CData):
+            window = tail + element
+            found = markers.last_in(window, start=len(tail))
+            if found:
+                current = found
+            tail = window[-_TAIL_LENGTH:]
+        elif element.name == 'a':
+            link_href = element.get('href')
+            if link_href and href.search(link_href):
+                tagged.append((element, current))
+    return tagged
+
+
+def entry_hash(name, url, subcategory):
+    """列表条目的哈希（名称、详情页URL、子分类），任一项变化都说明条目需要重新抓取"""
+    text = '\n'.join(value or '' for value in (name, url, subcategory))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
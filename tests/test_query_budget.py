@@ -0,0 +1,119 @@
+"""
+视图查询预算测试
+
+用 300 件高达的想要列表/已购买列表请求主要页面：测试模式下 QUERY_BUDGET_ENFORCE 默认开启，
+超出 @query_budget 的视图直接抛出 QueryBudgetExceeded。
+
+运行: python -m unittest discover tests
+"""
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from app import create_app, init_db
+from models import db, Gunpla, Wishlist, Collection, Coupon, ShareLink, User
+from price_history import record_prices
+from query_budget import QueryBudgetExceeded
+
+ITEM_COUNT = 300
+
+
+class QueryBudgetTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        fd, cls.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        cls.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + cls.db_path,
+        })
+        init_db(cls.app, snapshot=False)
+        with cls.app.app_context():
+            user = User(username='tester', email='tester@example.com')
+            user.set_password('password')
+            db.session.add(user)
+            kits = [
+                Gunpla(name_cn=f'测试高达 {i:03d}', grade=('RG', 'MG', 'HGUC')[i % 3], subcategory='普通版',
+                       price_jp_msrp=2000 + i * 10, price_cn_market=100 + i)
+                for i in range(ITEM_COUNT)
+            ]
+            db.session.add_all(kits)
+            db.session.flush()
+            for i, kit in enumerate(kits):
+                db.session.add(Wishlist(gunpla_id=kit.id, user_id=user.id))
+                db.session.add(Collection(gunpla_id=kit.id, user_id=user.id, purchase_price=90 + i,
+                                          purchase_platform='淘宝', purchase_date=date(2024, 1, 1)))
+            db.session.add(ShareLink(user_id=user.id, list_type='wishlist', token='budget-test', is_active=True))
+            db.session.add(Coupon(platform='淘宝', discount_type='fixed_amount', discount_value=30,
+                                  min_purchase=299))
+            db.session.add(Coupon(platform='淘宝', discount_type='percentage', discount_value=10,
+                                  max_discount=50, min_purchase=200))
+            start = datetime(2024, 1, 1)
+            record_prices(db.session, (
+                {'gunpla_id': kits[0].id, 'platform': '淘宝', 'price': 100 + i % 7,
+                 'recorded_at': start + timedelta(hours=6 * i)}
+                for i in range(2000)
+            ))
+            db.session.commit()
+            cls.user_id = user.id
+            cls.gunpla_id = kits[0].id
+            cls.coupon_id = Coupon.query.first().id
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        os.remove(cls.db_path)
+
+    def client(self, logged_in=False):
+        client = self.app.test_client()
+        if logged_in:
+            with client.session_transaction() as session:
+                session['_user_id'] = str(self.user_id)
+                session['_fresh'] = True
+        return client
+
+    def assertWithinBudget(self, client, url, endpoint):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        budget = self.app.view_functions[endpoint].query_budget
+        self.assertLessEqual(int(response.headers['X-Query-Count']), budget, url)
+
+    def test_catalog_views(self):
+        client = self.client()
+        self.assertWithinBudget(client, '/gunpla', 'main.gunpla_list')
+        self.assertWithinBudget(client, '/gunpla?grade=RG&sort=suan', 'main.gunpla_list')
+        self.assertWithinBudget(client, '/gunpla?search=高达', 'main.gunpla_list')
+        self.assertWithinBudget(client, '/gunpla?search=测试高达 01', 'main.gunpla_list')
+        self.assertWithinBudget(client, f'/gunpla/{self.gunpla_id}', 'main.gunpla_detail')
+        self.assertWithinBudget(client, f'/api/gunpla/{self.gunpla_id}/price-history', 'main.api_price_history')
+        self.assertWithinBudget(client, f'/api/gunpla/{self.gunpla_id}/price-chart?platform=淘宝',
+                                'main.api_price_chart')
+
+    def test_list_views(self):
+        client = self.client(logged_in=True)
+        self.assertWithinBudget(client, f'/gunpla/{self.gunpla_id}', 'main.gunpla_detail')
+        self.assertWithinBudget(client, '/wishlist', 'main.wishlist')
+        self.assertWithinBudget(client, '/collection', 'main.collection')
+        self.assertWithinBudget(client, '/export/wishlist', 'main.export_list')
+        self.assertWithinBudget(client, '/export/collection', 'main.export_list')
+        self.assertWithinBudget(self.client(), '/share/budget-test', 'main.share_view')
+
+    def test_coupon_views(self):
+        client = self.client(logged_in=True)
+        self.assertWithinBudget(client, f'/coupons/{self.coupon_id}/analyze', 'main.coupon_analyze')
+        self.assertWithinBudget(client, '/coupons/optimize?budget=50', 'main.coupon_optimize')
+
+    def test_exceeding_budget_raises(self):
+        view = self.app.view_functions['main.wishlist']
+        with mock.patch.object(view, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client(logged_in=True).get('/wishlist')
+
+
+if __name__ == '__main__':
+    unittest.main()
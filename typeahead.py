@@ -0,0 +1,239 @@
+"""
+输入联想（typeahead）用的进程内 n-gram 倒排索引
+
+- 对 name_cn / name_jp / name_en / ms_number 建立单字和双字（bigram）倒排表
+- 倒排表使用紧凑的整数数组 array('I')，文档编号只增不减，因此始终有序
+- 查询时取最稀有的 n-gram 的倒排表作为候选集，再用子串匹配校验，结果精确
+- 增量刷新：本进程写入时通过 SQLAlchemy 事件标记；爬虫等其他进程写入时，
+  按间隔检查 gunpla 表的 (count, max(updated_at))，只加载变化的行
+"""
+import heapq
+import threading
+import time
+import unicodedata
+from array import array
+
+from sqlalchemy import event, func
+
+from models import Gunpla
+
+# 字段之间的分隔符，避免 n-gram 跨字段
+_FIELD_SEP = '\x00'
+
+# 墓碑（已删除/已替换的文档）超过该比例时整体重建
+_COMPACT_RATIO = 0.25
+
+
+def normalize(value):
+    """统一全角/半角和大小写"""
+    return unicodedata.normalize('NFKC', value or '').lower()
+
+
+def _grams(text):
+    """文本的单字和双字集合（不含分隔符）"""
+    grams = set()
+    for field in text.split(_FIELD_SEP):
+        grams.update(field)
+        grams.update(field[i:i + 2] for i in range(len(field) - 1))
+    grams.discard(' ')
+    return grams
+
+
+class NgramIndex:
+    """n-gram 倒排索引（不涉及数据库）"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._postings = {}
+        self._doc_ids = array('I')
+        self._doc_text = []
+        self._doc_name = []
+        self._doc_info = []
+        self._slot = {}
+        self._dead = set()
+
+    def __len__(self):
+        return len(self._slot)
+
+    @property
+    def dead_ratio(self):
+        return len(self._dead) / len(self._doc_ids) if self._doc_ids else 0.0
+
+    def add(self, gunpla_id, name_cn, name_jp=None, name_en=None, ms_number=None, grade=None):
+        """添加或替换一条记录"""
+        self.remove(gunpla_id)
+        slot = len(self._doc_ids)
+        text = _FIELD_SEP.join(normalize(v) for v in (name_cn, name_jp, name_en, ms_number))
+        self._doc_ids.append(gunpla_id)
+        self._doc_text.append(text)
+        self._doc_name.append(normalize(name_cn))
+        self._doc_info.append({
+            'id': gunpla_id,
+            'name_cn': name_cn,
+            'grade': grade,
+            'ms_number': ms_number,
+        })
+        self._slot[gunpla_id] = slot
+        for gram in _grams(text):
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array('I')
+            postings.append(slot)
+
+    def remove(self, gunpla_id):
+        slot = self._slot.pop(gunpla_id, None)
+        if slot is not None:
+            self._dead.add(slot)
+
+    def search(self, query, limit=10):
+        """
+        查询包含所有关键词的记录
+
+        返回:
+            按相关度排序的结果列表（名称前缀匹配优先，其次匹配位置靠前、名称较短）
+        """
+        terms = normalize(query).split()
+        if not terms:
+            return []
+        candidates = self._candidates(terms)
+        if candidates is None:
+            return []
+
+        # 单个不超过2字的关键词就是倒排表的键本身，无需再校验
+        exact = len(terms) == 1 and len(terms[0]) <= 2
+        dead = self._dead
+        doc_text = self._doc_text
+        doc_name = self._doc_name
+        first = terms[0]
+        hits = []
+        for slot in candidates:
+            if slot in dead:
+                continue
+            text = doc_text[slot]
+            if exact or all(term in text for term in terms):
+                name = doc_name[slot]
+                hits.append((
+                    not name.startswith(first),
+                    text.find(first),
+                    len(name),
+                    slot,
+                ))
+
+        return [self._doc_info[hit[-1]] for hit in heapq.nsmallest(limit, hits)]
+
+    def match_ids(self, term):
+        """
+        任一字段包含 term（整体作为一个子串，与 LIKE '%term%' 一致）的全部 gunpla_id，不排序、不限数量
+        """
+        term = normalize(term)
+        if not term.strip():
+            return []
+        candidates = self._candidates([term])
+        if candidates is None:
+            return []
+        exact = len(term) <= 2
+        dead = self._dead
+        doc_text = self._doc_text
+        doc_ids = self._doc_ids
+        return [
+            doc_ids[slot] for slot in candidates
+            if slot not in dead and (exact or term in doc_text[slot])
+        ]
+
+    def _candidates(self, terms):
+        """所有关键词的 n-gram 中最短的倒排表；有 n-gram 不存在时返回 None"""
+        candidates = None
+        for term in terms:
+            grams = [term[i:i + 2] for i in range(len(term) - 1)] or [term]
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    return None
+                if candidates is None or len(postings) < len(candidates):
+                    candidates = postings
+        return candidates
+
+
+class TypeaheadIndex:
+    """与 gunpla 表保持同步的联想索引"""
+
+    def __init__(self, refresh_interval=30):
+        self.refresh_interval = refresh_interval
+        self.index = NgramIndex()
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._checked_at = 0.0
+        self._watermark = None
+
+    def mark_dirty(self, *args):
+        """下次查询前检查数据库变化（可直接作为SQLAlchemy事件回调）"""
+        self._dirty = True
+
+    def listen(self):
+        """注册 Gunpla 写入事件"""
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            if not event.contains(Gunpla, name, self.mark_dirty):
+                event.listen(Gunpla, name, self.mark_dirty)
+
+    def _load_rows(self, session, since=None):
+        query = session.query(
+            Gunpla.id, Gunpla.name_cn, Gunpla.name_jp, Gunpla.name_en,
+            Gunpla.ms_number, Gunpla.grade, Gunpla.updated_at,
+        )
+        if since is not None:
+            query = query.filter(Gunpla.updated_at >= since)
+        return query.all()
+
+    def _apply(self, index, rows):
+        for row in rows:
+            index.add(row.id, row.name_cn, row.name_jp, row.name_en, row.ms_number, row.grade)
+            if row.updated_at and (self._watermark is None or row.updated_at > self._watermark):
+                self._watermark = row.updated_at
+
+    def rebuild(self, session):
+        """从数据库全量重建"""
+        with self._lock:
+            self._rebuild(session)
+
+    def _rebuild(self, session):
+        # 在新索引上构建后一次性替换：search 不持锁，不能清空正在使用的索引
+        index = NgramIndex()
+        self._watermark = None
+        self._apply(index, self._load_rows(session))
+        self.index = index
+        self._dirty = False
+        self._checked_at = time.monotonic()
+
+    def refresh(self, session, force=False):
+        """
+        增量刷新：加载 updated_at 不早于水位线的行；
+        行数对不上（有删除，或批量导入未带新时间戳）或墓碑过多时全量重建
+        """
+        now = time.monotonic()
+        if not force and not self._dirty and now - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._watermark is None and not len(self.index):
+                self._rebuild(session)
+                return
+            self._dirty = False
+            self._checked_at = now
+            count, latest = session.query(func.count(Gunpla.id), func.max(Gunpla.updated_at)).one()
+            if latest is not None and (self._watermark is None or latest > self._watermark):
+                self._apply(self.index, self._load_rows(session, since=self._watermark))
+            if count != len(self.index) or self.index.dead_ratio > _COMPACT_RATIO:
+                self._rebuild(session)
+
+    def search(self, session, query, limit=10):
+        self.refresh(session)
+        # 只读取一次 self.index，查询期间即使被重建替换也始终使用同一个索引
+        index = self.index
+        return index.search(query, limit=limit)
+
+    def match_ids(self, session, term):
+        """刷新后返回包含 term 的全部 gunpla_id（见 NgramIndex.match_ids）"""
+        self.refresh(session)
+        index = self.index
+        return index.match_ids(term)